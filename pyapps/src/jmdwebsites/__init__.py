@@ -11,7 +11,13 @@ __version__ = "0.1.1"
 __copyright__ = "Copyright (c) 2016 jmdwebsites"
 __license__ = "BSD 3-Clause"
 
-from .website import Website, init_website, new_website
 from .htmlpage import HtmlPage
+from .lazy import lazy_import
 
-__all__ = ['Website', 'HtmlPage']
+# Website, init_website and new_website are reached through website, which
+# is imported on first use, so the cli starts without loading the heavy
+# dependencies of the website module. Python 2 has no module __getattr__,
+# to export them from the package lazily.
+website = lazy_import(__name__ + '.website')
+
+__all__ = ['website', 'HtmlPage']
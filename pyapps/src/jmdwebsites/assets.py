@@ -0,0 +1,103 @@
+import errno
+import logging
+import os
+import sys
+
+import py
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .manifest import hash_file
+
+logger = logging.getLogger(__name__)
+
+# From linux/fs.h
+FICLONE = 0x40049409
+
+
+def reflink(source, target):
+    """Make target a copy on write clone of source, if the file system can."""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, 'Reflinks not supported')
+    with source.open('rb') as source_file:
+        with target.open('wb') as target_file:
+            try:
+                fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+            except IOError as e:
+                raise OSError(e.errno, e.strerror)
+
+
+class AssetStore(object):
+    """Asset files, stored once each, named by a hash of their content.
+
+    Assets are published from the store to the build dir with a hardlink,
+    or a reflink, or a copy, whichever works first. A target that already
+    has the same content is left alone.
+
+    A hardlinked target shares its file with the store, so an edit to it in
+    place changes the stored asset too. Each stored asset is checked
+    against its hash the first time it is used in a build, and replaced if
+    it has changed.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = py.path.local(store_dir)
+        self.used = set()
+        self.verified = set()
+
+    def add(self, path):
+        digest = hash_file(path)
+        stored = self.store_dir.join(digest[:2], digest)
+        if stored.check(file=1) and digest not in self.verified and \
+                hash_file(stored) != digest:
+            logger.warning('Stored asset changed, replace it: %s', stored)
+            stored.remove()
+        if not stored.check(file=1):
+            tmp_path = stored.new(basename='{}.{}.tmp'.format(digest, os.getpid()))
+            tmp_path.dirpath().ensure(dir=1)
+            path.copy(tmp_path)
+            tmp_path.rename(stored)
+        self.verified.add(digest)
+        self.used.add(stored.basename)
+        return digest, stored
+
+    def publish(self, path, target):
+        """Publish the asset at path to target.
+
+        Returns False if target already had the same content.
+        """
+        digest, stored = self.add(path)
+        if target.check(file=1):
+            # Not taken as up to date just for being linked to the store,
+            # in case it was edited in place
+            if hash_file(target) == digest:
+                logger.debug('Asset up to date: %s', target)
+                return False
+            target.remove()
+        target.dirpath().ensure(dir=1)
+        try:
+            os.link(stored.strpath, target.strpath)
+        except (OSError, AttributeError) as e:
+            logger.debug('Hardlink failed: %s: %s', target, e)
+            try:
+                reflink(stored, target)
+            except OSError as e:
+                logger.debug('Reflink failed: %s: %s', target, e)
+                stored.copy(target)
+        return True
+
+    def prune(self):
+        """Remove the stored assets not used or linked to by a build."""
+        if not self.store_dir.check(dir=1):
+            return 0
+        count = 0
+        for path in self.store_dir.visit(fil=lambda path: path.check(file=1)):
+            if path.basename not in self.used and path.stat().nlink == 1:
+                path.remove()
+                count += 1
+        if count:
+            logger.info('Prune %d assets from %s', count, self.store_dir)
+        return count
@@ -0,0 +1,280 @@
+from __future__ import print_function
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+
+import py
+import six
+
+from . import __version__
+from . import orderedyaml
+from .html import HTML5LIB
+from .orderedyaml import CommentedMap
+from .profiler import PROFILE_FILE
+from .render import FORMAT
+from .website import PROJDIR, PROFILE, CONFIG_FILE, THEME_FILE, CONTENT, \
+                     PAGES, HOME
+
+logger = logging.getLogger(__name__)
+
+SITE = 'site'
+RESULTS = 'results'
+LATEST = 'latest'
+THEME = 'bench'
+# A cold build, a build with nothing changed, and a build after an edit
+RUNS = ('cold', 'warm', 'edit')
+SPEC_TYPES = ('layouts', 'partials', 'vars', 'content')
+
+WORDS = (u'lorem ipsum dolor sit amet consectetur adipiscing elit sed do '
+         u'eiusmod tempor incididunt ut labore et dolore magna aliqua').split()
+
+
+class BenchParams(object):
+    """The size and shape of a synthetic site."""
+
+    def __init__(self, pages=100, partials=3, markdown_size=2000,
+                 layout_depth=3, inherit_depth=3):
+        self.pages = pages
+        self.partials = partials
+        self.markdown_size = markdown_size
+        self.layout_depth = layout_depth
+        self.inherit_depth = inherit_depth
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def spec_chain(type_, base, inherit_depth):
+    """Specs of type_, with default and page at the end of an inherit
+    chain that starts at base."""
+    specs = CommentedMap()
+    base_spec = CommentedMap([('inherit', None)])
+    base_spec.update(base)
+    specs['base'] = base_spec
+    parent = 'base'
+    for level in range(1, inherit_depth + 1):
+        name = 'level_{}'.format(level)
+        specs[name] = CommentedMap([('inherit', parent)])
+        parent = name
+    specs['default'] = CommentedMap([('inherit', parent)])
+    specs['page'] = CommentedMap([('inherit', 'default')])
+    return specs
+
+
+def part_names(params):
+    return ['part_{}'.format(n) for n in range(1, params.partials + 1)]
+
+
+def make_theme(params):
+    parts = part_names(params)
+    sections = ['section_{}'.format(n) for n in range(1, params.layout_depth + 1)]
+    layouts = CommentedMap([
+        ('doc', CommentedMap([('doctype', None), ('html', None)])),
+        ('html', CommentedMap([('head', None), ('body', None)])),
+        ('head', CommentedMap([('charset', None), ('title', None),
+                               ('stylesheet', None)])),
+        ('body', CommentedMap([('header', None), ('main', None),
+                               ('footer', None)])),
+        ('header', None),
+    ])
+    parent = 'main'
+    for section in sections:
+        layouts[parent] = CommentedMap([(section, None)])
+        parent = section
+    layouts[parent] = CommentedMap((part, None) for part in parts)
+    partials = CommentedMap([
+        ('doctype', u'<!DOCTYPE {partial}>'),
+        ('html', u'<html lang="{{lang}}">{partial}</html>'),
+        ('head', u'<head>{partial}</head>'),
+        ('charset', u'<meta charset="{partial}"/>'),
+        ('title', u'<title>{{title}}</title>'),
+        ('stylesheet', u'<link href="{partial}" rel="stylesheet"/>'),
+        ('body', u'<body>{partial}</body>'),
+        ('header', u'<header>{partial}</header>'),
+        ('main', u'<main>{partial}</main>'),
+        ('footer', u'<footer>{partial}</footer>'),
+    ])
+    for n, section in enumerate(sections, 1):
+        partials[section] = u'<section class="level-{}">{{partial}}</section>'.format(n)
+    for part in parts:
+        partials[part] = u'<div class="{}">{{partial}}</div>'.format(part)
+    vars_ = CommentedMap([
+        ('lang', u'en'),
+        ('charset', u'utf-8'),
+        ('doctype', u'html'),
+        ('stylesheet', u'/page.css'),
+        ('title', u'Bench'),
+    ])
+    content = CommentedMap([('header', u''), ('footer', u'')])
+    content.update((part, None) for part in parts)
+    theme = CommentedMap()
+    for type_, base in zip(SPEC_TYPES, (layouts, partials, vars_, content)):
+        theme[type_] = spec_chain(type_, base, params.inherit_depth)
+    return theme
+
+
+def make_site():
+    pages = CommentedMap()
+    for name in ('default', 'page'):
+        pages[name] = CommentedMap((type_, name) for type_ in SPEC_TYPES)
+    return CommentedMap([
+        ('content_group', CommentedMap([(PAGES, None), (HOME, None)])),
+        ('theme', CommentedMap([('name', THEME)])),
+        ('pages', pages),
+    ])
+
+
+def make_markdown(size, seed):
+    """Make about size bytes of markdown, different for each seed."""
+    lines = [u'# Heading {}'.format(seed), u'']
+    length = 0
+    n = seed
+    while length < size:
+        words = [WORDS[(n + i * 7) % len(WORDS)] for i in range(40)]
+        words[3] = u'**{}**'.format(words[3])
+        words[11] = u'[{}](/page-{})'.format(words[11], n % 97)
+        paragraph = u' '.join(words) + u'.'
+        if n % 3 == 0:
+            paragraph = u'\n'.join(u'- ' + word for word in words[:6])
+        lines.extend([paragraph, u''])
+        length += len(paragraph) + 1
+        n += 1
+    return u'\n'.join(lines)
+
+
+def generate_site(site_dir, params):
+    """Make a site of the size and shape in params, in place of site_dir."""
+    site_dir = py.path.local(site_dir)
+    if site_dir.check():
+        site_dir.remove()
+    site_dir.join(PROJDIR).ensure(dir=1)
+    site_dir.join(CONFIG_FILE).write_text(
+        orderedyaml.dump(make_site()).decode('utf-8'), 'utf-8')
+    site_dir.join(THEME_FILE).write_text(
+        orderedyaml.dump(make_theme(params)).decode('utf-8'), 'utf-8')
+    stylesheets_dir = site_dir.join('themes', THEME, 'stylesheets')
+    stylesheets_dir.join('page.scss').write_text(
+        u"@import 'base';\nmain { section { margin: $gap; } }\n", 'utf-8',
+        ensure=True)
+    stylesheets_dir.join('_base.scss').write_text(
+        u'$gap: 1em;\nbody { font-family: sans-serif; }\n', 'utf-8')
+    page_dirs = [site_dir.join(CONTENT, HOME)]
+    page_dirs.extend(site_dir.join(CONTENT, PAGES, 'page-{:04d}'.format(n))
+                     for n in range(1, params.pages))
+    for n, page_dir in enumerate(page_dirs):
+        for m, part in enumerate(part_names(params)):
+            page_dir.join('_{}.md'.format(part)).write_text(
+                make_markdown(params.markdown_size, n * params.partials + m),
+                'utf-8', ensure=True)
+    return page_dirs
+
+
+def run_build(site_dir, jobs=1, engine=FORMAT, formatter=HTML5LIB):
+    """Build site_dir in a new process, as the cli would, and get its
+    build profile."""
+    cmd = [sys.executable, '-m', 'jmdwebsites.cli', '-C', str(site_dir),
+           'build', '--profile', '--jobs', str(jobs), '--engine', engine,
+           '--formatter', formatter]
+    start = time.time()
+    subprocess.check_output(cmd)
+    wall_time = time.time() - start
+    profile_file = py.path.local(site_dir).join(PROJDIR, PROFILE, PROFILE_FILE)
+    profile = json.loads(profile_file.read_text('utf-8'))
+    return {
+        'wall_time': wall_time,
+        'time': profile['time'],
+        'max_rss': profile['max_rss'],
+        'built': sum(1 for record in profile['pages'].values()
+                     if 'dump' in record['stages']),
+        'stages': profile['stages'],
+    }
+
+
+def run_bench(bench_dir, params, jobs=1, engine=FORMAT, formatter=HTML5LIB):
+    bench_dir = py.path.local(bench_dir)
+    site_dir = bench_dir.join(SITE)
+    logger.info('Generate site: %s', site_dir)
+    page_dirs = generate_site(site_dir, params)
+    runs = {}
+    for run in RUNS:
+        if run == 'edit':
+            edited = page_dirs[len(page_dirs) // 2].join('_part_1.md')
+            edited.write_text(edited.read_text('utf-8') + u'\nEdited.\n', 'utf-8')
+        logger.info('Run %s build', run)
+        runs[run] = run_build(site_dir, jobs, engine, formatter)
+        # Of the pages built, as the warm and edit runs build few or none
+        runs[run]['pages_per_sec'] = runs[run]['built'] / runs[run]['time']
+    return {
+        'jmdwebsites': __version__,
+        'python': platform.python_version(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': params.as_dict(),
+        'jobs': jobs,
+        'engine': engine,
+        'formatter': formatter,
+        'runs': runs,
+    }
+
+
+def get_results_file(bench_dir, name):
+    return py.path.local(bench_dir).join(RESULTS, name + '.json')
+
+
+def save_results(bench_dir, results, name=None):
+    """Save the results as the latest, and under name, eg. a version, to
+    compare with later."""
+    text = six.text_type(json.dumps(results, indent=1, sort_keys=True)) + u'\n'
+    names = [LATEST] if name is None else [LATEST, name]
+    for name in names:
+        get_results_file(bench_dir, name).write_text(text, 'utf-8', ensure=True)
+
+
+def load_results(bench_dir, name):
+    return json.loads(get_results_file(bench_dir, name).read_text('utf-8'))
+
+
+def format_mb(size):
+    return '{:.1f}'.format(size / 1e6) if size else '-'
+
+
+def format_rate(rate):
+    return '{:.1f}'.format(rate) if rate else '-'
+
+
+def report(results):
+    lines = ['jmdwebsites {jmdwebsites}, python {python}, jobs {jobs}, '
+             'engine {}, formatter {formatter}'.format(
+                 results.get('engine', FORMAT), **results),
+             ', '.join('{}={}'.format(name, value) for name, value
+                       in sorted(results['params'].items())),
+             '{:<8}{:>10}{:>10}{:>8}{:>10}{:>12}'.format(
+                 'Run', 'Wall (s)', 'Build (s)', 'Built', 'Pages/s', 'Peak (MB)')]
+    for run in RUNS:
+        record = results['runs'][run]
+        lines.append('{:<8}{:>10.3f}{:>10.3f}{:>8}{:>10}{:>12}'.format(
+            run, record['wall_time'], record['time'], record['built'],
+            format_rate(record['pages_per_sec']), format_mb(record['max_rss'])))
+    stages = results['runs']['cold']['stages']
+    lines.append('Cold build stages (s): ' + ', '.join(
+        '{} {:.3f}'.format(name, stage['time']) for name, stage in
+        sorted(stages.items(), key=lambda item: -item[1]['time'])))
+    return '\n'.join(lines)
+
+
+def compare(old, new):
+    lines = ['{:<8}{:>10}{:>10}{:>8}'.format('Run', 'Old (s)', 'New (s)', 'x')]
+    for run in RUNS:
+        old_time = old['runs'][run]['time']
+        new_time = new['runs'][run]['time']
+        lines.append('{:<8}{:>10.3f}{:>10.3f}{:>8.2f}'.format(
+            run, old_time, new_time, old_time / new_time))
+    if old['params'] != new['params']:
+        lines.append('Warning: Sites differ: {}'.format(old['params']))
+    for option in ('jobs', 'engine', 'formatter'):
+        if old.get(option) != new.get(option):
+            lines.append('Options differ: {}: {} -> {}'.format(
+                option, old.get(option), new.get(option)))
+    return '\n'.join(lines)
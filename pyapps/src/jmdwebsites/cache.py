@@ -0,0 +1,109 @@
+from collections import OrderedDict
+import logging
+import os
+
+import py
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache(object):
+    """A map that drops the least recently used entries.
+
+    There are never more than maxsize entries. Hits and misses are
+    counted, to see how well the cache is doing.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class FileCache(object):
+    """Text kept in files under cache_dir, one file per key.
+
+    The files are shared by builds, and by the processes of a parallel
+    build, so each file is written whole and then renamed into place. A
+    hit touches its file, so evict() can remove the least recently used
+    files when they take up more than maxsize bytes.
+    """
+
+    def __init__(self, cache_dir, maxsize):
+        self.cache_dir = py.path.local(cache_dir)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, path):
+        return path.read_text(encoding='utf-8')
+
+    def write(self, path, text):
+        path.write_text(text, ensure=True, encoding='utf-8')
+
+    def get(self, key):
+        path = self.cache_dir.join(key)
+        try:
+            text = self.read(path)
+            path.setmtime()
+        except EnvironmentError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, key, text):
+        path = self.cache_dir.join(key)
+        tmp_path = self.cache_dir.join('{}.{}.tmp'.format(key, os.getpid()))
+        try:
+            self.write(tmp_path, text)
+            tmp_path.rename(path)
+        except EnvironmentError as e:
+            logger.warning('Cache write failed: %s: %s', path, e)
+            tmp_path.remove(ignore_errors=True)
+
+    def evict(self):
+        """Remove the least recently used files, down to maxsize bytes."""
+        if not self.cache_dir.check(dir=1):
+            return 0
+        files = []
+        for path in self.cache_dir.listdir():
+            stat = path.stat()
+            files.append((stat.mtime, stat.size, path))
+        total = sum(size for _, size, _ in files)
+        count = 0
+        for _, size, path in sorted(files):
+            if total <= self.maxsize:
+                break
+            path.remove(ignore_errors=True)
+            total -= size
+            count += 1
+        if count:
+            logger.info('Evict %d files from cache: %s', count, self.cache_dir)
+        return count
+
+    def clear(self):
+        if self.cache_dir.check():
+            self.cache_dir.remove(ignore_errors=True)
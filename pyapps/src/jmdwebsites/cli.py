@@ -6,12 +6,25 @@ import sys
 
 import click
 
-from . import Website, init_website, new_website
+from .compress import CompressError, COMPRESSIONS, MIN_SIZE
 from .error import NonFatalError, PathNotFoundError
+from .html import FORMATTERS, HTML5LIB
+from .lazy import lazy_import
 from .log import config_logging
+from .options import BuildOptions, HOST, PORT, POLL_INTERVAL, MODES, \
+                     DEVELOPMENT
+from .profiler import BuildProfiler, profiling
+from .render import ENGINES, FORMAT
+from .trace import CATEGORIES, ALL, set_tracing
 from .project import ProjectNotFoundError, PathAlreadyExists, \
                      WebsiteProjectAlreadyExists
 
+# Imported by the commands that use them, so the others start fast
+websites = lazy_import('jmdwebsites.website')
+preview = lazy_import('jmdwebsites.serve')
+watching = lazy_import('jmdwebsites.watch')
+benchmark = lazy_import('jmdwebsites.bench')
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +40,13 @@ def handle_error(e, severity=None):
     file_logger = logging.getLogger('file')
     if file_logger.handlers:
         file_logger.exception(e)
+
+def get_build_options(command, **kwargs):
+    try:
+        return BuildOptions(**kwargs)
+    except CompressError as e:
+        eprint('{}: {}'.format(command, e))
+        sys.exit(1)
     
 def main():
     try:
@@ -47,8 +67,12 @@ def main():
 @click.option('--info', is_flag=True, default=False, help='Turn on INFO messages')
 @click.option('--level', default=None, help='Turn on INFO messages')
 @click.option('--change-dir', '-C', default=None, help='Change working directory')
-def cli(change_dir, level, info, debug, verbose, logfile):
+@click.option('--trace', '-t', multiple=True,
+              type=click.Choice(CATEGORIES + (ALL,)),
+              help='Log the data of a stage of each page at DEBUG level')
+def cli(trace, change_dir, level, info, debug, verbose, logfile):
     config_logging(level, info, debug, verbose, logfile)
+    set_tracing(trace)
     if logfile:
         logger.info('Logging to %s', logfile)
     if change_dir:
@@ -63,33 +87,155 @@ def cli(change_dir, level, info, debug, verbose, logfile):
 @click.option('--name', '-n', default='', help='Select site name')
 def new(name):
     try:
-        new_website(name)
+        websites.new_website(name)
     except PathAlreadyExists as e:
         eprint('new:', e)
 
 @cli.command()
 def init():
     try:
-        init_website()
+        websites.init_website()
     except WebsiteProjectAlreadyExists as e:
         eprint('init:', e)
 
 @cli.command()
 def clean():
-    Website().clean()
+    websites.Website().clean()
 
 @cli.command()
 def clobber():
     try:
-        website = Website()
+        website = websites.Website()
         website.clobber()
     except PathNotFoundError as e:
         eprint('clobber: No such build dir: {}'.format(website.build_dir))
         sys.exit(1)
 
 @cli.command()
-def build():
-    Website().build()
+@click.option('--jobs', '-j', default=1, type=int,
+              help='Build pages in parallel (0 for one job per CPU)')
+@click.option('--engine', type=click.Choice(ENGINES), default=FORMAT,
+              help='Select the render engine')
+@click.option('--formatter', type=click.Choice(FORMATTERS), default=HTML5LIB,
+              help='Select the html formatter')
+@click.option('--mode', type=click.Choice(MODES), default=DEVELOPMENT,
+              help='Readable output, or minified html and css for production')
+@click.option('--compress', '-z', multiple=True, type=click.Choice(COMPRESSIONS),
+              help='Write compressed copies of the outputs, eg. index.html.gz')
+@click.option('--compress-min-size', default=MIN_SIZE, type=int,
+              help='Bytes below which outputs are not compressed')
+@click.option('--profile', is_flag=True, default=False,
+              help='Report the time taken by each stage and page')
+@click.option('--cprofile', default=0, type=int,
+              help='With --profile, dump cProfile stats of the N slowest pages')
+def build(jobs, engine, formatter, mode, compress, compress_min_size, profile,
+          cprofile):
+    options = get_build_options('build', engine=engine, formatter=formatter,
+                                mode=mode, compress=compress,
+                                compress_min_size=compress_min_size)
+    if not profile:
+        websites.Website().build(jobs=jobs, options=options)
+        return
+    with profiling(BuildProfiler(cprofile)) as build_profiler:
+        website = websites.Website()
+        website.build(jobs=jobs, options=options)
+    print(build_profiler.report())
+    eprint('Build profile: {}'.format(build_profiler.dump(website.profile_dir)))
+
+@cli.command()
+@click.option('--jobs', '-j', default=1, type=int,
+              help='Build pages in parallel to start with (0 for one job per CPU)')
+@click.option('--engine', type=click.Choice(ENGINES), default=FORMAT,
+              help='Select the render engine')
+@click.option('--formatter', type=click.Choice(FORMATTERS), default=HTML5LIB,
+              help='Select the html formatter')
+@click.option('--mode', type=click.Choice(MODES), default=DEVELOPMENT,
+              help='Readable output, or minified html and css for production')
+@click.option('--compress', '-z', multiple=True, type=click.Choice(COMPRESSIONS),
+              help='Write compressed copies of the outputs, eg. index.html.gz')
+@click.option('--compress-min-size', default=MIN_SIZE, type=int,
+              help='Bytes below which outputs are not compressed')
+@click.option('--interval', default=POLL_INTERVAL, type=float,
+              help='Seconds between checks for changes')
+def watch(jobs, engine, formatter, mode, compress, compress_min_size,
+          interval):
+    """Build the website, then rebuild it as files change."""
+    website = websites.Website()
+    options = get_build_options('watch', engine=engine, formatter=formatter,
+                                mode=mode, compress=compress,
+                                compress_min_size=compress_min_size)
+    watcher = watching.Watcher(website, options=options, interval=interval)
+    eprint('Watching {}, press Ctrl-C to stop'.format(website.site_dir))
+    watcher.run(jobs=jobs)
+
+@cli.command()
+@click.option('--host', default=HOST, help='Host to serve on')
+@click.option('--port', '-p', default=PORT, type=int, help='Port to serve on')
+@click.option('--engine', type=click.Choice(ENGINES), default=FORMAT,
+              help='Select the render engine')
+@click.option('--formatter', type=click.Choice(FORMATTERS), default=HTML5LIB,
+              help='Select the html formatter')
+def serve(host, port, engine, formatter):
+    """Preview the website, rendering pages as they are asked for."""
+    site = preview.PreviewSite(
+        websites.Website(),
+        options=BuildOptions(engine=engine, formatter=formatter))
+    server = preview.PreviewServer(site, host=host, port=port)
+    eprint('Serving on http://{}:{}/, press Ctrl-C to stop'.format(
+        *server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+@cli.command()
+@click.argument('url')
+def deps(url):
+    """Show the inputs a page is built from."""
+    try:
+        page_deps = websites.Website().get_page_deps(url)
+    except websites.PageNotFoundError as e:
+        eprint('deps:', e)
+        sys.exit(1)
+    for dep in page_deps:
+        print(dep)
+
+@cli.command()
+@click.option('--pages', default=100, type=int, help='Number of pages')
+@click.option('--partials', default=3, type=int,
+              help='Markdown partials per page')
+@click.option('--markdown-size', default=2000, type=int,
+              help='Bytes of markdown per partial')
+@click.option('--layout-depth', default=3, type=int,
+              help='Depth of the sections nested in the layout')
+@click.option('--inherit-depth', default=3, type=int,
+              help='Length of the spec inherit chains')
+@click.option('--jobs', '-j', default=1, type=int,
+              help='Build pages in parallel (0 for one job per CPU)')
+@click.option('--engine', type=click.Choice(ENGINES), default=FORMAT,
+              help='Select the render engine')
+@click.option('--formatter', type=click.Choice(FORMATTERS), default=HTML5LIB,
+              help='Select the html formatter')
+@click.option('--dir', 'bench_dir', default='bench',
+              help='Dir for the synthetic site and the results')
+@click.option('--save', default=None,
+              help='Save the results under this name, eg. a version')
+@click.option('--compare', default=None,
+              help='Compare with the results saved under this name')
+def bench(pages, partials, markdown_size, layout_depth, inherit_depth, jobs,
+          engine, formatter, bench_dir, save, compare):
+    """Time builds of a synthetic site."""
+    params = benchmark.BenchParams(pages, partials, markdown_size,
+                                   layout_depth, inherit_depth)
+    results = benchmark.run_bench(bench_dir, params, jobs=jobs, engine=engine,
+                                  formatter=formatter)
+    print(benchmark.report(results))
+    if compare:
+        print(benchmark.compare(benchmark.load_results(bench_dir, compare),
+                                results))
+    benchmark.save_results(bench_dir, results, save)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,107 @@
+import gzip
+import io
+import logging
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .cache import FileCache
+from .error import JmdwebsitesError
+from .manifest import hash_bytes
+from .writer import write_file
+
+class CompressError(JmdwebsitesError): pass
+
+logger = logging.getLogger(__name__)
+
+GZIP = 'gz'
+BROTLI = 'br'
+COMPRESSIONS = (GZIP, BROTLI)
+# Smaller files gain little, and may grow
+MIN_SIZE = 1024
+COMPRESSED_CACHE_SIZE = 100 * 1024 * 1024
+
+
+def gzip_compress(data):
+    fileobj = io.BytesIO()
+    # No name or time in the header, so the same data compresses the same
+    with gzip.GzipFile(filename='', mode='wb', compresslevel=9,
+                       fileobj=fileobj, mtime=0) as gzip_file:
+        gzip_file.write(data)
+    return fileobj.getvalue()
+
+
+def brotli_compress(data):
+    return brotli.compress(data)
+
+
+COMPRESSORS = {GZIP: gzip_compress, BROTLI: brotli_compress}
+
+
+def check_compressions(compressions):
+    compressions = sorted(set(compressions))
+    for compression in compressions:
+        if compression not in COMPRESSIONS:
+            raise CompressError('Invalid compression: {}: Must be one of: {}'.format(
+                compression, ', '.join(COMPRESSIONS)))
+        if compression == BROTLI and brotli is None:
+            raise CompressError('Brotli compression needs the brotli package')
+    return compressions
+
+
+class CompressedCache(FileCache):
+    """Compressed outputs, kept between builds.
+
+    Keyed by a hash of the output and the compression, so an unchanged
+    output isn't compressed again.
+    """
+
+    def __init__(self, cache_dir, maxsize=COMPRESSED_CACHE_SIZE):
+        FileCache.__init__(self, cache_dir, maxsize)
+
+    def read(self, path):
+        return path.read_binary()
+
+    def write(self, path, data):
+        path.write_binary(data, ensure=True)
+
+    def compress(self, data, compression):
+        key = '{}.{}'.format(hash_bytes(data), compression)
+        compressed = self.get(key)
+        if compressed is None:
+            compressed = COMPRESSORS[compression](data)
+            self.put(key, compressed)
+        return compressed
+
+
+class Compressor(object):
+    """Writes precompressed sidecars of outputs, eg. index.html.gz next to
+    index.html, for a static server to send as they are."""
+
+    def __init__(self, compressions=(GZIP,), min_size=MIN_SIZE, cache=None):
+        self.compressions = check_compressions(compressions)
+        self.min_size = min_size
+        self.cache = cache
+
+    def get_sidecars(self, path, data):
+        """Get the paths of the sidecars of data, which is to be written to
+        path."""
+        if len(data) < self.min_size:
+            return []
+        return [path.new(basename='{}.{}'.format(path.basename, compression))
+                for compression in self.compressions]
+
+    def write_sidecars(self, path, data):
+        sidecars = self.get_sidecars(path, data)
+        for sidecar, compression in zip(sidecars, self.compressions):
+            if self.cache is None:
+                compressed = COMPRESSORS[compression](data)
+            else:
+                compressed = self.cache.compress(data, compression)
+            write_file(sidecar, compressed)
+        return sidecars
+
+    def compress_file(self, path):
+        return self.write_sidecars(path, path.read_binary())
@@ -1,13 +1,16 @@
 from copy import copy
 import logging
 
-import mistune
 import six
 
+from .cache import FileCache
+from .lazy import lazy_import
 from .spec import ensure_spec
-from .log import WRAPPER
-from .orderedyaml import OrderedYaml
+from .manifest import hash_text
 from .error import JmdwebsitesError
+from .trace import trace, Dump, CONTENT
+
+mistune = lazy_import('mistune')
 
 class ContentError(JmdwebsitesError): pass
 class MissingVarsError(ContentError): pass
@@ -17,8 +20,19 @@ class ContentFileError(ContentError): pass
 class UnusedContentError(ContentError): pass
 
 KEEP_FILE = '.keep'
+MARKDOWN_CACHE_SIZE = 64 * 1024 * 1024
 logger = logging.getLogger(__name__)
 
+# The default renderer, made on first use rather than on import
+_markdown = None
+
+
+def get_markdown():
+    global _markdown
+    if _markdown is None:
+        _markdown = mistune.Markdown()
+    return _markdown
+
 
 class FileFilter:
 
@@ -43,6 +57,33 @@ class FileFilter:
         return allow
 
 
+def get_markdown_config(markdown):
+    renderer = markdown.renderer
+    return u'mistune {} {}.{} {!r}'.format(
+        mistune.__version__, type(renderer).__module__,
+        type(renderer).__name__, sorted(renderer.options.items()))
+
+
+class MarkdownCache(FileCache):
+    """Html rendered from markdown, kept between builds.
+
+    Keyed by a hash of the markdown and the renderer config, so an edit
+    to a file, or a change of renderer, is a miss.
+    """
+
+    def __init__(self, cache_dir, maxsize=MARKDOWN_CACHE_SIZE):
+        FileCache.__init__(self, cache_dir, maxsize)
+
+    def render(self, text, markdown):
+        key = hash_text(get_markdown_config(markdown) + u'\n' + text)
+        html = self.get(key)
+        if html is None:
+            # Empty markdown renders as a byte string
+            html = six.text_type(markdown(text))
+            self.put(key, html)
+        return html
+
+
 def get_vars(spec, name):
     spec = ensure_spec(spec, (name,))
     vars = spec[name]
@@ -55,16 +96,30 @@ def get_vars(spec, name):
 
 def get_content(source_dir,
                 fil=FileFilter('_', ['.html','.md']),
-                markdown=mistune.Markdown()):
+                markdown=None,
+                deps=None,
+                markdown_cache=None,
+                index=None):
     logger.debug('Get content from %s', source_dir)
+    if markdown is None:
+        markdown = get_markdown()
     source_content = {}
-    for path in source_dir.visit(fil=fil):
+    if index is None:
+        paths = source_dir.visit(fil=fil)
+    else:
+        paths = index.find_files(source_dir, fil=fil)
+    for path in paths:
+        if deps is not None:
+            deps.add_file(path)
         part_name = path.purebasename.lstrip('_')
         text = path.read_text(encoding='utf-8')
         if path.ext == '.html':
             html = text
         elif path.ext == '.md':
-            html = markdown(text)
+            if markdown_cache is None:
+                html = markdown(text)
+            else:
+                html = markdown_cache.render(text, markdown)
         else:
             raise ContentFileError('Invalid file type: {}'.format(path), 2)
         logger.info("Get content from file: %s", path)
@@ -104,7 +159,7 @@ def merge_content(source_content, spec=None):
     if 'navlinks' in spec:
         content.update(spec['navlinks'])
         logger.debug('content: %s: Updated with navlinks', content.keys())
-    logger.debug('content:' + WRAPPER, OrderedYaml(content))
+    trace(CONTENT, 'Content', Dump(content))
 
     return content
 
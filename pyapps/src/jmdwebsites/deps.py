@@ -0,0 +1,125 @@
+import logging
+
+from .error import JmdwebsitesError
+from .manifest import file_finder, hash_file, hash_spec, hash_text, \
+    IGNORE_FILES
+from .spec import ancestry, get_spec, SpecError
+
+class DependencyError(JmdwebsitesError): pass
+
+logger = logging.getLogger(__name__)
+
+FILE = 'file'
+FILES = 'files'
+ALL_FILES = '*'
+PAGES = 'pages'
+PARTIALS = 'partials'
+
+
+def get_dep(*parts):
+    return ':'.join(parts)
+
+
+def split_dep(dep):
+    type_, _, name = dep.partition(':')
+    return type_, name
+
+
+class Dependencies(object):
+    """The inputs a page is built from, in the order they are used.
+
+    Spec deps are named <type>:<name>, one for each spec in the
+    inherit: chain, except for partials, which are named
+    partials:<name>:<partial> for each partial used by the page layout.
+    File deps are named file:<path relative to the page source dir>, and
+    files:* stands for the list of files in the page source dir.
+    """
+
+    def __init__(self, source_dir):
+        self.source_dir = source_dir
+        self.names = {}
+        self.keys = []
+        self.add(FILES, ALL_FILES)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, *parts):
+        dep = get_dep(*parts)
+        if dep not in self.keys:
+            self.keys.append(dep)
+
+    def add_spec(self, type_, name, root):
+        self.names[type_] = name
+        if type_ == PARTIALS:
+            # Only the partials actually used are deps
+            return
+        for ancestor in ancestry(name, root):
+            self.add(type_, ancestor)
+
+    def add_partial(self, partial_name):
+        self.add(PARTIALS, self.names.get(PARTIALS, ''), partial_name)
+
+    def add_file(self, path):
+        self.add(FILE, path.relto(self.source_dir))
+
+
+class DependencyHasher(object):
+    """Hash the current state of page deps.
+
+    Spec deps are shared by many pages, so their hashes are kept for the
+    whole build. File deps are hashed every time, unless there is a scan
+    index that still has their hash.
+    """
+
+    def __init__(self, specs, index=None):
+        self.specs = specs
+        self.index = index
+        self._hashes = {}
+        self._partials = {}
+
+    def get_inputs(self, deps, source_dir):
+        return dict((dep, self.hash(dep, source_dir)) for dep in deps)
+
+    def hash(self, dep, source_dir):
+        type_, name = split_dep(dep)
+        if type_ == FILE:
+            path = source_dir.join(name)
+            if self.index is not None:
+                return self.index.hash_file(path)
+            if not path.check(file=1):
+                return None
+            return hash_file(path)
+        if type_ == FILES:
+            if self.index is None:
+                paths = file_finder(source_dir)
+            else:
+                paths = self.index.find_files(source_dir, sort=True,
+                                              ignore=IGNORE_FILES)
+            paths = [path.relto(source_dir) for path in paths]
+            return hash_text(u'\n'.join(paths))
+        if dep not in self._hashes:
+            self._hashes[dep] = self.hash_spec(type_, name)
+        return self._hashes[dep]
+
+    def hash_spec(self, type_, name):
+        try:
+            root = self.specs[type_]
+        except (KeyError, TypeError):
+            return None
+        if type_ == PARTIALS:
+            name, _, partial_name = name.rpartition(':')
+            if name not in self._partials:
+                try:
+                    self._partials[name] = get_spec(name, root)
+                except (KeyError, TypeError, SpecError) as e:
+                    logger.debug('Partials not found: %s: %s', name, e)
+                    self._partials[name] = {}
+            return hash_spec(self._partials[name].get(partial_name))
+        try:
+            return hash_spec(root[name])
+        except (KeyError, TypeError):
+            return None
@@ -2,44 +2,85 @@ from __future__  import print_function
 import logging
 import re
 
-from bs4 import BeautifulSoup
+from .htmlminifier import minify
+from .lazy import lazy_import
+from .writer import write_file
+
+bs4 = lazy_import('bs4')
+htmlformatter = lazy_import('jmdwebsites.htmlformatter')
 
 onespace_regexp = re.compile(r'^(\s*)', re.MULTILINE)
 
 logger = logging.getLogger(__name__)
 
+HTML5LIB = 'html5lib'
+FAST = 'fast'
+NONE = 'none'
+MINIFY = 'minify'
+FORMATTERS = (FAST, HTML5LIB, NONE, MINIFY)
+
 
-class MyBeautifulSoup(BeautifulSoup):
-    def __init__(self, html_doc, html_parser, *args, **kwargs):
-        BeautifulSoup.__init__(self, html_doc, html_parser, *args, **kwargs)
-        # html5lib adds a head, html and body to docs without them, 
-        # so remove if not in original doc
-        if html_parser == 'html5lib':
-            if html_doc.find('<head') < 0:
-                self.find('head').decompose()
-            if html_doc.find('<html') < 0:
-                self.find('html').unwrap()
-            if html_doc.find('<body') < 0:
-                self.find('body').unwrap()
+def partial_soup(html_doc, html_parser='html5lib'):
+    soup = bs4.BeautifulSoup(html_doc, html_parser)
+    # html5lib adds a head, html and body to docs without them, 
+    # so remove if not in original doc
+    if html_parser == 'html5lib':
+        if html_doc.find('<head') < 0:
+            soup.find('head').decompose()
+        if html_doc.find('<html') < 0:
+            soup.find('html').unwrap()
+        if html_doc.find('<body') < 0:
+            soup.find('body').unwrap()
+    return soup
 
 
 def prettify(html_doc, start_tag_name=None, partial=False, indent=2):
     if partial:
-        soup = MyBeautifulSoup(html_doc, 'html5lib')
+        soup = partial_soup(html_doc, 'html5lib')
     else:
-        soup = BeautifulSoup(html_doc, 'html5lib')
+        soup = bs4.BeautifulSoup(html_doc, 'html5lib')
+    return reindent(soup.prettify(), indent)
+
+
+def reindent(pretty_html, indent=2):
     if indent == 0 or indent > 1:
         indent = r''.join(r'\1' for n in range(indent))
-        return onespace_regexp.sub(indent, soup.prettify())
+        return onespace_regexp.sub(indent, pretty_html)
     else:
-        return soup.prettify()
+        return pretty_html
+
+
+def fast_prettify(html_doc, indent=2):
+    """Prettify a doc without building a tree, if the doc is simple enough.
+
+    Gives the same output as prettify(), which it falls back to for docs
+    the streaming formatter doesn't support.
+    """
+    try:
+        pretty_html = htmlformatter.prettify(html_doc)
+    except htmlformatter.UnsupportedHtmlError as e:
+        logger.debug('Fast formatter not supported, use html5lib: %s', e)
+        return prettify(html_doc, indent=indent)
+    return reindent(pretty_html, indent)
+
+
+def format_html(html_doc, formatter=HTML5LIB, indent=2):
+    if formatter == NONE:
+        return html_doc
+    if formatter == MINIFY:
+        return minify(html_doc)
+    if formatter == FAST:
+        return fast_prettify(html_doc, indent=indent)
+    return prettify(html_doc, indent=indent)
 
 
-def load(source_dir):
+def load(source_dir, deps=None):
     #TODO: Decide how to handle index.php files
     filepath = source_dir.join('index.html')
     if filepath.check(file=1):
         logger.debug("Get html index page %s", filepath)
+        if deps is not None:
+            deps.add_file(filepath)
         html_text = filepath.read_text(encoding='utf-8') 
         #TODO: Validate that the file is unicode and that the html is ok
         #      May need to check charset and reload with different encoding
@@ -47,8 +88,18 @@ def load(source_dir):
     return None
 
 
-def dump(html_text, target_dir):
+def dump(html_text, target_dir, writer=None, compressor=None):
+    """Write the html, in the background if there is a writer, unless the
+    file holds it already. Returns the files written, including any
+    compressed sidecars."""
     target_file = target_dir.join('index.html') 
-    target_file.write_text(html_text, ensure=True, encoding='utf-8')
+    data = html_text.encode('utf-8')
+    if writer is not None:
+        return writer.write(target_file, data, compressor)
+    target_dir.ensure(dir=1)
+    write_file(target_file, data)
+    if compressor is None:
+        return [target_file]
+    return [target_file] + compressor.write_sidecars(target_file, data)
 
 
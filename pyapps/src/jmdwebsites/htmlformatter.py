@@ -0,0 +1,270 @@
+import logging
+import re
+
+from bs4.dammit import EntitySubstitution
+from bs4.element import (AttributeValueWithCharsetSubstitution,
+    CharsetMetaAttributeValue, ContentMetaAttributeValue, whitespace_re)
+from html5lib.constants import (headingElements, namespaces, spaceCharacters,
+    specialElements)
+import six
+from six.moves.html_entities import name2codepoint
+from six.moves.html_parser import HTMLParser
+
+from .error import JmdwebsitesError
+
+class HtmlFormatError(JmdwebsitesError): pass
+class UnsupportedHtmlError(HtmlFormatError): pass
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_ENCODING = 'utf-8'
+SPACES = u''.join(spaceCharacters)
+HEADING_TAGS = frozenset(headingElements)
+
+# Written as <tag/>, and never have an end tag
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'meta', 'param', 'source', 'track', 'wbr'])
+HEAD_TAGS = frozenset(['base', 'link', 'meta', 'title'])
+# Tags html5lib doesn't simply add to the tree where they are, or whose
+# content isn't parsed as html, or that bs4 doesn't print as they are.
+UNSUPPORTED_TAGS = frozenset([
+    'applet', 'basefont', 'bgsound', 'body', 'caption', 'col', 'colgroup',
+    'command', 'frame', 'frameset', 'head', 'html', 'iframe', 'image',
+    'isindex', 'listing', 'marquee', 'math', 'menuitem', 'nobr', 'noembed',
+    'noframes', 'noscript', 'object', 'optgroup', 'option', 'plaintext',
+    'pre', 'rb', 'rp', 'rt', 'rtc', 'ruby', 'script', 'select', 'spacer',
+    'style', 'svg', 'table', 'tbody', 'td', 'template', 'textarea', 'tfoot',
+    'th', 'thead', 'title', 'tr', 'xmp'])
+# Tags that close an open p
+P_CLOSING_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'center', 'dd', 'details',
+    'dialog', 'dir', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure',
+    'footer', 'form', 'header', 'hgroup', 'hr', 'li', 'main', 'menu', 'nav',
+    'ol', 'p', 'section', 'summary', 'ul']) | HEADING_TAGS
+# Tags that close an open tag of the same kind
+UNNESTED_TAGS = frozenset(['a', 'button', 'form'])
+LIST_ITEM_TAGS = {'li': ('li',), 'dd': ('dd', 'dt'), 'dt': ('dd', 'dt')}
+# Tags a search for an open list item doesn't go past
+LIST_ITEM_SCOPE_TAGS = frozenset(
+    name for namespace, name in specialElements
+    if namespace == namespaces['html']) - frozenset(['address', 'div', 'p'])
+# Attributes bs4 treats as lists of values
+LIST_ATTRIBUTES = {
+    '*': ('class', 'accesskey', 'dropzone'),
+    'a': ('rel', 'rev'),
+    'link': ('rel', 'rev'),
+}
+
+amp_regexp = re.compile(
+    r'&(?:#([0-9]+);|#[xX]([0-9a-fA-F]+);|([A-Za-z][A-Za-z0-9]*);|(?![#A-Za-z0-9]))')
+unsupported_char_regexp = re.compile(u'[\r\x00]')
+
+
+def check_char_code(code):
+    # Codes html5lib replaces, or that may not be a single character
+    if code in (9, 10, 12) or 0x20 <= code < 0x7f or 0xa0 <= code < 0xd800 or \
+            0xe000 <= code <= 0xfffd:
+        return code
+    raise UnsupportedHtmlError('Character reference: {}'.format(code))
+
+
+def check_references(html_doc):
+    """Check that html5lib and HTMLParser would read & the same way."""
+    pos = 0
+    for match in amp_regexp.finditer(html_doc):
+        if match.start() != html_doc.find(u'&', pos):
+            break
+        pos = match.end()
+        decimal, hexadecimal, name = match.groups()
+        if decimal:
+            check_char_code(int(decimal))
+        elif hexadecimal:
+            check_char_code(int(hexadecimal, 16))
+        elif name and name not in name2codepoint:
+            raise UnsupportedHtmlError('Entity reference: {}'.format(name))
+    if html_doc.find(u'&', pos) >= 0:
+        raise UnsupportedHtmlError(
+            'Ambiguous &: {!r}'.format(html_doc[pos:pos + 20]))
+
+
+def format_attrs(tag, attrs):
+    values = {}
+    for name, value in attrs:
+        # html5lib keeps the first of repeated attributes
+        if name not in values:
+            values[name] = u'' if value is None else value
+    if tag == 'meta':
+        if 'charset' in values:
+            values['charset'] = CharsetMetaAttributeValue(values['charset'])
+        elif 'content' in values and \
+                values.get('http-equiv', u'').lower() == 'content-type':
+            values['content'] = ContentMetaAttributeValue(values['content'])
+    list_attributes = LIST_ATTRIBUTES['*'] + LIST_ATTRIBUTES.get(tag, ())
+    parts = []
+    for name, value in sorted(values.items()):
+        if name in list_attributes:
+            value = u' '.join(whitespace_re.split(value))
+        elif isinstance(value, AttributeValueWithCharsetSubstitution):
+            value = value.encode(OUTPUT_ENCODING)
+        value = EntitySubstitution.substitute_xml(value)
+        parts.append(name + u'=' + EntitySubstitution.quoted_attribute_value(value))
+    if not parts:
+        return u''
+    return u' ' + u' '.join(parts)
+
+
+class StreamingFormatter(HTMLParser):
+    """Pretty print an html doc in one pass, without building a tree.
+
+    The output is the same as BeautifulSoup(html_doc, 'html5lib').prettify()
+    for docs html5lib would parse as they are written: a doctype, then
+    html, head and body with explicit end tags, and every other tag closed
+    where it is opened. Anything html5lib would move, close or treat as
+    text, eg. tables, scripts and pre, raises UnsupportedHtmlError.
+    """
+
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.stack = []
+        self.out = []
+        self.text = []
+        self.doctype = False
+        self.head = False
+        self.body = False
+        self.done = False
+
+    def format(self, html_doc):
+        if unsupported_char_regexp.search(html_doc):
+            raise UnsupportedHtmlError('Carriage return or null character')
+        check_references(html_doc)
+        try:
+            self.feed(html_doc)
+            self.close()
+        except UnsupportedHtmlError:
+            raise
+        except Exception as e:
+            raise UnsupportedHtmlError('Parse error: {}'.format(e))
+        self.flush_text()
+        if not self.done:
+            raise UnsupportedHtmlError('No </html>')
+        # bs4 doesn't end the last tag with a newline
+        return u''.join(self.out)[:-1]
+
+    def emit(self, text):
+        self.out.append(u' ' * len(self.stack) + text + u'\n')
+
+    def unsupported(self, what):
+        raise UnsupportedHtmlError('{} at line {}, column {}'.format(
+            what, *self.getpos()))
+
+    def flush_text(self):
+        if not self.text:
+            return
+        text = u''.join(self.text)
+        self.text = []
+        if (not self.stack or self.stack[-1] in ('html', 'head')) and \
+                text.strip(SPACES):
+            self.unsupported('Text outside body')
+        text = EntitySubstitution.substitute_xml(text).strip()
+        if text:
+            self.emit(text)
+
+    def check_start(self, tag):
+        stack = self.stack
+        if not stack:
+            if tag != 'html' or self.done:
+                self.unsupported('<{}> outside html'.format(tag))
+            return
+        current = stack[-1]
+        if current == 'html':
+            if tag == 'head' and not self.head:
+                self.head = True
+            elif tag == 'body' and self.head and not self.body:
+                self.body = True
+            else:
+                self.unsupported('<{}> outside head and body'.format(tag))
+            return
+        if current == 'head':
+            if tag not in HEAD_TAGS:
+                self.unsupported('<{}> in head'.format(tag))
+            return
+        if current == 'title' or tag in UNSUPPORTED_TAGS:
+            self.unsupported('<{}>'.format(tag))
+        if tag in P_CLOSING_TAGS and 'p' in stack:
+            self.unsupported('<{}> in <p>'.format(tag))
+        if tag in HEADING_TAGS and current in HEADING_TAGS:
+            self.unsupported('<{}> in <{}>'.format(tag, current))
+        if tag in UNNESTED_TAGS and tag in stack:
+            self.unsupported('<{}> in <{}>'.format(tag, tag))
+        if tag in LIST_ITEM_TAGS:
+            for name in reversed(stack):
+                if name in LIST_ITEM_TAGS[tag]:
+                    self.unsupported('<{}> in <{}>'.format(tag, name))
+                if name in LIST_ITEM_SCOPE_TAGS:
+                    break
+
+    def start(self, tag, attrs, empty=False):
+        self.flush_text()
+        self.check_start(tag)
+        if tag in VOID_TAGS:
+            self.emit(u'<{}{}/>'.format(tag, format_attrs(tag, attrs)))
+            return
+        if empty:
+            self.unsupported('<{}/>'.format(tag))
+        self.emit(u'<{}{}>'.format(tag, format_attrs(tag, attrs)))
+        self.stack.append(tag)
+
+    def handle_starttag(self, tag, attrs):
+        self.start(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self.start(tag, attrs, empty=True)
+
+    def handle_endtag(self, tag):
+        self.flush_text()
+        if not self.stack or self.stack[-1] != tag or \
+                tag == 'html' and not self.body:
+            self.unsupported('</{}>'.format(tag))
+        self.stack.pop()
+        self.emit(u'</{}>'.format(tag))
+        if tag == 'html':
+            self.done = True
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_entityref(self, name):
+        self.text.append(six.unichr(name2codepoint[name]))
+
+    def handle_charref(self, name):
+        if name[0] in 'xX':
+            code = int(name[1:], 16)
+        else:
+            code = int(name)
+        self.text.append(six.unichr(check_char_code(code)))
+
+    def handle_comment(self, data):
+        self.flush_text()
+        if self.done or self.stack[-1:] == ['title']:
+            self.unsupported('Comment')
+        self.emit(u'<!--' + data + u'-->')
+
+    def handle_decl(self, decl):
+        self.flush_text()
+        if decl.lower().split() != ['doctype', 'html'] or \
+                self.doctype or self.stack or self.done:
+            self.unsupported('<!{}>'.format(decl))
+        self.doctype = True
+        self.emit(u'<!DOCTYPE html>')
+
+    def unknown_decl(self, data):
+        self.unsupported('<![{}]>'.format(data))
+
+    def handle_pi(self, data):
+        self.unsupported('<?{}>'.format(data))
+
+
+def prettify(html_doc):
+    """Pretty print an html doc as bs4 does, with one space indents."""
+    return StreamingFormatter().format(html_doc)
@@ -0,0 +1,213 @@
+import logging
+import re
+
+import six
+from six.moves.html_parser import HTMLParser
+
+from .error import JmdwebsitesError
+
+class HtmlMinifyError(JmdwebsitesError): pass
+
+logger = logging.getLogger(__name__)
+
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'])
+# Whitespace around these isn't rendered, so is dropped. Not li, link and
+# meta, as they can be inline, eg. the items of a nav styled as a row.
+BLOCK_TAGS = frozenset([
+    'address', 'article', 'aside', 'base', 'blockquote', 'body', 'caption',
+    'center', 'col', 'colgroup', 'dd', 'details', 'dialog', 'dir', 'div',
+    'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1',
+    'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header', 'hgroup', 'hr', 'html',
+    'main', 'menu', 'nav', 'ol', 'optgroup', 'option', 'p', 'pre',
+    'section', 'style', 'summary', 'table', 'tbody', 'td', 'tfoot', 'th',
+    'thead', 'title', 'tr', 'ul'])
+# Whitespace in these is kept as it is
+PRE_TAGS = frozenset(['pre', 'textarea', 'script', 'style'])
+P_CLOSING_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu', 'nav', 'ol',
+    'p', 'pre', 'section', 'table', 'ul'])
+# End tags that can be left out if the next tag is one of these start tags
+END_OMITTED_BEFORE = {
+    'head': frozenset(['body']),
+    'li': frozenset(['li']),
+    'dt': frozenset(['dt', 'dd']),
+    'dd': frozenset(['dt', 'dd']),
+    'p': P_CLOSING_TAGS,
+    'option': frozenset(['option', 'optgroup']),
+    'optgroup': frozenset(['optgroup']),
+    'thead': frozenset(['tbody', 'tfoot']),
+    'tbody': frozenset(['tbody', 'tfoot']),
+    'tr': frozenset(['tr']),
+    'td': frozenset(['td', 'th']),
+    'th': frozenset(['td', 'th']),
+}
+# End tags that can be left out if the next tag is the end of the parent
+END_OMITTED_AT_END = frozenset([
+    'body', 'html', 'li', 'dd', 'p', 'option', 'optgroup', 'tbody', 'tfoot',
+    'tr', 'td', 'th'])
+# A p in these has to be closed, eg. so the text after it in an a is not
+# taken to be in the p
+P_KEPT_PARENTS = frozenset(['a', 'audio', 'del', 'ins', 'map', 'noscript',
+                            'video'])
+
+whitespace_regexp = re.compile(r'[ \t\n\r\f]+')
+unquoted_regexp = re.compile(r'^[^ \t\n\r\f"\'=<>`]+$')
+# Conditional comments are markup for old browsers, so are kept
+conditional_comment_regexp = re.compile(r'^\[if\b|<!\[endif\]$')
+
+
+def format_attr(name, value, quote=False):
+    if value is None:
+        return u' ' + name
+    value = value.replace(u'&', u'&amp;')
+    if not quote and unquoted_regexp.match(value):
+        return u' {}={}'.format(name, value)
+    return u' {}="{}"'.format(name, value.replace(u'"', u'&quot;'))
+
+
+class HtmlMinifier(HTMLParser):
+    """Minify an html doc in one pass, without changing how it renders.
+
+    Comments are dropped, runs of whitespace are collapsed, and dropped
+    where they aren't rendered, except in pre, textarea, script and style.
+    End tags the html spec says can be left out are left out, and
+    attributes lose the quotes they don't need.
+    """
+
+    def __init__(self):
+        if six.PY3:
+            # Keep references in text as they are written
+            HTMLParser.__init__(self, convert_charrefs=False)
+        else:
+            HTMLParser.__init__(self)
+        self.stack = []
+        self.out = []
+        self.text = []
+        # An end tag that might be left out, depending on what comes next
+        self.pending = None
+        self.after_block = True
+
+    def minify(self, html_doc):
+        try:
+            self.feed(html_doc)
+            self.close()
+        except Exception as e:
+            raise HtmlMinifyError('Parse error: {}'.format(e))
+        self.boundary(None, end=True)
+        return u''.join(self.out)
+
+    def take_text(self, before_block):
+        text = u''.join(self.text)
+        self.text = []
+        if not text:
+            return text
+        if any(tag in PRE_TAGS for tag in self.stack):
+            return text
+        if self.stack and self.stack[-1] == 'head' and not text.strip():
+            # Not rendered, as the head isn't, eg. between meta and link
+            return u''
+        text = whitespace_regexp.sub(u' ', text)
+        if self.after_block:
+            text = text.lstrip(u' ')
+        if before_block:
+            text = text.rstrip(u' ')
+        return text
+
+    def can_omit(self, pending, tag, end):
+        if not end:
+            return tag in END_OMITTED_BEFORE.get(pending, ())
+        if pending not in END_OMITTED_AT_END:
+            return False
+        parent = self.stack[-1] if self.stack else None
+        # The end of the doc ends html, body and any list or p in them
+        if tag is not None and tag != parent:
+            return False
+        return pending != 'p' or parent not in P_KEPT_PARENTS
+
+    def boundary(self, tag, end=False, other=False):
+        """Write the text and any pending end tag before the next tag, or
+        comment, or the end of the doc when tag is None."""
+        before_block = tag is None or tag in BLOCK_TAGS
+        text = self.take_text(before_block and not other)
+        if self.pending is not None:
+            if text or other or not self.can_omit(self.pending, tag, end):
+                self.out.append(u'</{}>'.format(self.pending))
+            self.pending = None
+        if text:
+            self.out.append(text)
+            self.after_block = False
+
+    def emit_tag(self, tag, text):
+        self.out.append(text)
+        self.after_block = tag in BLOCK_TAGS
+
+    def start(self, tag, attrs, empty=False):
+        self.boundary(tag)
+        if empty and tag not in VOID_TAGS:
+            # Only self closing in svg and math, but keep it as written,
+            # with quotes, so the / isn't read as part of a value
+            attrs = u''.join(format_attr(name, value, quote=True)
+                             for name, value in attrs)
+            self.emit_tag(tag, u'<{}{}/>'.format(tag, attrs))
+            return
+        attrs = u''.join(format_attr(name, value) for name, value in attrs)
+        self.emit_tag(tag, u'<{}{}>'.format(tag, attrs))
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_starttag(self, tag, attrs):
+        self.start(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self.start(tag, attrs, empty=True)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        self.boundary(tag, end=True)
+        if tag in self.stack:
+            index = len(self.stack) - 1 - self.stack[::-1].index(tag)
+            del self.stack[index:]
+        if tag in END_OMITTED_AT_END or tag in END_OMITTED_BEFORE:
+            self.pending = tag
+            self.after_block = tag in BLOCK_TAGS
+        else:
+            self.emit_tag(tag, u'</{}>'.format(tag))
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_entityref(self, name):
+        self.text.append(u'&{};'.format(name))
+
+    def handle_charref(self, name):
+        self.text.append(u'&#{};'.format(name))
+
+    def handle_comment(self, data):
+        if conditional_comment_regexp.search(data):
+            self.boundary(None, other=True)
+            self.out.append(u'<!--{}-->'.format(data))
+            self.after_block = False
+
+    def handle_decl(self, decl):
+        self.boundary(None, other=True)
+        self.out.append(u'<!{}>'.format(decl))
+        self.after_block = True
+
+    def unknown_decl(self, data):
+        self.boundary(None, other=True)
+        self.out.append(u'<![{}]>'.format(data))
+        self.after_block = False
+
+    def handle_pi(self, data):
+        self.boundary(None, other=True)
+        self.out.append(u'<?{}>'.format(data))
+        self.after_block = False
+
+
+def minify(html_doc):
+    return HtmlMinifier().minify(html_doc)
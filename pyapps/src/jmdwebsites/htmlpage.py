@@ -1,6 +1,8 @@
 import logging
 
-import bs4 as bs
+from .lazy import lazy_import
+
+bs = lazy_import('bs4')
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,20 @@
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """A stand in for a module, which imports it on first use."""
+
+    def __getattr__(self, name):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+def lazy_import(name):
+    """Import a module when one of its attributes is first used.
+
+    For the heavy dependencies, so the commands that don't use them
+    start fast.
+    """
+    return LazyModule(name)
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+
+import py
+
+from . import __version__
+from .error import JmdwebsitesError
+
+class ManifestError(JmdwebsitesError): pass
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 2
+IGNORE_FILES = set(['.keep', '.DS_Store'])
+
+
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def hash_text(text):
+    return hash_bytes(text.encode('utf-8'))
+
+
+def hash_file(path):
+    return hash_bytes(path.read_binary())
+
+
+def hash_spec(spec):
+    # Specs are ordered maps, and order matters for the rendered page,
+    # so don't sort the keys.
+    text = json.dumps(spec, default=str, separators=(',', ':'))
+    return hash_bytes(text.encode('utf-8'))
+
+
+def file_finder(source_dir, fil=None, ignore=IGNORE_FILES):
+    if not source_dir.check(dir=1):
+        return
+    for path in source_dir.visit(fil=fil, sort=True):
+        if path.basename in ignore or not path.check(file=1):
+            continue
+        yield path
+
+
+def hash_files(source_dir, fil=None, ignore=IGNORE_FILES):
+    hashes = {}
+    for path in file_finder(source_dir, fil=fil, ignore=ignore):
+        hashes['file:' + path.relto(source_dir)] = hash_file(path)
+    return hashes
+
+
+class BuildManifest(object):
+    """Record of the inputs and outputs of each build target.
+
+    A target is a page url or a stylesheet. Each target records the hashes
+    of the inputs it was built from and the output files written to the
+    build dir, so the next build only rebuilds the targets whose inputs
+    have changed, and removes the outputs of targets that have gone.
+    """
+
+    def __init__(self, filepath, build_dir, options=None):
+        self.filepath = py.path.local(filepath)
+        self.build_dir = py.path.local(build_dir)
+        self.options = {} if options is None else options.as_dict()
+        self.targets = {}
+        self.current = {}
+
+    def load(self):
+        """Load the manifest of the previous build if it is still valid."""
+        if not self.filepath.check(file=1):
+            logger.info('No build manifest: %s', self.filepath)
+            return False
+        try:
+            data = json.loads(self.filepath.read_text(encoding='utf-8'))
+        except ValueError as e:
+            logger.warning('Invalid build manifest: %s: %s', self.filepath, e)
+            return False
+        if data.get('version') != MANIFEST_VERSION or \
+                data.get('jmdwebsites') != __version__:
+            logger.info('Build manifest out of date: %s', self.filepath)
+            return False
+        if data.get('build_dir') != self.build_dir.strpath:
+            logger.info('Build manifest is for another build dir: %s',
+                data.get('build_dir'))
+            return False
+        if data.get('options', {}) != self.options:
+            logger.info('Build options changed: %s', self.options)
+            return False
+        self.targets = data.get('targets', {})
+        logger.info('Load build manifest: %s', self.filepath)
+        return True
+
+    def dump(self):
+        data = {
+            'version': MANIFEST_VERSION,
+            'jmdwebsites': __version__,
+            'build_dir': self.build_dir.strpath,
+            'options': self.options,
+            'targets': self.current,
+        }
+        text = json.dumps(data, indent=1, sort_keys=True)
+        self.filepath.write_text(text + u'\n', ensure=True, encoding='utf-8')
+        logger.info('Dump build manifest: %s', self.filepath)
+
+    def remove(self):
+        if self.filepath.check():
+            logger.info('Remove build manifest: %s', self.filepath)
+            self.filepath.remove()
+
+    def next_build(self, partial=False):
+        """Start another build, with this build as the previous one.
+
+        A partial build only checks some of the targets, so the rest are
+        kept as they are.
+        """
+        self.targets = self.current
+        self.current = dict(self.targets) if partial else {}
+
+    def get_inputs(self, target):
+        """Get the names of the inputs target was built from last time."""
+        entry = self.targets.get(target)
+        if entry is None:
+            return []
+        return sorted(entry['inputs'])
+
+    def is_current(self, target, inputs):
+        """Check if target was built from the same inputs last time."""
+        entry = self.targets.get(target)
+        if entry is None or entry['inputs'] != inputs:
+            return False
+        for relpath in entry['outputs']:
+            if not self.build_dir.join(relpath).check(file=1):
+                logger.debug('Output missing: %s: %s', target, relpath)
+                return False
+        self.current[target] = entry
+        return True
+
+    def update(self, target, inputs, outputs):
+        outputs = sorted(path.relto(self.build_dir) for path in outputs)
+        entry = self.targets.get(target)
+        if entry is not None:
+            self._remove_outputs(o for o in entry['outputs'] if o not in outputs)
+        self.current[target] = {'inputs': inputs, 'outputs': outputs}
+
+    def remove_stale(self):
+        """Remove the outputs of targets not built or checked this time."""
+        for target, entry in sorted(self.targets.items()):
+            if target not in self.current:
+                logger.info('Remove stale target: %s', target)
+                self._remove_outputs(entry['outputs'])
+
+    def _remove_outputs(self, relpaths):
+        for relpath in relpaths:
+            path = self.build_dir.join(relpath)
+            if path.check(file=1):
+                logger.info('Remove %s', path)
+                path.remove()
+            # Tidy up any dirs left empty
+            dirpath = path.dirpath()
+            while dirpath != self.build_dir and dirpath.check(dir=1) and \
+                    not dirpath.listdir():
+                dirpath.remove()
+                dirpath = dirpath.dirpath()
@@ -0,0 +1,55 @@
+from .compress import check_compressions, MIN_SIZE
+from .error import JmdwebsitesError
+from .html import FORMATTERS, HTML5LIB, MINIFY
+from .render import ENGINES, FORMAT
+
+class OptionError(JmdwebsitesError): pass
+
+# Defaults of the watch and serve commands
+POLL_INTERVAL = 0.5
+HOST = 'localhost'
+PORT = 8000
+
+# Readable output, or minified output for production
+DEVELOPMENT = 'development'
+PRODUCTION = 'production'
+MODES = (DEVELOPMENT, PRODUCTION)
+
+
+def check_choice(name, value, choices):
+    if value not in choices:
+        raise OptionError('Invalid {}: {}: Must be one of: {}'.format(
+            name, value, ', '.join(choices)))
+    return value
+
+
+class BuildOptions(object):
+    """Options for how pages are built.
+
+    Changing an option changes the output, so the build manifest records
+    them, and a build with different options rebuilds everything.
+    """
+
+    def __init__(self, engine=FORMAT, formatter=HTML5LIB, compress=(),
+                 compress_min_size=MIN_SIZE, mode=DEVELOPMENT):
+        self.mode = check_choice('mode', mode, MODES)
+        self.engine = check_choice('engine', engine, ENGINES)
+        # Production builds minify, whatever the formatter
+        if mode == PRODUCTION:
+            formatter = MINIFY
+        self.formatter = check_choice('formatter', formatter, FORMATTERS)
+        self.compress = check_compressions(compress)
+        self.compress_min_size = compress_min_size
+
+    def __eq__(self, other):
+        return isinstance(other, BuildOptions) and vars(self) == vars(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, ', '.join(
+            '{}={!r}'.format(name, value) for name, value in sorted(vars(self).items())))
+
+    def as_dict(self):
+        return dict(vars(self))
@@ -3,8 +3,70 @@ from __future__ import print_function
 import py
 import ruamel
 from ruamel.yaml.comments import CommentedMap, CommentedSeq, ordereddict
+from ruamel.yaml.constructor import SafeConstructor
+from ruamel.yaml.resolver import VersionedResolver
 import six
 
+try:
+    from ruamel.yaml import CParser
+except ImportError:
+    CParser = None
+
+# The version the RoundTripLoader reads scalars as, eg. yes and 010 are a
+# string and 10, where YAML 1.1 has True and 8
+YAML_VERSION = (1, 2)
+
+
+if CParser is None:
+    from ruamel.yaml import SafeLoader as BaseFastLoader
+else:
+    class BaseFastLoader(CParser, SafeConstructor, VersionedResolver):
+        """The CSafeLoader, but with the resolver of the RoundTripLoader."""
+
+        def __init__(self, stream, version=None, preserve_quotes=None):
+            CParser.__init__(self, stream)
+            self._parser = self._composer = self
+            SafeConstructor.__init__(self, loader=self)
+            VersionedResolver.__init__(self, version, loader=self)
+
+        @property
+        def processing_version(self):
+            # libyaml doesn't give the %YAML version of a document
+            return self._loader_version or YAML_VERSION
+
+
+def construct_map(loader, node):
+    data = CommentedMap()
+    yield data
+    loader.flatten_mapping(node)
+    for key_node, value_node in node.value:
+        key = loader.construct_object(key_node, deep=True)
+        data[key] = loader.construct_object(value_node, deep=True)
+
+
+def construct_seq(loader, node):
+    data = CommentedSeq()
+    yield data
+    data.extend(loader.construct_sequence(node, deep=True))
+
+
+def construct_str(loader, node):
+    return six.text_type(loader.construct_scalar(node))
+
+
+class FastLoader(BaseFastLoader):
+    """Load YAML into ordered CommentedMaps, without the comments.
+
+    Uses libyaml, if available. Much faster than the RoundTripLoader, for
+    reading specs, but the data can't be dumped back as it was. Scalars are
+    read as YAML 1.2, as the RoundTripLoader reads them.
+    """
+
+FastLoader.add_constructor(u'tag:yaml.org,2002:map', construct_map)
+FastLoader.add_constructor(u'tag:yaml.org,2002:omap', construct_map)
+FastLoader.add_constructor(u'tag:yaml.org,2002:seq', construct_seq)
+FastLoader.add_constructor(u'tag:yaml.org,2002:str', construct_str)
+
 
 class OrderedYaml(object):
 
@@ -1,13 +1,19 @@
+from copy import copy
 import logging
 
+import six
+
 from . import html
+from . import profiler
 from .content import get_content, merge_content
 from .data import get_data, get_object
+from .deps import Dependencies, DependencyHasher, PAGES
 from .error import JmdwebsitesError
-from .log import WRAPPER, WRAPPER_NL
-from .orderedyaml import OrderedYaml, CommentedMap
-from .spec import get_spec, spec_walker
+from .options import BuildOptions
+from .render import render, MissingKeyError, COMPILED
+from .spec import get_spec, ensure_spec, SpecMap
 from .template import get_template
+from .trace import trace, Dump, SPEC, RENDER
 
 class PageError(JmdwebsitesError): pass
 class SourceDirNotFoundError(PageError): pass
@@ -16,88 +22,252 @@ class NotFoundError(PageError): pass
 logger = logging.getLogger(__name__)
 
 DEBUG_SEPARATOR = '%%' * 60 + ' %s ' + '%%' * 60
+# The spec types a page is built from
+PAGE_SPEC_TYPES = ('layouts', 'partials', 'descriptions', 'content', 'vars',
+                   'data', 'navlinks', 'object')
+
+
+def navlink_finder(spec, keys=()):
+    for key, value in spec.items():
+        if value == 'navlink':
+            yield keys + (key,)
+        elif isinstance(value, dict):
+            for position in navlink_finder(value, keys + (key,)):
+                yield position
+
+
+def navlink_index(page_spec):
+    """Map the url of each nav link in page_spec to the positions of its
+    nav entries."""
+    index = {}
+    for position in navlink_finder(page_spec):
+        url = page_spec['navlinks'][position[-1]]
+        if isinstance(url, six.string_types):
+            index.setdefault(url, []).append(position)
+    return index
+
 
+def set_position(spec, position, value):
+    # The maps are shared with other pages, so only copy those on the way
+    # to the value, leaving the rest shared.
+    for key in position[:-1]:
+        spec[key] = copy(spec[key])
+        spec = spec[key]
+    spec[position[-1]] = value
+
+
+class PageSpecCache(object):
+    """Compiled page specs, shared by all the pages that use them.
+
+    Each sub-spec is resolved once per (type, name), and each page spec is
+    compiled once per name, with an empty map for any spec type it doesn't
+    have, along with an index of its nav links. Pages
+    with the same active nav links share a variant of the page spec, made
+    once, and get a shallow copy of it with their url overlaid.
+    """
+
+    def __init__(self, specs):
+        self.specs = specs
+        self.subspecs = {}
+        self.page_specs = {}
+        self.variants = {}
+
+    def get_subspec(self, type_, name):
+        try:
+            return self.subspecs[type_, name]
+        except KeyError:
+            pass
+        logger.debug('Get subspec: %r: %r', type_, name)
+        subspec = get_spec(name, self.specs[type_])
+        self.subspecs[type_, name] = subspec
+        return subspec
 
-def get_page_spec(url, specs):
+    def get_page_spec(self, name):
+        try:
+            return self.page_specs[name]
+        except KeyError:
+            pass
+        raw_page_spec = self.get_subspec('pages', name)
+        page_spec = SpecMap()
+        for type_, subspec_name in raw_page_spec.items():
+            page_spec[type_] = self.get_subspec(type_, subspec_name)
+        # Filled in once here, so the stages of each page needn't
+        page_spec = ensure_spec(page_spec, PAGE_SPEC_TYPES)
+        navlinks = navlink_index(page_spec)
+        self.page_specs[name] = raw_page_spec, page_spec, navlinks
+        return self.page_specs[name]
+
+    def get_variant(self, name, url):
+        """Get the page spec with the nav links to url made active."""
+        raw_page_spec, page_spec, navlinks = self.get_page_spec(name)
+        active = url if url in navlinks else None
+        try:
+            return raw_page_spec, self.variants[name, active]
+        except KeyError:
+            pass
+        variant = page_spec
+        if active is not None:
+            variant = copy(page_spec)
+            for position in navlinks[active]:
+                logger.debug('Change %r navlink to activenavlink', position[-1])
+                set_position(variant, position, 'activenavlink')
+        self.variants[name, active] = variant
+        return raw_page_spec, variant
+
+
+def get_page_spec(url, specs, deps=None, cache=None, name=None):
+    """Get the page spec of the page at url, or of the page spec name."""
     try:
         page_specs = specs['pages']
     except (KeyError, TypeError):
         return None
+    if cache is None:
+        cache = PageSpecCache(specs)
 
-    if url in page_specs:
+    if name is not None:
+        page_spec_name = name
+    elif url in page_specs:
         page_spec_name = url
     elif 'page' in page_specs:
         page_spec_name = 'page'
     else:
         page_spec_name = 'default'
-    logger.debug('Get subspec: %r: %r', 'pages', page_spec_name)
+    raw_page_spec, variant = cache.get_variant(page_spec_name, url)
+    if deps is not None:
+        # The choice of page spec depends on which of these exist
+        deps.add(PAGES, url)
+        deps.add(PAGES, 'page')
+        deps.add_spec(PAGES, page_spec_name, page_specs)
+        for type_, name in raw_page_spec.items():
+            deps.add_spec(type_, name, specs[type_])
 
-    raw_page_spec = get_spec(page_spec_name, page_specs)
-    
-    page_spec = CommentedMap()
-    for type_, name in raw_page_spec.items():
-        logger.debug('Get subspec: %r: %r', type_, name)
-        page_spec[type_] = get_spec(name, specs[type_])
+    page_spec = copy(variant)
+    trace(SPEC, 'Compiled page spec %r for url %r', page_spec_name, url,
+          Dump(page_spec))
 
-    # Active nav links
-    for path, root, key, value in spec_walker(page_spec):
-        if value == 'navlink' and page_spec['navlinks'][key] == url:
-            logger.debug('Change %r navlink to activenavlink', key)
-            root[key] = 'activenavlink'
+    set_position(page_spec, ('vars', 'url'), url)
 
-    logger.debug('Show compiled page spec %r for url %r:' + WRAPPER,
-        page_spec_name, url, OrderedYaml(page_spec))
+    return page_spec
 
-    page_spec['vars']['url'] = url
 
-    return page_spec
+def get_page_deps(url, specs, source_dir, cache=None, options=None,
+                  markdown_cache=None, index=None):
+    """Get the inputs of a page, without building it."""
+    deps = Dependencies(source_dir)
+    page_spec = get_page_spec(url, specs, deps, cache)
+    get_html(source_dir, page_spec, deps, options, markdown_cache, index)
+    for asset in asset_finder(source_dir, index):
+        deps.add_file(asset)
+    return deps
 
 
-def build_page(url, specs, source_dir, build_dir):
+def is_page_current(url, source_dir, manifest, hasher):
+    # Check the deps recorded last time, so an unchanged page
+    # doesn't need its page spec compiled.
+    deps = manifest.get_inputs(url)
+    if not deps:
+        return False
+    return manifest.is_current(url, hasher.get_inputs(deps, source_dir))
+
+
+def build_page(url, specs, source_dir, build_dir, manifest=None, hasher=None,
+               cache=None, options=None, markdown_cache=None, asset_store=None,
+               index=None, writer=None, compressor=None):
     logger.debug(DEBUG_SEPARATOR, url)  # Mark page top
+    if manifest is not None:
+        if hasher is None:
+            hasher = DependencyHasher(specs, index)
+        with profiler.stage('check'):
+            current = is_page_current(url, source_dir, manifest, hasher)
+        if current:
+            logger.info("Page up to date: %s", url)
+            return
     logger.info("Build page: %s", url)
-    page_spec = get_page_spec(url, specs)
-    html_page = get_html(source_dir, page_spec)
+    deps = Dependencies(source_dir)
+    with profiler.stage('page_spec'):
+        page_spec = get_page_spec(url, specs, deps, cache)
+    html_page = get_html(source_dir, page_spec, deps, options, markdown_cache,
+                         index)
     target_dir = build_dir.join(url)
-    html.dump(html_page, target_dir)
-    build_page_assets(source_dir, target_dir)
+    with profiler.stage('dump'):
+        outputs = html.dump(html_page, target_dir, writer, compressor)
+    with profiler.stage('assets'):
+        outputs.extend(build_page_assets(source_dir, target_dir, deps,
+                                         asset_store, index))
+    if manifest is not None:
+        manifest.update(url, hasher.get_inputs(deps, source_dir), outputs)
 
 
-def get_html(source_dir, page_spec):
+def get_html(source_dir, page_spec, deps=None, options=None,
+             markdown_cache=None, index=None):
+    if options is None:
+        options = BuildOptions()
     if not source_dir.check(dir=1):
         raise SourceDirNotFoundError(
             'Source dir not found: {}'.format(source_dir))
     logger.debug("Source data is in %s", source_dir)
-    html_text = html.load(source_dir)
+    html_text = html.load(source_dir, deps=deps)
     if html_text is None:
         # No source file detected, so use a template and content partials.
-        template = get_template(page_spec)
-        page_content = get_content(source_dir)
-        page_content = merge_content(page_content, page_spec)
+        with profiler.stage('template'):
+            template = get_template(page_spec, deps=deps)
+        with profiler.stage('content'):
+            page_content = get_content(source_dir, deps=deps,
+                                       markdown_cache=markdown_cache,
+                                       index=index)
+        with profiler.stage('merge_content'):
+            page_content = merge_content(page_content, page_spec)
         data = get_data(page_spec)
         object = get_object(page_spec)
-        html_text = render_html(template, page_content, object=object)
+        html_text = render_html(template, page_content, object=object,
+                                engine=options.engine,
+                                formatter=options.formatter)
     return html_text
 
 
-def render_html(template, content, object=None, **kwargs):
+def render_html(template, content, object=None, engine=None,
+                formatter=html.HTML5LIB, **kwargs):
     logger.debug("Render html using template and content")
-    try:
-        rendered_html = template.format(object=object, **content)
-        # Second pass, to catch variables in content partials
-        rendered_html = rendered_html.format(object=object, **content)
-    except KeyError as e:
-        raise NotFoundError('{}: Content missing for url {}'.format(e, content['url']))
+    with profiler.stage('render'):
+        if engine == COMPILED:
+            try:
+                rendered_html = render(template, object=object, **content)
+            except MissingKeyError as e:
+                raise NotFoundError('{}: Content missing for url {}'.format(e, content['url']))
+        else:
+            try:
+                rendered_html = template.format(object=object, **content)
+                # Second pass, to catch variables in content partials
+                rendered_html = rendered_html.format(object=object, **content)
+            except KeyError as e:
+                raise NotFoundError('{}: Content missing for url {}'.format(e, content['url']))
     assert isinstance(rendered_html, unicode)
-    logger.debug('Rendered html:' + WRAPPER, rendered_html)
-    pretty_html = html.prettify(rendered_html)
-    logger.debug('Pretty html:' + WRAPPER_NL, pretty_html)
+    trace(RENDER, 'Rendered html', rendered_html)
+    with profiler.stage('format'):
+        pretty_html = html.format_html(rendered_html, formatter=formatter)
+    trace(RENDER, 'Pretty html', pretty_html)
     return pretty_html
 
 
-def build_page_assets(source_dir, target_dir):
-    for asset in source_dir.visit(fil=str('*.css')):
+def asset_finder(source_dir, index=None):
+    if index is None:
+        return source_dir.visit(fil=str('*.css'))
+    return index.find_files(source_dir, fil=str('*.css'))
+
+
+def build_page_assets(source_dir, target_dir, deps=None, asset_store=None,
+                      index=None):
+    assets = []
+    for asset in asset_finder(source_dir, index):
         logger.info('Get asset %s from %s',
             target_dir.relto(target_dir).join(asset.basename), 
             asset)
-        asset.copy(target_dir)
+        if deps is not None:
+            deps.add_file(asset)
+        target = target_dir.join(asset.basename)
+        if asset_store is None:
+            asset.copy(target_dir)
+        else:
+            asset_store.publish(asset, target)
+        assets.append(target)
+    return assets
@@ -0,0 +1,164 @@
+import logging
+import multiprocessing
+import pickle
+import traceback
+
+from . import profiler
+from .deps import DependencyHasher
+from .error import JmdwebsitesError
+from .page import build_page, PageSpecCache
+from .trace import get_tracing, set_tracing
+
+class ParallelBuildError(JmdwebsitesError): pass
+
+logger = logging.getLogger(__name__)
+
+# Worker process state, set once per worker by init_worker()
+_worker = {}
+
+
+class RecordHandler(logging.Handler):
+    """Keep the log records of a page, to be handled by the parent process."""
+
+    def __init__(self, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.records = []
+
+    def emit(self, record):
+        # Format now, as the args and exc_info may not pickle
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+def get_log_level(name='jmdwebsites'):
+    """Get the lowest level of the handlers a logger's records reach."""
+    levels = []
+    current = logging.getLogger(name)
+    while current:
+        levels.extend(handler.level for handler in current.handlers)
+        if not current.propagate:
+            break
+        current = current.parent
+    if not levels:
+        return logging.WARNING
+    return min(levels)
+
+
+def get_jobs(jobs):
+    if not jobs:
+        return multiprocessing.cpu_count()
+    return jobs
+
+
+def init_worker(specs, build_dir, manifest, options, markdown_cache,
+                asset_store, index, compressor, cprofile, log_level, tracing):
+    _worker.update(specs=specs, build_dir=build_dir, manifest=manifest,
+                   options=options, markdown_cache=markdown_cache,
+                   asset_store=asset_store, index=index, compressor=compressor,
+                   hasher=DependencyHasher(specs, index),
+                   cache=PageSpecCache(specs))
+    if cprofile is not None:
+        profiler.set_profiler(profiler.BuildProfiler(cprofile))
+    set_tracing(tracing)
+    # Don't write to the parent's handlers. Records are passed back to the
+    # parent instead, so the log output for each page stays together.
+    handler = RecordHandler(log_level)
+    for name in ('', 'jmdwebsites'):
+        named_logger = logging.getLogger(name)
+        for old_handler in named_logger.handlers[:]:
+            named_logger.removeHandler(old_handler)
+    logging.getLogger('jmdwebsites').propagate = True
+    logging.getLogger().addHandler(handler)
+    _worker['handler'] = handler
+
+
+def build_page_worker(page):
+    url, source_dir = page
+    handler = _worker['handler']
+    manifest = _worker['manifest']
+    index = _worker['index']
+    asset_store = _worker['asset_store']
+    handler.records = []
+    if index is not None:
+        index.new_hashes = {}
+    if asset_store is not None:
+        asset_store.used = set()
+    error = None
+    try:
+        with profiler.page(url):
+            build_page(url, _worker['specs'], source_dir, _worker['build_dir'],
+                       manifest, _worker['hasher'], _worker['cache'],
+                       _worker['options'], _worker['markdown_cache'],
+                       _worker['asset_store'], index,
+                       compressor=_worker['compressor'])
+    except Exception as e:
+        error = e
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = ParallelBuildError('{}: {}'.format(url, e))
+        logging.getLogger(__name__).debug(traceback.format_exc())
+    entry = None
+    if manifest is not None:
+        entry = manifest.current.get(url)
+    # Pass back the file hashes for the scan index, to keep for next time
+    hashes = None if index is None else index.new_hashes
+    # And the stored assets used, so the parent doesn't prune them
+    used = None if asset_store is None else asset_store.used
+    page_profile = None
+    if profiler.get_profiler() is not None:
+        page_profile = profiler.get_profiler().take_page(url)
+    return url, entry, handler.records, error, hashes, used, page_profile
+
+
+def build_pages(pages, specs, build_dir, manifest=None, options=None,
+                markdown_cache=None, asset_store=None, index=None,
+                compressor=None, jobs=None):
+    """Build pages in a pool of worker processes.
+
+    Log records and errors are passed back to this process and handled in
+    page order, so the output is the same whatever the order the pages
+    are built in. The first error, in page order, is raised after all the
+    pages have been built.
+    """
+    pages = list(pages)
+    jobs = get_jobs(jobs)
+    logger.info('Build %d pages with %d jobs', len(pages), jobs)
+    chunksize = max(1, len(pages) // (jobs * 4))
+    build_profiler = profiler.get_profiler()
+    cprofile = None if build_profiler is None else build_profiler.cprofile
+    pool = multiprocessing.Pool(
+        jobs,
+        initializer=init_worker,
+        initargs=(specs, build_dir, manifest, options, markdown_cache,
+                  asset_store, index, compressor, cprofile, get_log_level(),
+                  get_tracing()))
+    errors = []
+    try:
+        results = pool.imap(build_page_worker, pages, chunksize)
+        for url, entry, records, error, hashes, used, page_profile in results:
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+            if entry is not None:
+                manifest.current[url] = entry
+            if hashes:
+                index.hashes.update(hashes)
+            if used:
+                asset_store.used.update(used)
+            if page_profile is not None:
+                build_profiler.add_page(url, *page_profile)
+            if error is not None:
+                logger.error('%s: %s', url, error)
+                errors.append(error)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    if errors:
+        raise errors[0]
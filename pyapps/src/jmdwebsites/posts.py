@@ -0,0 +1,402 @@
+"""The posts content group: an index of the posts, newest first, and the
+listing and archive pages made from it.
+
+The index is kept between builds, and a post is only read again if its
+content files have changed. It is saved as JSON lines, one post per line
+in listing order. An update streams it, reading only the posts that have
+changed, and the listing pages are made from it a page at a time, so the
+posts are never all in memory.
+"""
+from collections import namedtuple
+import datetime
+import io
+from itertools import groupby, islice
+import json
+import logging
+import os
+import re
+from xml.sax.saxutils import escape
+
+import py
+import six
+
+from . import html
+from . import profiler
+from .content import FileFilter, merge_content
+from .data import get_object
+from .deps import Dependencies, split_dep, FILE, FILES
+from .error import JmdwebsitesError
+from .manifest import hash_file, hash_text
+from .options import BuildOptions
+from .page import get_page_spec, render_html
+from .template import get_template
+
+class PostIndexError(JmdwebsitesError): pass
+class PostIndexConfigError(PostIndexError): pass
+
+logger = logging.getLogger(__name__)
+
+POST_INDEX_FILE = 'posts.jsonl'
+POST_INDEX_VERSION = 1
+# The site spec that switches on the listing pages
+POST_INDEX = 'post_index'
+LISTING_URL = '/posts'
+PER_PAGE = 10
+LISTING_PART = 'article'
+# A listing input, along with the specs of its page
+POSTS = 'posts'
+
+date_regexp = re.compile(r'^(\d{4})-(\d{2})-(\d{2})(?:-|$)')
+markdown_title_regexp = re.compile(r'^#{1,6}[ \t]+(.+?)[ \t#]*$', re.M)
+html_title_regexp = re.compile(r'<h1\b[^>]*>(.*?)</h1>', re.I | re.S)
+tag_regexp = re.compile(r'<[^>]*>')
+
+# The files a post is made from, as for get_content()
+content_filter = FileFilter('_', ['.html', '.md'])
+
+Post = namedtuple('Post', 'date url title digest')
+Listing = namedtuple('Listing', 'url number count posts newer older year')
+
+
+class PostIndexConfig(object):
+    """The post_index: spec of a site.
+
+    The listing pages are at url, url/page/2 and so on, with per_page posts
+    on each, put in the part content of the page spec named page_spec, or
+    of the page spec for their url. With archive, there are listing pages
+    of the posts of each year too, at url/<year>.
+    """
+
+    def __init__(self, url=LISTING_URL, per_page=PER_PAGE, part=LISTING_PART,
+                 page_spec=None, archive=True):
+        if not isinstance(url, six.string_types) or not url.startswith('/'):
+            raise PostIndexConfigError('Invalid url: {!r}'.format(url))
+        if not isinstance(per_page, int) or per_page < 1:
+            raise PostIndexConfigError('Invalid per_page: {!r}'.format(per_page))
+        self.url = url.rstrip('/') or '/'
+        self.per_page = per_page
+        self.part = part
+        self.page_spec = page_spec
+        self.archive = archive
+
+
+def get_post_index_config(specs):
+    """Get the config of the listing pages, or None if there are none."""
+    try:
+        spec = specs[POST_INDEX]
+    except (KeyError, TypeError):
+        return None
+    if spec is None:
+        spec = {}
+    if not isinstance(spec, dict):
+        raise PostIndexConfigError('Not a map: {}: {!r}'.format(POST_INDEX, spec))
+    try:
+        return PostIndexConfig(**spec)
+    except TypeError as e:
+        raise PostIndexConfigError('Invalid {}: {}'.format(POST_INDEX, e))
+
+
+def get_date(page_dir):
+    """Get the date of a post from the name of its dir, eg. 2017-03-01-title,
+    or None if it has none."""
+    match = date_regexp.match(page_dir.basename)
+    if match is None:
+        return None
+    try:
+        date = datetime.date(*[int(part) for part in match.groups()])
+    except ValueError:
+        return None
+    return date.isoformat()
+
+
+def get_title(text, ext):
+    if ext == '.md':
+        match = markdown_title_regexp.search(text)
+        if match is not None:
+            return match.group(1)
+    elif ext == '.html':
+        match = html_title_regexp.search(text)
+        if match is not None:
+            return tag_regexp.sub(u'', match.group(1)).strip()
+    return None
+
+
+def find_content_files(page_dir, index=None):
+    if index is None:
+        return page_dir.visit(fil=content_filter, sort=True)
+    return index.find_files(page_dir, fil=content_filter, sort=True)
+
+
+def hash_post(page_dir, paths, index=None):
+    """Hash the content files of a post, without a read of the files the
+    scan index has the hashes of."""
+    lines = []
+    for path in paths:
+        digest = hash_file(path) if index is None else index.hash_file(path)
+        lines.append(u'{}:{}'.format(path.relto(page_dir), digest))
+    return hash_text(u'\n'.join(lines))
+
+
+def read_post(url, page_dir, paths, digest):
+    """Read the title of a post from its first heading, or make it from the
+    name of its dir."""
+    title = None
+    for path in paths:
+        title = get_title(path.read_text(encoding='utf-8'), path.ext)
+        if title:
+            break
+    date = get_date(page_dir)
+    if not title:
+        slug = page_dir.basename
+        if date is not None:
+            slug = slug[len(date) + 1:] or slug
+        title = six.text_type(slug.replace('-', ' '))
+    return Post(date, url, title, digest)
+
+
+def listing_order(post):
+    # Newest first, and posts without a date last
+    return (post.date or '', post.url)
+
+
+def page_order(page):
+    # The listing order of the post at a (url, page_dir), before it is read
+    url, page_dir = page
+    return (get_date(page_dir) or '', url)
+
+
+def merge_posts(saved, updated):
+    """Merge two streams of posts, each in listing order."""
+    updated = iter(updated)
+    next_updated = next(updated, None)
+    for post in saved:
+        while next_updated is not None and \
+                listing_order(next_updated) > listing_order(post):
+            yield next_updated
+            next_updated = next(updated, None)
+        yield post
+    while next_updated is not None:
+        yield next_updated
+        next_updated = next(updated, None)
+
+
+class PostIndex(object):
+    """The posts of a site, newest first, kept between builds.
+
+    Only the posts read again by an update are held in memory. They are
+    merged into the saved index as it is streamed to the new one.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = py.path.local(filepath)
+        self.count = 0
+        self.years = {}
+        # The posts read by the last update, in listing order, and the
+        # urls of the saved posts they replace or that have gone
+        self.updated = []
+        self.dropped = set()
+        self.changed = False
+
+    def load(self):
+        """Load the header of the index of the previous build, if it is
+        still valid."""
+        header = None
+        if self.filepath.check(file=1):
+            with io.open(self.filepath.strpath, encoding='utf-8') as fileobj:
+                header = self.read_header(fileobj)
+        if header is None:
+            self.count, self.years = 0, {}
+            return False
+        self.count, self.years = header['count'], header['years']
+        return True
+
+    def read_header(self, fileobj):
+        try:
+            header = json.loads(fileobj.readline())
+        except ValueError as e:
+            logger.warning('Invalid post index: %s: %s', self.filepath, e)
+            return None
+        if not isinstance(header, dict) or \
+                header.get('version') != POST_INDEX_VERSION:
+            return None
+        return header
+
+    def iter_posts(self):
+        """Stream the posts from the saved index, in listing order."""
+        if not self.filepath.check(file=1):
+            return
+        with io.open(self.filepath.strpath, encoding='utf-8') as fileobj:
+            if self.read_header(fileobj) is None:
+                return
+            for line in fileobj:
+                yield Post(*json.loads(line))
+
+    def iter_saved_posts(self):
+        # The posts after an invalid line are taken as new, so are read again
+        try:
+            for post in self.iter_posts():
+                yield post
+        except (ValueError, TypeError) as e:
+            logger.warning('Invalid post index: %s: %s', self.filepath, e)
+
+    def update(self, pages, index=None):
+        """Update the index with the posts at pages, a list of (url,
+        page_dir). Only the posts that have changed are read.
+
+        The pages, in listing order, are matched up with the saved posts
+        as they are streamed, so only the digest of one saved post at a
+        time is needed.
+        """
+        pages = sorted(pages, key=page_order, reverse=True)
+        self.updated = []
+        self.dropped = set()
+        self.count = len(pages)
+        self.years = {}
+        saved = self.iter_saved_posts()
+        saved_post = next(saved, None)
+        for page in pages:
+            url, page_dir = page
+            order = page_order(page)
+            while saved_post is not None and listing_order(saved_post) > order:
+                self.dropped.add(saved_post.url)
+                saved_post = next(saved, None)
+            old_post = None
+            if saved_post is not None and listing_order(saved_post) == order:
+                old_post = saved_post
+                saved_post = next(saved, None)
+            paths = list(find_content_files(page_dir, index))
+            digest = hash_post(page_dir, paths, index)
+            if old_post is None or old_post.digest != digest:
+                self.updated.append(read_post(url, page_dir, paths, digest))
+                if old_post is not None:
+                    self.dropped.add(url)
+            date = order[0]
+            if date:
+                self.years[date[:4]] = self.years.get(date[:4], 0) + 1
+        while saved_post is not None:
+            self.dropped.add(saved_post.url)
+            saved_post = next(saved, None)
+        read = len(self.updated)
+        removed = len(self.dropped) - sum(1 for post in self.updated
+                                          if post.url in self.dropped)
+        logger.info('Post index: %d posts, %d read, %d removed',
+                    self.count, read, removed)
+        self.changed = bool(read or removed) or \
+            not self.filepath.check(file=1)
+
+    def dump(self):
+        """Save the index, if it has changed, with the posts read by the
+        last update merged into the saved posts."""
+        if not self.changed:
+            return
+        saved = (post for post in self.iter_saved_posts()
+                 if post.url not in self.dropped)
+        header = {'version': POST_INDEX_VERSION, 'count': self.count,
+                  'years': self.years}
+        tmp_path = self.filepath.new(basename='{}.{}.tmp'.format(
+            self.filepath.basename, os.getpid()))
+        tmp_path.dirpath().ensure(dir=1)
+        with io.open(tmp_path.strpath, 'w', encoding='utf-8') as fileobj:
+            fileobj.write(six.text_type(json.dumps(header, sort_keys=True)) + u'\n')
+            for post in merge_posts(saved, self.updated):
+                fileobj.write(six.text_type(json.dumps(list(post))) + u'\n')
+        tmp_path.rename(self.filepath)
+        self.updated = []
+        self.dropped = set()
+        self.changed = False
+        logger.info('Dump post index: %s', self.filepath)
+
+
+def get_listing_url(base_url, number):
+    if number == 1:
+        return base_url
+    return os.path.join(base_url, 'page', str(number))
+
+
+def paginate(posts, base_url, total, per_page, year=None):
+    """Split a stream of posts into listing pages, holding one page of
+    posts at a time."""
+    count = max(1, (total + per_page - 1) // per_page)
+    posts = iter(posts)
+    for number in range(1, count + 1):
+        newer = None if number == 1 else get_listing_url(base_url, number - 1)
+        older = None if number == count else get_listing_url(base_url, number + 1)
+        yield Listing(get_listing_url(base_url, number), number, count,
+                      list(islice(posts, per_page)), newer, older, year)
+
+
+def listing_finder(post_index, config):
+    """Get the listing pages of all the posts, then of each year's posts."""
+    for listing in paginate(post_index.iter_posts(), config.url,
+                            post_index.count, config.per_page):
+        yield listing
+    if not config.archive:
+        return
+    dated = (post for post in post_index.iter_posts() if post.date is not None)
+    for year, posts in groupby(dated, key=lambda post: post.date[:4]):
+        for listing in paginate(posts, os.path.join(config.url, year),
+                                post_index.years[year], config.per_page,
+                                year):
+            yield listing
+
+
+def hash_listing(listing):
+    data = [listing.number, listing.count, listing.newer, listing.older,
+            [post[:3] for post in listing.posts]]
+    return hash_text(six.text_type(json.dumps(data)))
+
+
+def listing_html(listing):
+    """Get the html of the list of posts, and links to the other pages."""
+    items = []
+    for post in listing.posts:
+        item = u'<li><a href="{}">{}</a>'.format(escape(post.url, {'"': '&quot;'}),
+                                                  escape(post.title))
+        if post.date is not None:
+            item += u' <time datetime="{0}">{0}</time>'.format(post.date)
+        items.append(item + u'</li>')
+    parts = [u'<ul class="posts">{}</ul>'.format(u''.join(items))]
+    links = []
+    if listing.newer is not None:
+        links.append(u'<a href="{}" rel="prev">Newer posts</a>'.format(
+            listing.newer))
+    if listing.older is not None:
+        links.append(u'<a href="{}" rel="next">Older posts</a>'.format(
+            listing.older))
+    if links:
+        parts.append(u'<nav class="pagination">{}</nav>'.format(u' '.join(links)))
+    return u''.join(parts)
+
+
+def get_listing_deps(listing, specs, config, cache=None):
+    deps = Dependencies(None)
+    page_spec = get_page_spec(listing.url, specs, deps, cache,
+                              name=config.page_spec)
+    template = get_template(page_spec, deps=deps)
+    return page_spec, template, deps
+
+
+def build_listing(listing, specs, build_dir, config, manifest=None, hasher=None,
+                  cache=None, options=None, writer=None, compressor=None):
+    """Build a listing page, unless its posts and specs are unchanged."""
+    if options is None:
+        options = BuildOptions()
+    page_spec, template, deps = get_listing_deps(listing, specs, config, cache)
+    inputs = None
+    if manifest is not None and hasher is not None:
+        # Files are the inputs of pages with a source dir, which this hasn't
+        inputs = dict((dep, hasher.hash(dep, None)) for dep in deps
+                      if split_dep(dep)[0] not in (FILE, FILES))
+        inputs[POSTS + ':' + listing.url] = hash_listing(listing)
+        if manifest.is_current(listing.url, inputs):
+            logger.info('Listing up to date: %s', listing.url)
+            return
+    logger.info('Build listing: %s', listing.url)
+    page_content = merge_content({config.part: listing_html(listing)}, page_spec)
+    html_page = render_html(template, page_content, object=get_object(page_spec),
+                            engine=options.engine, formatter=options.formatter)
+    with profiler.stage('dump'):
+        outputs = html.dump(html_page, build_dir.join(listing.url), writer,
+                            compressor)
+    if inputs is not None:
+        manifest.update(listing.url, inputs, outputs)
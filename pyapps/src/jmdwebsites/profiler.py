@@ -0,0 +1,212 @@
+from contextlib import contextmanager
+import cProfile
+import json
+import logging
+import marshal
+import sys
+import time
+
+import py
+import six
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FILE = 'profile.json'
+SLOWEST_PAGES = 10
+
+# The profiler of the build in progress, if it is being profiled
+_profiler = None
+
+
+class NullStage(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+NULL_STAGE = NullStage()
+
+
+def get_profiler():
+    return _profiler
+
+
+def set_profiler(profiler):
+    global _profiler
+    _profiler = profiler
+
+
+@contextmanager
+def profiling(profiler):
+    """Profile the builds in this context with profiler."""
+    set_profiler(profiler)
+    try:
+        yield profiler
+    finally:
+        set_profiler(None)
+        profiler.stop()
+
+
+def stage(name):
+    """Time a stage of the build, if it is being profiled."""
+    if _profiler is None:
+        return NULL_STAGE
+    return _profiler.stage(name)
+
+
+def page(url):
+    """Time the build of a page, if the build is being profiled."""
+    if _profiler is None:
+        return NULL_STAGE
+    return _profiler.page(url)
+
+
+def get_max_rss():
+    """Get the peak memory, in bytes, of this process or its biggest
+    finished child, eg. a build worker."""
+    if resource is None:
+        return None
+    # Bytes on macOS, kilobytes elsewhere
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return scale * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                       resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def get_stats_basename(rank, url):
+    return '{:02d}-{}.prof'.format(rank, url.strip('/').replace('/', '_') or 'home')
+
+
+class BuildProfiler(object):
+    """Times of each stage of a build, overall and for each page.
+
+    Stages are not nested, so their times add up. With cprofile, the
+    cProfile stats of the slowest pages are kept as well.
+    """
+
+    def __init__(self, cprofile=0):
+        self.cprofile = cprofile
+        self.stages = {}
+        self.pages = {}
+        self.page_stats = {}
+        self.current = None
+        self.start = time.time()
+        self.time = None
+        self.max_rss = None
+
+    def add_stage(self, stages, name, calls, elapsed):
+        entry = stages.setdefault(name, [0, 0.0])
+        entry[0] += calls
+        entry[1] += elapsed
+
+    @contextmanager
+    def stage(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            stages = self.stages if self.current is None else self.current
+            self.add_stage(stages, name, 1, time.time() - start)
+
+    @contextmanager
+    def page(self, url):
+        self.current = {}
+        profile = cProfile.Profile() if self.cprofile else None
+        start = time.time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            stats = None
+            if profile is not None:
+                profile.disable()
+                profile.create_stats()
+                stats = profile.stats
+            record = {'time': time.time() - start, 'stages': self.current}
+            self.current = None
+            self.add_page(url, record, stats)
+
+    def add_page(self, url, record, stats=None):
+        self.pages[url] = record
+        for name, (calls, elapsed) in record['stages'].items():
+            self.add_stage(self.stages, name, calls, elapsed)
+        if stats is not None:
+            self.page_stats[url] = stats
+            if len(self.page_stats) > self.cprofile:
+                fastest = min(self.page_stats, key=lambda url: self.pages[url]['time'])
+                del self.page_stats[fastest]
+
+    def take_page(self, url):
+        """Take the record of a page, to be added to another profiler."""
+        return self.pages.pop(url), self.page_stats.pop(url, None)
+
+    def stop(self):
+        self.time = time.time() - self.start
+        self.max_rss = get_max_rss()
+
+    def slowest_pages(self, count=SLOWEST_PAGES):
+        return sorted(self.pages, key=lambda url: -self.pages[url]['time'])[:count]
+
+    def as_dict(self):
+        return {
+            'time': self.time,
+            'max_rss': self.max_rss,
+            'stages': dict((name, {'calls': calls, 'time': elapsed})
+                           for name, (calls, elapsed) in self.stages.items()),
+            'pages': self.pages,
+        }
+
+    def report(self, count=SLOWEST_PAGES):
+        total = sum(elapsed for _, elapsed in self.stages.values()) or 1.0
+        lines = ['{:<16}{:>8}{:>12}{:>12}{:>8}'.format(
+            'Stage', 'Calls', 'Time (s)', 'Mean (ms)', '%')]
+        for name, (calls, elapsed) in sorted(
+                self.stages.items(), key=lambda item: -item[1][1]):
+            lines.append('{:<16}{:>8}{:>12.3f}{:>12.3f}{:>8.1f}'.format(
+                name, calls, elapsed, 1000 * elapsed / calls,
+                100 * elapsed / total))
+        if self.time is not None:
+            lines.append('Build time: {:.3f}s, {} pages'.format(
+                self.time, len(self.pages)))
+        if self.max_rss is not None:
+            lines.append('Peak memory: {:.1f}MB'.format(self.max_rss / 1e6))
+        slowest = self.slowest_pages(count)
+        if slowest:
+            lines.append('Slowest pages:')
+        for url in slowest:
+            record = self.pages[url]
+            stages = ', '.join('{} {:.3f}s'.format(name, elapsed) for name, (_, elapsed)
+                               in sorted(record['stages'].items(),
+                                         key=lambda item: -item[1][1])[:3])
+            lines.append('{:>10.3f}s  {}  ({})'.format(record['time'], url, stages))
+        return '\n'.join(lines)
+
+    def dump(self, profile_dir):
+        """Write the times as json, and the cProfile stats of the slowest
+        pages, which can be read with pstats."""
+        profile_dir = py.path.local(profile_dir)
+        profile_dir.ensure(dir=1)
+        for path in profile_dir.listdir(fil='*.prof'):
+            path.remove()
+        data = self.as_dict()
+        data['stats'] = {}
+        ranked = [url for url in self.slowest_pages(len(self.pages))
+                  if url in self.page_stats]
+        for rank, url in enumerate(ranked, 1):
+            path = profile_dir.join(get_stats_basename(rank, url))
+            with path.open('wb') as fileobj:
+                marshal.dump(self.page_stats[url], fileobj)
+            data['stats'][url] = path.basename
+        profile_file = profile_dir.join(PROFILE_FILE)
+        profile_file.write_text(
+            six.text_type(json.dumps(data, indent=1, sort_keys=True)) + u'\n',
+            encoding='utf-8')
+        logger.info('Dump build profile: %s', profile_file)
+        return profile_file
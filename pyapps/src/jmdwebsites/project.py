@@ -3,11 +3,12 @@ import os
 
 import py
 
-from . import orderedyaml
 from .error import JmdwebsitesError, PathNotFoundError
-from .orderedyaml import CommentedMap
+from .lazy import lazy_import
 from .utils import find_path
 
+orderedyaml = lazy_import('jmdwebsites.orderedyaml')
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,15 +23,20 @@ class PathAlreadyExists(ProjectError): pass
 class WebsiteProjectAlreadyExists(ProjectError): pass
 
 
-def load_specs(basename, locations=None):
+def load_specs(basename, locations=None, fast=False):
+    """Load a spec file, without the comments if fast."""
     try:
         filepath = find_path(basename, locations=locations)
     except PathNotFoundError as e:
         logger.warning('Load specs: %s' % e)
-        data = CommentedMap()
+        data = orderedyaml.CommentedMap()
     else:
         logger.info('Load specs: %s: %s' % (basename, filepath))
-        data = orderedyaml.load(filepath).commented_map
+        if fast:
+            data = orderedyaml.load(filepath,
+                                    Loader=orderedyaml.FastLoader).commented_map
+        else:
+            data = orderedyaml.load(filepath).commented_map
     return data
 
 
@@ -0,0 +1,176 @@
+from collections import namedtuple
+import logging
+import re
+import string
+
+import six
+
+from .error import JmdwebsitesError
+
+class RenderError(JmdwebsitesError): pass
+
+class RenderRecursionError(RenderError): pass
+
+class MissingKeyError(RenderError):
+
+    def __init__(self, path):
+        RenderError.__init__(self, path)
+        self.path = path
+
+    def __str__(self):
+        return ' -> '.join(self.path)
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 'format'
+COMPILED = 'compiled'
+ENGINES = (FORMAT, COMPILED)
+MAX_DEPTH = 10
+PLAN_CACHE_SIZE = 256
+
+# Only braces around names like these are variables in content,
+# anything else is literal text, eg. code in markdown.
+field_name_regexp = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*|\[\w+\])*$')
+name_regexp = re.compile(r'[^.[]*')
+# Faster than the in operator for long unicode text in python 2
+brace_regexp = re.compile(u'{')
+
+Field = namedtuple('Field', 'name conversion format_spec simple')
+
+formatter = string.Formatter()
+
+
+def literal(field_name, format_spec, conversion):
+    text = field_name
+    if conversion:
+        text += '!' + conversion
+    if format_spec:
+        text += ':' + format_spec
+    return u'{' + text + u'}'
+
+
+class RenderPlan(object):
+    """A template parsed once into literal text and fields.
+
+    In nested content, text that can't be parsed as a template, and
+    fields that aren't names, are kept as literal text.
+    """
+
+    def __init__(self, text, nested=False):
+        self.parts = []
+        try:
+            parsed = list(formatter.parse(text))
+        except ValueError:
+            if not nested:
+                raise
+            parsed = [(text, None, None, None)]
+        for literal_text, field_name, format_spec, conversion in parsed:
+            if literal_text:
+                self.parts.append(literal_text)
+            if field_name is None:
+                continue
+            if nested and not field_name_regexp.match(field_name):
+                self.parts.append(literal(field_name, format_spec, conversion))
+                continue
+            simple = '.' not in field_name and '[' not in field_name
+            self.parts.append(Field(field_name, conversion, format_spec, simple))
+        self.fields = [part for part in self.parts if isinstance(part, Field)]
+        # The names of the values the fields need
+        self.names = []
+        for field in self.fields:
+            name = name_regexp.match(field.name).group()
+            if name not in self.names:
+                self.names.append(name)
+
+
+
+class Renderer(object):
+    """Render a template in one pass.
+
+    The values used by the template are expanded first, eg. variables in
+    content partials, each in a single traversal of its parsed plan. Then
+    they are joined with the literal text of the template's plan, so
+    neither the template nor inserted values are parsed again, and literal
+    braces in content are left alone.
+    """
+
+    def __init__(self, plan_cache_size=PLAN_CACHE_SIZE):
+        self.plan_cache_size = plan_cache_size
+        self.plans = {}
+
+    def get_plan(self, text, nested=False):
+        key = (text, nested)
+        try:
+            return self.plans[key]
+        except KeyError:
+            pass
+        if len(self.plans) >= self.plan_cache_size:
+            self.plans.clear()
+        plan = self.plans[key] = RenderPlan(text, nested=nested)
+        return plan
+
+    def render(self, template, **kwargs):
+        plan = self.get_plan(template)
+        values = {}
+        for name in plan.names:
+            try:
+                value = kwargs[name]
+            except KeyError:
+                raise MissingKeyError((name,))
+            values[name] = self.expand(value, kwargs, (name,))
+        out = []
+        for part in plan.parts:
+            if not isinstance(part, Field):
+                out.append(part)
+                continue
+            try:
+                if part.simple:
+                    value = values[part.name]
+                else:
+                    value, _ = formatter.get_field(part.name, (), values)
+            except (KeyError, AttributeError, IndexError):
+                raise MissingKeyError((part.name,))
+            if part.conversion:
+                value = formatter.convert_field(value, part.conversion)
+            out.append(format(value, part.format_spec))
+        return u''.join(out)
+
+    def expand(self, value, kwargs, path):
+        if not isinstance(value, six.string_types) or \
+                not brace_regexp.search(value):
+            return value
+        plan = self.get_plan(value, nested=True)
+        if not plan.fields:
+            return value
+        if len(path) > MAX_DEPTH:
+            raise RenderRecursionError('Too deep: {}'.format(' -> '.join(path)))
+        out = []
+        for part in plan.parts:
+            if not isinstance(part, Field):
+                out.append(part)
+                continue
+            field_path = path + (part.name,)
+            if part.name in path:
+                raise RenderRecursionError(
+                    'Recursive: {}'.format(' -> '.join(field_path)))
+            try:
+                if part.simple:
+                    field_value = kwargs[part.name]
+                else:
+                    field_value, _ = formatter.get_field(part.name, (), kwargs)
+            except (KeyError, AttributeError, IndexError):
+                raise MissingKeyError(field_path)
+            if part.conversion:
+                field_value = formatter.convert_field(field_value, part.conversion)
+            field_value = self.expand(field_value, kwargs, field_path)
+            if part.format_spec or not isinstance(field_value, six.string_types):
+                field_value = format(field_value, part.format_spec)
+            out.append(field_value)
+        return u''.join(out)
+
+
+renderer = Renderer()
+
+
+def render(template, **kwargs):
+    return renderer.render(template, **kwargs)
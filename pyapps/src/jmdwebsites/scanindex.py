@@ -0,0 +1,180 @@
+import fnmatch
+import json
+import logging
+import os
+import stat
+import time
+
+import py
+import six
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+from .manifest import hash_file
+
+logger = logging.getLogger(__name__)
+
+SCAN_INDEX_VERSION = 1
+# A file changed this soon after a scan may still have the mtime it was
+# scanned with, so its hash isn't kept.
+RACY_TIME = 2.0
+
+
+def list_dir(dirpath):
+    """List the dirs and files in dirpath, in directory order.
+
+    Files are listed with their (mtime, size), and dirs with None.
+    Symlinks are followed, and anything else is left out.
+    """
+    entries = []
+    if scandir is not None:
+        for entry in scandir(dirpath):
+            try:
+                if entry.is_dir():
+                    entries.append((entry.name, None))
+                elif entry.is_file():
+                    st = entry.stat()
+                    entries.append((entry.name, (st.st_mtime, st.st_size)))
+            except OSError:
+                # Removed since it was listed
+                continue
+        return entries
+    for name in os.listdir(dirpath):
+        try:
+            st = os.stat(os.path.join(dirpath, name))
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            entries.append((name, None))
+        elif stat.S_ISREG(st.st_mode):
+            entries.append((name, (st.st_mtime, st.st_size)))
+    return entries
+
+
+def get_matcher(fil):
+    if fil is None:
+        return lambda path: True
+    if isinstance(fil, six.string_types):
+        return lambda path: fnmatch.fnmatch(path.basename, fil)
+    return fil
+
+
+class ScanIndex(object):
+    """The dirs and files under some root dirs, from one sweep per build.
+
+    The page dirs, content files and assets of a build are found in the
+    index, in the same order as a py.path visit(), instead of each with a
+    walk of its own. Dirs outside the roots are looked up on disk. File
+    hashes are kept between builds, keyed by mtime and size, so an
+    unchanged file isn't read to check it is unchanged.
+    """
+
+    def __init__(self, filepath=None):
+        self.filepath = None if filepath is None else py.path.local(filepath)
+        self.dirs = {}
+        self.files = {}
+        self.hashes = {}
+        self.new_hashes = {}
+        self.scan_time = None
+
+    def load(self):
+        if self.filepath is None or not self.filepath.check(file=1):
+            return False
+        try:
+            data = json.loads(self.filepath.read_text(encoding='utf-8'))
+        except ValueError as e:
+            logger.warning('Invalid scan index: %s: %s', self.filepath, e)
+            return False
+        if data.get('version') != SCAN_INDEX_VERSION:
+            return False
+        self.hashes = dict((path, tuple(entry))
+                           for path, entry in data.get('hashes', {}).items())
+        return True
+
+    def dump(self):
+        hashes = dict((path, entry) for path, entry in self.hashes.items()
+                      if path in self.files)
+        data = {'version': SCAN_INDEX_VERSION, 'hashes': hashes}
+        self.filepath.write_text(six.text_type(json.dumps(data, sort_keys=True)),
+                                 ensure=True, encoding='utf-8')
+
+    def scan(self, roots):
+        start = time.time()
+        self.scan_time = start
+        self.dirs = {}
+        self.files = {}
+        for root in roots:
+            self._scan(str(root))
+        logger.info('Scan %d dirs and %d files in %.3fs', len(self.dirs),
+                    len(self.files), time.time() - start)
+
+    def _scan(self, dirpath):
+        if dirpath in self.dirs:
+            return
+        try:
+            entries = list_dir(dirpath)
+        except OSError:
+            # Left out, so it is looked up on disk
+            return
+        self.dirs[dirpath] = entries
+        for name, st in entries:
+            path = os.path.join(dirpath, name)
+            if st is None:
+                self._scan(path)
+            else:
+                self.files[path] = st
+
+    def walk(self, dirpath, sort=False):
+        """Yield the paths under dirpath, and their stats, in the order of
+        a py.path visit()."""
+        entries = self.dirs[dirpath]
+        if sort:
+            entries = sorted(entries)
+        for name, st in entries:
+            if st is None:
+                for item in self.walk(os.path.join(dirpath, name), sort):
+                    yield item
+        for name, st in entries:
+            yield os.path.join(dirpath, name), st
+
+    def find_dirs(self, dirpath):
+        if dirpath.strpath not in self.dirs:
+            return list(dirpath.visit(fil=lambda path: path.check(dir=1)))
+        return [py.path.local(path) for path, st in self.walk(dirpath.strpath)
+                if st is None]
+
+    def find_files(self, dirpath, fil=None, sort=False, ignore=()):
+        fil = get_matcher(fil)
+        if dirpath.strpath not in self.dirs:
+            return [path for path in dirpath.visit(fil=fil, sort=sort)
+                    if path.basename not in ignore and path.check(file=1)]
+        paths = []
+        for path, st in self.walk(dirpath.strpath, sort):
+            if st is None or os.path.basename(path) in ignore:
+                continue
+            path = py.path.local(path)
+            if fil(path):
+                paths.append(path)
+        return paths
+
+    def hash_file(self, path):
+        """Hash the file at path, or None if there is no such file."""
+        if path.dirname not in self.dirs:
+            return hash_file(path) if path.check(file=1) else None
+        st = self.files.get(path.strpath)
+        if st is None:
+            return None
+        entry = self.hashes.get(path.strpath)
+        if entry is not None and entry[:2] == st:
+            return entry[2]
+        digest = hash_file(path)
+        if st[0] < self.scan_time - RACY_TIME:
+            entry = st + (digest,)
+            self.hashes[path.strpath] = self.new_hashes[path.strpath] = entry
+        return digest
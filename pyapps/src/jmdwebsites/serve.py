@@ -0,0 +1,147 @@
+import logging
+import posixpath
+import traceback
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.urllib.parse import unquote, urlparse
+
+from .deps import Dependencies
+from .options import BuildOptions, HOST, PORT
+from .page import get_html, get_page_spec
+from .watch import scan
+
+logger = logging.getLogger(__name__)
+
+STYLESHEET = '/page.css'
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+}
+
+
+def get_page_url(path):
+    if posixpath.basename(path) == 'index.html':
+        path = posixpath.dirname(path)
+    if path != '/':
+        path = path.rstrip('/')
+    return path
+
+
+class PreviewSite(object):
+    """The pages of a website, rendered when they are asked for.
+
+    Only the page asked for is found and rendered, so the time to preview
+    a page doesn't depend on the size of the site. Rendered pages are kept
+    in memory with the hashes of their deps, and rendered again when a dep
+    changes, as in an incremental build. A change to the spec files
+    reloads the specs.
+    """
+
+    def __init__(self, website, options=None):
+        self.website = website
+        self.options = BuildOptions() if options is None else options
+        self.pages = {}
+        self.spec_state = scan(website.spec_files())
+
+    def check_specs(self):
+        spec_state = scan(self.website.spec_files())
+        if spec_state != self.spec_state:
+            logger.info('Specs changed, reload them')
+            self.website.load_specs()
+            self.pages.clear()
+            self.spec_state = spec_state
+
+    def get_page(self, url):
+        self.check_specs()
+        website = self.website
+        page_dir = website.find_page(url)
+        if page_dir is None:
+            return None
+        cached = self.pages.get(url)
+        if cached is not None:
+            deps, inputs, html_page = cached
+            if website.hasher.get_inputs(deps, page_dir) == inputs:
+                logger.info('Page up to date: %s', url)
+                return html_page
+        logger.info('Render page: %s', url)
+        deps = Dependencies(page_dir)
+        page_spec = get_page_spec(url, website.specs, deps,
+                                  website.page_spec_cache)
+        html_page = get_html(page_dir, page_spec, deps, self.options,
+                             website.markdown_cache)
+        self.pages[url] = (deps, website.hasher.get_inputs(deps, page_dir),
+                           html_page)
+        return html_page
+
+    def get_stylesheet(self):
+        source_file = self.website.stylesheets_dir().join('page.scss')
+        if not source_file.check(file=1):
+            return None
+        css, _ = self.website.sass_cache.compile(source_file)
+        return css
+
+    def get_asset(self, path):
+        dirname, basename = posixpath.split(path)
+        page_dir = self.website.find_page(get_page_url(dirname))
+        if page_dir is None:
+            return None
+        asset = page_dir.join(basename)
+        if not asset.check(file=1):
+            return None
+        return asset.read_text(encoding='utf-8')
+
+    def get(self, path):
+        """Get the content type and text for a request path."""
+        ext = posixpath.splitext(path)[1]
+        if path == STYLESHEET:
+            text = self.get_stylesheet()
+        elif ext == '.css':
+            text = self.get_asset(path)
+        elif ext in ('', '.html'):
+            text = self.get_page(get_page_url(path))
+            ext = '.html'
+        else:
+            text = None
+        if text is None:
+            return None, None
+        return CONTENT_TYPES[ext], text
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = unquote(urlparse(self.path).path)
+        try:
+            content_type, text = self.server.site.get(path)
+        except Exception as e:
+            # Any error, eg. in a spec file or a template, is shown in the
+            # browser, and the server goes on
+            logger.exception('%s: %s', path, e)
+            text = traceback.format_exc()
+            if isinstance(text, bytes):
+                text = text.decode('utf-8', 'replace')
+            self.send_text(500, 'text/plain; charset=utf-8', text)
+            return
+        if text is None:
+            self.send_text(404, 'text/plain; charset=utf-8',
+                           u'Not found: {}\n'.format(path))
+            return
+        self.send_text(200, content_type, text)
+
+    def send_text(self, code, content_type, text):
+        body = text.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info('%s - ' + format, self.address_string(), *args)
+
+
+class PreviewServer(HTTPServer):
+
+    def __init__(self, site, host=HOST, port=PORT):
+        HTTPServer.__init__(self, (host, port), PreviewHandler)
+        self.site = site
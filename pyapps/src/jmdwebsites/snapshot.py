@@ -0,0 +1,86 @@
+import logging
+import os
+import time
+
+import py
+from six.moves import cPickle as pickle
+
+from . import __version__
+from .manifest import hash_file
+from .scanindex import RACY_TIME
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 3
+
+
+def stat_file(path):
+    if path is None:
+        return None
+    st = path.stat()
+    return st.mtime, st.size
+
+
+class SpecSnapshot(object):
+    """The specs merged from the spec files, pickled to load fast.
+
+    The snapshot is used while the spec files found are the same as last
+    time. A file with the same mtime and size is taken as unchanged,
+    otherwise it is checked against the hash of its content.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = py.path.local(filepath)
+
+    def load(self, paths):
+        """Load the specs, if the snapshot is of the spec files at paths.
+
+        A path is None for a spec file that wasn't found.
+        """
+        if not self.filepath.check(file=1):
+            return None
+        try:
+            with self.filepath.open('rb') as fileobj:
+                data = pickle.load(fileobj)
+        except Exception as e:
+            logger.warning('Invalid spec snapshot: %s: %s', self.filepath, e)
+            return None
+        if data.get('version') != SNAPSHOT_VERSION or \
+                data.get('jmdwebsites') != __version__:
+            return None
+        files = data['files']
+        if [strpath for strpath, _, _ in files] != \
+                [None if path is None else path.strpath for path in paths]:
+            logger.info('Spec files moved: %s', self.filepath)
+            return None
+        for path, (_, stat, digest) in zip(paths, files):
+            if path is None:
+                continue
+            if stat_file(path) == stat and stat[0] < data['time'] - RACY_TIME:
+                continue
+            if hash_file(path) != digest:
+                logger.info('Spec file changed: %s', path)
+                return None
+        logger.info('Load spec snapshot: %s', self.filepath)
+        return data['specs']
+
+    def dump(self, paths, specs):
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'jmdwebsites': __version__,
+            'time': time.time(),
+            'files': [(None, None, None) if path is None else
+                      (path.strpath, stat_file(path), hash_file(path))
+                      for path in paths],
+            'specs': specs,
+        }
+        tmp_path = self.filepath.new(basename='{}.{}.tmp'.format(
+            self.filepath.basename, os.getpid()))
+        try:
+            tmp_path.dirpath().ensure(dir=1)
+            with tmp_path.open('wb') as fileobj:
+                pickle.dump(data, fileobj, pickle.HIGHEST_PROTOCOL)
+            tmp_path.rename(self.filepath)
+        except EnvironmentError as e:
+            # Only a cache, so carry on without it
+            logger.warning('Dump spec snapshot: %s: %s', self.filepath, e)
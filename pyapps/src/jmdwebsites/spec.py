@@ -1,18 +1,37 @@
-from copy import deepcopy
+from copy import copy
 import logging
 import os
 
 from .error import JmdwebsitesError
-from .log import WRAPPER
-from .orderedyaml import OrderedYaml, CommentedMap
+from .orderedyaml import ordereddict
+from .trace import trace, Dump, SPEC
 
 class SpecError(JmdwebsitesError): pass
 class SpecWalkerError(SpecError): pass
 class AncestorNotFoundError(SpecError): pass
+class InvalidSpecError(SpecError): pass
 
 logger = logging.getLogger(__name__)
 
 
+class SpecMap(ordereddict):
+    """A map of the specs in memory.
+
+    A plain ordered dict, without the comments and positions of the
+    CommentedMaps loaded from YAML, so it is faster to copy, walk and look
+    up. The specs are shared by the pages, so aren't changed once loaded.
+    """
+    __slots__ = ()
+
+    def update(self, other):
+        try:
+            ordereddict.update(self, other)
+        except TypeError:
+            # A plain dict, which has no order to keep
+            for key in other:
+                self[key] = other[key]
+
+
 def spec_walker(parent, parent_path=''):
     if not isinstance(parent, dict):
         raise SpecWalkerError('Not a dictionary: {}'.format(root))
@@ -25,42 +44,88 @@ def spec_walker(parent, parent_path=''):
                 yield path, root, key, value
 
 
-def ensure_spec(spec, names=None):
-    names = set(names)
+def to_spec(data):
+    """Convert data loaded from YAML to SpecMaps and lists."""
+    if isinstance(data, dict):
+        return SpecMap((key, to_spec(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return [to_spec(item) for item in data]
+    return data
+
+
+def validate_specs(specs):
+    """Check that the page specs, and the spec types they use, are maps.
+
+    Done once, as the specs are loaded, rather than by each page.
+    """
+    if not isinstance(specs, dict):
+        raise InvalidSpecError('Specs not a map: {!r}'.format(specs))
+    page_specs = specs.get('pages')
+    if page_specs is None:
+        return specs
+    if not isinstance(page_specs, dict):
+        raise InvalidSpecError('Page specs not a map: {!r}'.format(page_specs))
+    for name, page_spec in page_specs.items():
+        if page_spec is None:
+            continue
+        if not isinstance(page_spec, dict):
+            raise InvalidSpecError('Page spec not a map: {}: {!r}'.format(
+                name, page_spec))
+        for type_ in page_spec:
+            if type_ != 'inherit' and not isinstance(specs.get(type_), dict):
+                raise InvalidSpecError(
+                    'Spec type not a map: {}: used by page spec: {}'.format(
+                        type_, name))
+    return specs
+
+
+def ensure_spec(spec, names=()):
+    """Get spec, with an empty map for each of names it is missing.
+
+    spec itself isn't changed. A spec with all of names, eg. a compiled page
+    spec, is returned as it is.
+    """
     if spec is None:
         logger.warning('No spec: %r', spec)
-        spec = CommentedMap()
-    if names is not None:
-        for name in names:
-            try:
-                _subspec = spec[name]
-            except TypeError:
-                logger.warning('Invalid spec type: spec: %r', spec)
-                spec = CommentedMap()
-                spec[name] = CommentedMap()
-                raise TypeError
-            except KeyError:
-                logger.warning('Not found in spec: %r', name)
-                spec[name] = CommentedMap()
+        return SpecMap((name, SpecMap()) for name in names)
+    if not isinstance(spec, dict):
+        logger.warning('Invalid spec type: spec: %r', spec)
+        raise TypeError
+    missing = [name for name in names if name not in spec]
+    if not missing:
+        return spec
+    spec = copy(spec)
+    for name in missing:
+        logger.warning('Not found in spec: %r', name)
+        spec[name] = SpecMap()
     return spec
 
 
 def get_spec(name, root):
+    """Merge a spec with its inherit: ancestors.
+
+    The values are shared with the ancestors, not copied, so the spec must
+    not be changed in place. Only the maps merged from more than one
+    ancestor are new, copied when an ancestor first adds to them.
+    """
     ancestors = [root[name]] + [anc for anc in inheritor(root[name], root) if anc]
-    logger.debug('Inheritance:' + WRAPPER, OrderedYaml(ancestors))
+    trace(SPEC, 'Inheritance of %r', name, Dump(ancestors))
     if not ancestors:
-        return CommentedMap()
-    spec = deepcopy(ancestors[-1])
+        return SpecMap()
+    spec = SpecMap()
+    merged = set()
     for ancestor in reversed(ancestors):
         for key, value in ancestor.items():
-            value_copy = deepcopy(value)
             if isinstance(value, dict) and 'inherit' in value:
-                spec.setdefault(key, CommentedMap())
-                spec[key].update(value_copy)
+                if key not in merged:
+                    spec[key] = copy(spec[key]) if key in spec else SpecMap()
+                    merged.add(key)
+                spec[key].update(value)
                 del spec[key]['inherit']
             else:
-                spec[key] = value_copy
-    del spec['inherit']
+                spec[key] = value
+                merged.discard(key)
+    spec.pop('inherit', None)
     return spec
 
 
@@ -77,3 +142,21 @@ def inheritor(current, root):
         except KeyError:
             raise AncestorNotFoundError('Not found: inherited: {}'.format(inherited))
         yield current
+
+
+def ancestry(name, root):
+    """Get the names of a spec and of its inherit: ancestors."""
+    yield name
+    current = root[name]
+    while(current):
+        try:
+            inherited = current['inherit']
+        except KeyError:
+            break
+        if not inherited:
+            break
+        try:
+            current = root[inherited]
+        except KeyError:
+            raise AncestorNotFoundError('Not found: inherited: {}'.format(inherited))
+        yield inherited
@@ -1,24 +1,222 @@
+import json
+import logging
 import os
+import re
 
-import sass
+import py
+import six
 
 from .error import JmdwebsitesError, PathNotFoundError
+from .lazy import lazy_import
+from .manifest import hash_file, hash_text
 
+sass = lazy_import('sass')
 
 class SassError(JmdwebsitesError): pass
 
+logger = logging.getLogger(__name__)
 
-def build_css(source_file, target_file, use_cmdline=False, use_string=False):
+# libsass output styles: nested is its default, compressed is minified
+NESTED = 'nested'
+COMPRESSED = 'compressed'
+
+# Strings are matched too, so comment markers in them are left alone
+comment_regexp = re.compile(
+    r'("(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\')|/\*.*?\*/|//[^\n]*',
+    re.DOTALL)
+import_regexp = re.compile(r'@import\s+([^;]+);')
+import_name_regexp = re.compile(r'"([^"]+)"|\'([^\']+)\'')
+css_import_regexp = re.compile(r'^(https?:)?//|\.css$')
+
+
+def strip_comments(text):
+    return comment_regexp.sub(lambda match: match.group(1) or u'', text)
+
+
+def import_name_finder(text):
+    """Find the names of the sass files imported in scss text.
+
+    Imports that are plain css, eg. url(...) or a .css file, are left to
+    the browser, so are skipped.
+    """
+    for match in import_regexp.finditer(strip_comments(text)):
+        args = match.group(1)
+        if 'url(' in args:
+            continue
+        for name_match in import_name_regexp.finditer(args):
+            name = name_match.group(1) or name_match.group(2)
+            if not css_import_regexp.search(name):
+                yield name
+
+
+def import_candidates(dirpath, name):
+    dirname, _, basename = name.rpartition('/')
+    if dirname:
+        dirpath = dirpath.join(dirname)
+    if os.path.splitext(basename)[1] in ('.scss', '.sass'):
+        basenames = ['_' + basename, basename]
+    else:
+        basenames = [prefix + basename + suffix
+                     for suffix in ('.scss', '.sass', '.css')
+                     for prefix in ('_', '')]
+        basenames += [basename + '/_index.scss', basename + '/index.scss']
+    return [dirpath.join(basename) for basename in basenames]
+
+
+def resolve_import(name, dirpath, include_paths=()):
+    # Like libsass, look next to the importing file first
+    for search_dir in [dirpath] + list(include_paths):
+        for path in import_candidates(py.path.local(search_dir), name):
+            if path.check(file=1):
+                return path
+    return None
+
+
+def import_graph(source_file, include_paths=()):
+    """Get the files source_file imports, directly or indirectly.
+
+    The files are listed in the order they are first imported, with None
+    for any import that can't be found.
+    """
+    imports = [(None, source_file)]
+    seen = set([source_file])
+    queue = [source_file]
+    while queue:
+        path = queue.pop(0)
+        text = path.read_text(encoding='utf-8')
+        for name in import_name_finder(text):
+            imported = resolve_import(name, path.dirpath(), include_paths)
+            if imported is None:
+                imports.append((name, None))
+                continue
+            if imported not in seen:
+                seen.add(imported)
+                imports.append((name, imported))
+                queue.append(imported)
+    return imports
+
+
+def hash_imports(source_file, include_paths=()):
+    """Hash the files in the import graph of source_file.
+
+    Keys are named like the manifest inputs, relative to the source file
+    dir, and an import that can't be found is import:<name>, so the hashes
+    change when it turns up.
+    """
+    root = source_file.dirpath()
+    hashes = {}
+    for name, path in import_graph(source_file, include_paths):
+        if path is None:
+            hashes['import:' + name] = None
+        else:
+            hashes['file:' + (path.relto(root) or path.strpath)] = hash_file(path)
+    return hashes
+
+
+def changed_inputs(old_inputs, new_inputs):
+    return sorted(key.partition(':')[2]
+                  for key in set(old_inputs) | set(new_inputs)
+                  if old_inputs.get(key) != new_inputs.get(key))
+
+
+class SassCache(object):
+    """The css last compiled from each stylesheet, and what it came from.
+
+    Kept under cache_dir, so it outlasts the build dir. The record of the
+    hashes of the import graph shows which files changed when the css has
+    to be compiled again.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = py.path.local(cache_dir)
+
+    def get_path(self, source_file):
+        return self.cache_dir.join(hash_text(source_file.strpath) + '.json')
+
+    def load(self, source_file, output_style=NESTED):
+        path = self.get_path(source_file)
+        if not path.check(file=1):
+            return None
+        try:
+            record = json.loads(path.read_text(encoding='utf-8'))
+        except ValueError as e:
+            logger.warning('Invalid sass cache: %s: %s', path, e)
+            return None
+        if record.get('libsass') != sass.libsass_version or \
+                record.get('output_style', NESTED) != output_style:
+            return None
+        return record
+
+    def dump(self, source_file, inputs, css, output_style=NESTED):
+        record = {'libsass': sass.libsass_version, 'inputs': inputs, 'css': css,
+                  'output_style': output_style}
+        self.get_path(source_file).write_text(
+            six.text_type(json.dumps(record)), ensure=True, encoding='utf-8')
+
+    def compile(self, source_file, use_string=False, output_style=NESTED):
+        """Compile source_file, unless nothing in its import graph changed.
+
+        Returns the css, and the files that changed since last time.
+        """
+        inputs = hash_imports(source_file)
+        record = self.load(source_file, output_style)
+        if record is None:
+            changed = [source_file.basename]
+            logger.info('Compile %s: Not cached', source_file)
+        else:
+            changed = changed_inputs(record['inputs'], inputs)
+            if not changed:
+                logger.info('Use cached css for %s', source_file)
+                return record['css'], changed
+            logger.info('Compile %s: Changed: %s', source_file,
+                        ', '.join(changed))
+        css = compile_css(source_file, use_string, output_style)
+        self.dump(source_file, inputs, css, output_style)
+        return css, changed
+
+
+def minify_css(css):
+    """Tidy up css compressed by libsass.
+
+    libsass starts css that isn't ascii with a byte order mark, which is
+    shorter than a charset rule, so no charset rule is added. The
+    trailing newline goes too.
+    """
+    return css.rstrip()
+
+
+def compile_css(source_file, use_string=False, output_style=NESTED):
+    if use_string:
+        source_sass = source_file.read_text(encoding='utf-8')
+        compiled_css = sass.compile(string=source_sass, include_paths=(source_file.dirname,),
+                                    output_style=output_style)
+    else:
+        compiled_css = sass.compile(filename=source_file.strpath,
+                                    output_style=output_style)
+    if output_style == COMPRESSED:
+        return minify_css(compiled_css)
+    return '@charset "UTF-8";\n' + compiled_css
+
+
+def build_css(source_file, target_file, use_cmdline=False, use_string=False,
+              cache=None, output_style=NESTED):
+    """Compile source_file to target_file.
+
+    With a cache, the css compiled last time is used if nothing in the
+    import graph has changed. Returns the files that changed, which is
+    empty if the cached css was used, or None without a cache.
+    """
     if use_cmdline:
         sass_cmdline = "sass23 {0} {1}".format(source_file, target_file)
         error_code = os.system(sass_cmdline)
         if error_code:
             raise SassError('Error code: %s' % error_code)
-        return
-    if use_string:
-        source_sass = source_file.read_text(encoding='utf-8') 
-        compiled_css = sass.compile(string=source_sass, include_paths=(source_file.dirname,))
+        return None
+    if cache is None:
+        changed = None
+        stylesheet_text = compile_css(source_file, use_string, output_style)
     else:
-        compiled_css = sass.compile(filename=source_file.strpath)
-    stylesheet_text = '@charset "UTF-8";\n' + compiled_css
+        stylesheet_text, changed = cache.compile(source_file, use_string,
+                                                 output_style)
     target_file.write_text(stylesheet_text, ensure=True, encoding='utf-8')
+    return changed
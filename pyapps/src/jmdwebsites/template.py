@@ -1,14 +1,61 @@
 import logging
 
+from .cache import LRUCache
 from .error import JmdwebsitesError
+from .manifest import hash_spec, hash_text
 from .spec import ensure_spec
-from .log import WRAPPER
+from .trace import trace, TEMPLATE
 
 class TemplateError(JmdwebsitesError): pass
 class PartialNotFoundError(TemplateError): pass
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_CACHE_SIZE = 256
+SUBSPEC_DIGESTS_SIZE = 1024
+TEMPLATE_SPEC_TYPES = ('layouts', 'partials', 'descriptions')
+
+
+class TemplateCache(LRUCache):
+    """Templates, keyed by a fingerprint of the specs they are made from.
+
+    Pages that share a layout share a template.
+    """
+
+    def __init__(self, maxsize=TEMPLATE_CACHE_SIZE):
+        LRUCache.__init__(self, maxsize)
+
+
+class UsedPartials(list):
+
+    def add_partial(self, partial_name):
+        if partial_name not in self:
+            self.append(partial_name)
+
+
+class SubspecDigests(LRUCache):
+    """Hashes of the subspecs of page specs, keyed by their identity.
+
+    A subspec is shared by the pages that use it, and isn't changed once
+    made, so it is only hashed once, not for every page.
+    """
+
+    def __init__(self, maxsize=SUBSPEC_DIGESTS_SIZE):
+        LRUCache.__init__(self, maxsize)
+
+    def digest(self, subspec):
+        entry = self.get(id(subspec))
+        # The entry holds the subspec, so its id isn't reused while cached
+        if entry is not None and entry[0] is subspec:
+            return entry[1]
+        digest = hash_spec(subspec)
+        self.put(id(subspec), (subspec, digest))
+        return digest
+
+
+template_cache = TemplateCache()
+subspec_digests = SubspecDigests()
+
 
 def ensure_unicode(text):
     #print('ensure_unicode:', type(text), repr(text))
@@ -17,12 +64,35 @@ def ensure_unicode(text):
     return unicode(text)
 
 
-def get_template(spec, name='doc'):
+def get_fingerprint(spec, name='doc', digests=subspec_digests):
+    if spec is None:
+        spec = {}
+    return hash_text(u' '.join([name] + [digests.digest(spec.get(type_))
+                                         for type_ in TEMPLATE_SPEC_TYPES]))
+
+
+def get_template(spec, name='doc', deps=None, cache=template_cache):
+    if cache is not None:
+        fingerprint = get_fingerprint(spec, name)
+        cached = cache.get(fingerprint)
+        if cached is not None:
+            logger.debug('Get template from cache: %s', fingerprint)
+            template, used_partials = cached
+            trace(TEMPLATE, 'Template %s', fingerprint, template)
+            if deps is not None:
+                for partial_name in used_partials:
+                    deps.add_partial(partial_name)
+            return template
     logger.debug('Create template from spec')
-    template = u'\n'.join(partial_getter(spec)) + u'\n'
-    template = ensure_unicode(template)
-    logger.debug('Show template:' + WRAPPER, template)
+    used_partials = UsedPartials()
+    template = u'\n'.join(partial_getter(spec, deps=used_partials)) + u'\n'
     template = ensure_unicode(template)
+    trace(TEMPLATE, 'Template', template)
+    if deps is not None:
+        for partial_name in used_partials:
+            deps.add_partial(partial_name)
+    if cache is not None:
+        cache.put(fingerprint, (template, used_partials))
     return template
 
 
@@ -34,7 +104,7 @@ def description(name, spec):
         return name
 
     
-def partial_getter(spec, name='doc'):
+def partial_getter(spec, name='doc', deps=None):
     spec = ensure_spec(spec, ('layouts', 'partials'))
     layouts = spec['layouts']
     try:
@@ -46,18 +116,19 @@ def partial_getter(spec, name='doc'):
         for child_name, partial_name in top.items():
             if partial_name is None:
                 partial_name = child_name
+            if deps is not None:
+                deps.add_partial(partial_name)
             try:
                 fmt = spec['partials'][partial_name]
                 fmt = ensure_unicode(fmt)
             except KeyError:
                 raise PartialNotFoundError('Partial not found: {}'.format(partial_name))
             if child_name in layouts and layouts[child_name]:
-                child = u'\n'.join(partial_getter(spec, name=child_name))
+                child = u'\n'.join(partial_getter(spec, name=child_name, deps=deps))
                 child = u'\n{}\n'.format(child)
             else:
                 logger.debug('Get partial: leaf: %s', child_name)
                 child = u'{{{0}}}'.format(child_name)
-            fmt = ensure_unicode(fmt)
             child_name = ensure_unicode(child_name)
             child = ensure_unicode(child)
             partial = fmt.format(**{'partialname': child_name, 
@@ -0,0 +1,74 @@
+"""Traces of the specs, content, templates and html of each page, for
+debugging a build.
+
+Each category of trace is switched on on its own, and all are off by
+default, so a trace that is off costs only a set lookup. Traces that are
+on are logged at DEBUG level to jmdwebsites.trace.<category>, and their
+data is only dumped if a handler emits the record.
+"""
+import json
+import logging
+
+from .error import JmdwebsitesError
+from .log import WRAPPER
+
+class TraceError(JmdwebsitesError): pass
+
+SPEC = 'spec'
+CONTENT = 'content'
+TEMPLATE = 'template'
+RENDER = 'render'
+CATEGORIES = (SPEC, CONTENT, TEMPLATE, RENDER)
+ALL = 'all'
+
+# The categories that are switched on
+_enabled = set()
+
+loggers = dict((category, logging.getLogger('{}.{}'.format(__name__, category)))
+               for category in CATEGORIES)
+
+
+def set_tracing(categories=()):
+    """Switch on the categories of trace, and switch off the rest."""
+    categories = set(categories)
+    if ALL in categories:
+        categories = set(CATEGORIES)
+    unknown = categories.difference(CATEGORIES)
+    if unknown:
+        raise TraceError('Unknown trace categories: {}'.format(
+            ', '.join(sorted(unknown))))
+    _enabled.clear()
+    _enabled.update(categories)
+
+
+def get_tracing():
+    return sorted(_enabled)
+
+
+def tracing(category):
+    return category in _enabled
+
+
+class Dump(object):
+    """Data, dumped as text only when a trace of it is emitted."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __unicode__(self):
+        text = json.dumps(self.data, indent=2, ensure_ascii=False, default=repr)
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        return text
+
+    def __str__(self):
+        return self.__unicode__().encode('utf-8')
+
+
+def trace(category, msg, *args):
+    """Log msg with args, the last of which, eg. a Dump, is shown between
+    start and end lines."""
+    if category in _enabled:
+        logger = loggers[category]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(msg + ':' + WRAPPER, *args)
@@ -0,0 +1,160 @@
+import logging
+import os
+import time
+
+from .options import BuildOptions, POLL_INTERVAL
+from .website import content_finder, POSTS
+
+logger = logging.getLogger(__name__)
+
+SETTLE_TIME = 0.2
+
+
+def scan(paths):
+    """Get the mtime and size of the files in paths, and the files under them."""
+    state = {}
+    for path in paths:
+        path = str(path)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            state[path] = (stat.st_mtime, stat.st_size)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            state[dirpath] = None
+            for filename in filenames:
+                filepath = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(filepath)
+                except OSError:
+                    # Removed since the walk listed it
+                    continue
+                state[filepath] = (stat.st_mtime, stat.st_size)
+    return state
+
+
+def get_changes(old_state, new_state):
+    return set(path for path in set(old_state) | set(new_state)
+               if old_state.get(path) != new_state.get(path))
+
+
+def is_within(path, dirpath):
+    return path == dirpath or path.startswith(dirpath + os.sep)
+
+
+class Watcher(object):
+    """Rebuild the parts of a website affected by changes to its files.
+
+    The website is kept in memory, along with its specs, templates and
+    caches, so a rebuild only reads the files that changed. A change to
+    a spec file reloads the specs and checks every page, a change to a
+    page source dir rebuilds the pages that use it, a change to a post
+    updates the post index and the listing pages it changes, and a change
+    to the stylesheets rebuilds the stylesheet.
+    """
+
+    def __init__(self, website, options=None, interval=POLL_INTERVAL,
+                 settle=SETTLE_TIME):
+        self.website = website
+        self.options = BuildOptions() if options is None else options
+        self.interval = interval
+        self.settle = settle
+        self.manifest = None
+        self.pages = None
+        self.state = {}
+
+    def watch_paths(self):
+        website = self.website
+        content_dirs = [content_dir for _, content_dir in
+                        content_finder(website.specs, website.site_dir)]
+        return website.spec_files() + content_dirs + [website.stylesheets_dir()]
+
+    def scan(self):
+        return scan(self.watch_paths())
+
+    def build(self, jobs=1):
+        """Build the whole website, to start watching from."""
+        website = self.website
+        website.build(jobs=jobs, options=self.options)
+        self.manifest = website.get_manifest(self.options)
+        self.manifest.load()
+        # The manifest loaded is of the build just done, so is current,
+        # and a partial rebuild keeps the targets it doesn't check
+        self.manifest.current = dict(self.manifest.targets)
+        self.pages = list(website.page_finder())
+        self.state = self.scan()
+
+    def poll(self):
+        """Wait for changes, and then for them to stop, to batch a burst of
+        changes, eg. from a checkout or a save all, into one rebuild."""
+        while True:
+            time.sleep(self.interval)
+            new_state = self.scan()
+            changes = get_changes(self.state, new_state)
+            if changes:
+                break
+        while True:
+            time.sleep(self.settle)
+            settled_state = self.scan()
+            more_changes = get_changes(new_state, settled_state)
+            if not more_changes:
+                break
+            changes |= more_changes
+            new_state = settled_state
+        self.state = new_state
+        return changes
+
+    def rebuild(self, changes):
+        website = self.website
+        manifest = self.manifest
+        start = time.time()
+        spec_files = set(str(path) for path in website.spec_files())
+        stylesheets_dir = str(website.stylesheets_dir())
+        specs_changed = any(path in spec_files for path in changes)
+        if specs_changed:
+            logger.info('Specs changed, reload them')
+            website.load_specs()
+        website.scan()
+        pages = list(website.page_finder())
+        if specs_changed or pages != self.pages:
+            # Check every page, and remove the pages that have gone.
+            # This is also the way to recover from a failed rebuild.
+            manifest.next_build()
+            website.build_pages(manifest, self.options)
+            website.build_posts(manifest, self.options)
+            website.build_stylesheets(manifest, self.options)
+            manifest.remove_stale()
+        else:
+            manifest.next_build(partial=True)
+            changed_pages = [
+                (url, page_dir) for url, page_dir in pages
+                if any(is_within(path, str(page_dir)) for path in changes)]
+            website.build_pages(manifest, self.options, pages=changed_pages)
+            post_dirs = [str(source_dir) for content_group, source_dir in
+                         content_finder(website.specs, website.site_dir)
+                         if content_group == POSTS]
+            if any(is_within(path, post_dir) for path in changes
+                   for post_dir in post_dirs):
+                website.build_posts(manifest, self.options)
+            if any(is_within(path, stylesheets_dir) for path in changes):
+                website.build_stylesheets(manifest, self.options)
+        website.markdown_cache.evict()
+        website.scan_index.dump()
+        manifest.dump()
+        self.pages = pages
+        logger.info('Rebuilt in %.3fs', time.time() - start)
+
+    def run(self, jobs=1):
+        self.build(jobs=jobs)
+        try:
+            while True:
+                changes = self.poll()
+                logger.info('Changed: %s', ', '.join(sorted(changes)))
+                try:
+                    self.rebuild(changes)
+                except Exception as e:
+                    # Keep watching, so the error can be fixed
+                    logger.error('Rebuild failed: %s', e)
+                    logger.debug('Rebuild failed', exc_info=True)
+                    self.pages = None
+        except KeyboardInterrupt:
+            logger.info('Stop watching')
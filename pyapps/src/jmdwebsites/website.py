@@ -6,31 +6,53 @@ import py
 
 from . import html
 from . import orderedyaml
+from . import parallel
+from . import profiler
 from . import stylesheet
+from .assets import AssetStore
+from .compress import CompressedCache, Compressor
 from .error import JmdwebsitesError, PathNotFoundError
-from .orderedyaml import CommentedMap
-from .page import get_page_spec, build_page
+from .content import MarkdownCache
+from .manifest import BuildManifest, MANIFEST_FILE
+from .options import BuildOptions, PRODUCTION
+from .deps import DependencyHasher
+from .page import get_page_spec, get_page_deps, build_page, PageSpecCache
+from .posts import PostIndex, PostIndexError, build_listing, \
+                   get_post_index_config, listing_finder, POST_INDEX_FILE
+from .scanindex import ScanIndex
+from .snapshot import SpecSnapshot
 from .project import protected_remove, get_project_dir, \
                      init_project, new_project, load_specs
-from .spec import ensure_spec
+from .spec import ensure_spec, to_spec, validate_specs, SpecMap
 from .stylesheet import SassError
 from .utils import find_path
+from .writer import OutputWriter
 
 logger = logging.getLogger(__name__)
 
 PROJDIR = '.jmdwebsite'
+CACHE = 'cache'
+MARKDOWN = 'markdown'
+SASS = 'sass'
+ASSETS = 'assets'
+COMPRESSED = 'compressed'
+PROFILE = 'profile'
+SCAN_FILE = 'scan.json'
+SPECS_FILE = 'specs.pickle'
 BUILD = 'build'
 CONTENT = 'content'
 CONTENT_GROUP = 'content_group'
 CONFIG_FILE = 'site.yaml'
 THEME_FILE = 'theme.yaml'
 CONTENT_FILE = 'content.yaml'
+SPEC_FILES = (CONFIG_FILE, THEME_FILE, CONTENT_FILE)
 HOME = 'home'
 PAGES = 'pages'
 POSTS = 'posts'
 
 class WebsiteError(JmdwebsitesError): pass
 class InvalidContentGroupError(WebsiteError): pass
+class PageNotFoundError(WebsiteError): pass
 
 
 def content_finder(site, site_dir):
@@ -52,13 +74,17 @@ def content_finder(site, site_dir):
             yield content_group, group_dir
 
 
-def page_finder(content_group, content_dir):
+def page_finder(content_group, content_dir, index=None):
     logger.info('Build content: %s: %s', content_group, content_dir)
     if content_group == HOME:
         url = '/'
         yield url, content_dir 
     else:
-        for page_path in content_dir.visit(fil=lambda path: path.check(dir=1)):
+        if index is None:
+            page_paths = content_dir.visit(fil=lambda path: path.check(dir=1))
+        else:
+            page_paths = index.find_dirs(content_dir)
+        for page_path in page_paths:
             url = get_url(page_path.relto(content_dir))
             yield url, page_path
 
@@ -69,17 +95,39 @@ def get_url(rel_page_path):
     return url
 
 
-def get_specs(locations):
-    site_specs = load_specs(CONFIG_FILE, locations)
-    theme_specs = load_specs(THEME_FILE, locations)
-    content_specs = load_specs(CONTENT_FILE, locations)
-    specs = CommentedMap()
+def find_spec_files(locations):
+    for basename in SPEC_FILES:
+        try:
+            yield find_path(basename, locations=locations)
+        except PathNotFoundError:
+            yield None
+
+
+def get_specs(locations, fast=False, snapshot=None):
+    """Load the spec files, and merge them.
+
+    The specs are converted to SpecMaps, and validated, as they are loaded.
+    With a snapshot, the specs are loaded from it if the spec files haven't
+    changed, and otherwise saved to it.
+    """
+    if snapshot is not None:
+        paths = list(find_spec_files(locations))
+        specs = snapshot.load(paths)
+        if specs is not None:
+            return specs
+    site_specs = load_specs(CONFIG_FILE, locations, fast)
+    theme_specs = load_specs(THEME_FILE, locations, fast)
+    content_specs = load_specs(CONTENT_FILE, locations, fast)
+    specs = SpecMap()
     if isinstance(site_specs, dict):
-        specs.update(site_specs)
+        specs.update(to_spec(site_specs))
     if isinstance(theme_specs, dict):
-        specs.update(theme_specs)
+        specs.update(to_spec(theme_specs))
     if isinstance(content_specs, dict):
-        specs.update(content_specs)
+        specs.update(to_spec(content_specs))
+    validate_specs(specs)
+    if snapshot is not None:
+        snapshot.dump(paths, specs)
     return specs
 
 
@@ -126,12 +174,41 @@ class Website(object):
         else:
             self.build_dir = py.path.local(build_dir)
         logger.info('Build website in %s', self.build_dir)
+        self.cache_dir = self.site_dir.join(PROJDIR, CACHE)
+        self.markdown_cache = MarkdownCache(self.cache_dir.join(MARKDOWN))
+        self.sass_cache = stylesheet.SassCache(self.cache_dir.join(SASS))
+        self.asset_store = AssetStore(self.cache_dir.join(ASSETS))
+        self.compressed_cache = CompressedCache(self.cache_dir.join(COMPRESSED))
+        self.scan_index = ScanIndex(self.cache_dir.join(SCAN_FILE))
+        self.spec_snapshot = SpecSnapshot(self.cache_dir.join(SPECS_FILE))
+        self.post_index = PostIndex(self.cache_dir.join(POST_INDEX_FILE))
+        self.profile_dir = self.site_dir.join(PROJDIR, PROFILE)
         self.locations = [
             self.site_dir,  
             py.path.local(__file__).dirpath()
         ]
-        self.specs = get_specs(self.locations)
+        self.load_specs()
+
+    def load_specs(self):
+        # The comments are only needed to rewrite the spec files
+        with profiler.stage('specs'):
+            self.specs = get_specs(self.locations, fast=True,
+                                   snapshot=self.spec_snapshot)
         self.theme_dir  = get_theme_dir(self.specs, self.site_dir, self.locations)
+        # Shared by the builds of this website until the specs change
+        self.hasher = DependencyHasher(self.specs, self.scan_index)
+        self.page_spec_cache = PageSpecCache(self.specs)
+
+    def spec_files(self):
+        return [self.site_dir.join(basename) for basename in SPEC_FILES]
+
+    def stylesheets_dir(self):
+        return self.theme_dir.join('stylesheets')
+
+    def scan(self):
+        """Sweep the content dirs, to find the files of a build in."""
+        self.scan_index.scan(source_dir for _, source_dir in
+                             content_finder(self.specs, self.site_dir))
 
     def clean(self):
         """Clean up the build."""
@@ -146,29 +223,144 @@ class Website(object):
         #    protected_remove(self.build_dir)
         #else:
         #    print('clobber: No such build dir: {}'.format(self.build_dir))
+        self.get_manifest().remove()
         protected_remove(self.build_dir)
 
-    def build(self):
+    def get_manifest(self, options=None):
+        return BuildManifest(self.cache_dir.join(MANIFEST_FILE), self.build_dir,
+                             options)
+
+    def build(self, jobs=1, options=None):
         """Build the website."""
-        #TODO: Write code to update files only if they have changed.
-        #      But until then, clobber the build first, 
-        #      and then build everything from new.
-        if self.build_dir.check():
+        if options is None:
+            options = BuildOptions()
+        # Only update the files whose inputs have changed since the last 
+        # build. Without a valid manifest, there is no record of what is 
+        # in the build dir, so clobber it and build everything from new.
+        manifest = self.get_manifest(options)
+        if not manifest.load() and self.build_dir.check():
             protected_remove(self.build_dir)
-        assert self.build_dir.check() == False, \
-            'Build directory already exists.'.format(self.build_dir)
         self.build_dir.ensure(dir=1)
-        self.build_pages()
-        self.build_stylesheets()
+        self.scan_index.load()
+        self.scan()
+        self.build_pages(manifest, options, jobs=jobs)
+        self.build_posts(manifest, options)
+        self.markdown_cache.evict()
+        with profiler.stage('stylesheets'):
+            self.build_stylesheets(manifest, options)
+        self.compressed_cache.evict()
+        manifest.remove_stale()
+        self.asset_store.prune()
+        self.scan_index.dump()
+        manifest.dump()
 
-    def build_pages(self):
+    def page_finder(self):
         for content_group, source_dir in content_finder(self.specs, self.site_dir):
-            for url, page_dir in page_finder(content_group, source_dir):
-                build_page(url, self.specs, page_dir, self.build_dir)
+            for url, page_dir in page_finder(content_group, source_dir,
+                                             self.scan_index):
+                yield url, page_dir
+
+    def post_finder(self):
+        for content_group, source_dir in content_finder(self.specs, self.site_dir):
+            if content_group == POSTS:
+                for url, page_dir in page_finder(content_group, source_dir,
+                                                 self.scan_index):
+                    yield url, page_dir
+
+    def build_posts(self, manifest=None, options=None):
+        """Update the post index, and build the listing pages made from it,
+        if the site has a post_index: spec."""
+        config = get_post_index_config(self.specs)
+        if config is None:
+            return
+        logger.info('Build post listings')
+        with profiler.stage('post_index'):
+            self.post_index.update(self.post_finder(), self.scan_index)
+            self.post_index.dump()
+        page_urls = set(url for url, _ in self.page_finder())
+        compressor = self.get_compressor(options)
+        with OutputWriter() as writer:
+            for listing in listing_finder(self.post_index, config):
+                if listing.url in page_urls:
+                    raise PostIndexError(
+                        'Listing page is at the url of a page: {}'.format(
+                            listing.url))
+                # Timed as a page, so its stages aren't counted twice
+                with profiler.page(listing.url):
+                    build_listing(listing, self.specs, self.build_dir, config,
+                                  manifest, self.hasher, self.page_spec_cache,
+                                  options, writer, compressor)
+
+    def get_compressor(self, options=None):
+        if options is None or not options.compress:
+            return None
+        return Compressor(options.compress, options.compress_min_size,
+                          self.compressed_cache)
+
+    def build_pages(self, manifest=None, options=None, jobs=1, pages=None):
+        if pages is None:
+            pages = self.page_finder()
+        compressor = self.get_compressor(options)
+        if jobs == 1:
+            # Write the pages in the background, while the next are built.
+            # The worker processes of a parallel build overlap already.
+            pages = list(pages)
+            with OutputWriter() as writer:
+                writer.make_dirs(self.build_dir.join(url) for url, _ in pages)
+                for url, page_dir in pages:
+                    with profiler.page(url):
+                        build_page(url, self.specs, page_dir, self.build_dir, 
+                                   manifest, self.hasher, self.page_spec_cache,
+                                   options, self.markdown_cache,
+                                   self.asset_store, self.scan_index, writer,
+                                   compressor)
+        else:
+            parallel.build_pages(pages, self.specs, 
+                                 self.build_dir, manifest, options,
+                                 self.markdown_cache, self.asset_store,
+                                 self.scan_index, compressor, jobs=jobs)
+
+    def find_page(self, url):
+        """Find the source dir of the page at url, without a walk of all
+        the content dirs. Like a build, the last content group wins."""
+        found = None
+        for content_group, source_dir in content_finder(self.specs, self.site_dir):
+            if content_group == HOME:
+                if url == '/':
+                    found = source_dir
+            elif url != '/':
+                page_dir = source_dir.join(url)
+                if page_dir.check(dir=1) and \
+                        get_url(page_dir.relto(source_dir)) == url:
+                    found = page_dir
+        return found
+
+    def get_page_deps(self, url, options=None):
+        """Get the inputs a page is built from."""
+        for page_url, page_dir in self.page_finder():
+            if page_url == url:
+                return get_page_deps(url, self.specs, page_dir, options=options)
+        raise PageNotFoundError('Page not found: {}'.format(url))
 
-    def build_stylesheets(self):
+    def build_stylesheets(self, manifest=None, options=None):
         logger.info('Build stylesheets')
-        src = self.theme_dir.join('stylesheets/page.scss')
+        src = self.stylesheets_dir().join('page.scss')
         if py.path.local(src).check(file=1):
             tgt = self.build_dir.join('page.css')
-            stylesheet.build_css(src, tgt)
+            target = tgt.relto(self.build_dir)
+            if manifest is not None:
+                inputs = stylesheet.hash_imports(src)
+                if manifest.is_current(target, inputs):
+                    logger.info('Stylesheet up to date: %s', tgt)
+                    return
+            output_style = stylesheet.NESTED
+            if options is not None and options.mode == PRODUCTION:
+                output_style = stylesheet.COMPRESSED
+            stylesheet.build_css(src, tgt, cache=self.sass_cache,
+                                 output_style=output_style)
+            outputs = [tgt]
+            compressor = self.get_compressor(options)
+            if compressor is not None:
+                outputs.extend(compressor.compress_file(tgt))
+            if manifest is not None:
+                manifest.update(target, inputs, outputs)
@@ -0,0 +1,131 @@
+import errno
+import logging
+import os
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+logger = logging.getLogger(__name__)
+
+WRITER_THREADS = 4
+QUEUE_SIZE = 32
+
+
+def is_unchanged(path, data):
+    """Check if the file at path already holds data, without a read if the
+    sizes differ."""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as fileobj:
+            return fileobj.read() == data
+    except EnvironmentError:
+        return False
+
+
+def write_file(path, data):
+    """Write the bytes in data to path, unless it holds them already.
+    Returns True if the file was written."""
+    path = str(path)
+    if is_unchanged(path, data):
+        logger.debug('Output unchanged: %s', path)
+        return False
+    with open(path, 'wb') as fileobj:
+        fileobj.write(data)
+    return True
+
+
+def make_dirs(dirpaths, made=None):
+    """Make the dirs not in made, and add them to it."""
+    if made is None:
+        made = set()
+    for dirpath in sorted(set(str(dirpath) for dirpath in dirpaths)):
+        if dirpath in made:
+            continue
+        try:
+            os.makedirs(dirpath)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        made.add(dirpath)
+    return made
+
+
+class OutputWriter(object):
+    """Write output files on a pool of threads, so the build doesn't wait
+    for the file system.
+
+    Files are queued, up to queue_size of them, for the threads to write.
+    Their dirs are made by the caller, so they exist when write() returns.
+    The first error is raised when the writer is closed.
+    """
+
+    def __init__(self, threads=WRITER_THREADS, queue_size=QUEUE_SIZE):
+        self.queue = queue.Queue(queue_size)
+        self.dirs = set()
+        self.written = 0
+        self.unchanged = 0
+        self.exc_info = None
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run) for _ in range(threads)]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path, data, compressor = item
+            try:
+                written = write_file(path, data)
+                if compressor is not None:
+                    compressor.write_sidecars(path, data)
+            except Exception:
+                written = None
+                with self.lock:
+                    if self.exc_info is None:
+                        self.exc_info = sys.exc_info()
+            with self.lock:
+                if written:
+                    self.written += 1
+                elif written is not None:
+                    self.unchanged += 1
+
+    def make_dirs(self, dirpaths):
+        """Make the dirs for many files at once."""
+        make_dirs(dirpaths, self.dirs)
+
+    def write(self, path, data, compressor=None):
+        """Queue the bytes in data to be written to path, and compressed by
+        compressor. Returns the files to be written."""
+        self.make_dirs([os.path.dirname(str(path))])
+        self.queue.put((path, data, compressor))
+        if compressor is None:
+            return [path]
+        return [path] + compressor.get_sidecars(path, data)
+
+    def close(self, raise_error=True):
+        """Wait for the queued files to be written."""
+        threads, self.threads = self.threads, []
+        for _ in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
+        logger.info('Outputs written: %d, unchanged: %d',
+                    self.written, self.unchanged)
+        if self.exc_info is not None:
+            exc_info, self.exc_info = self.exc_info, None
+            if raise_error:
+                six.reraise(*exc_info)
+            logger.error('Output write failed: %s', exc_info[1])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Don't hide an error in the build with one in the writer
+        self.close(raise_error=exc_type is None)
@@ -1,7 +1,7 @@
 from __future__ import print_function
 import pytest
 import jmdwebsites
-from jmdwebsites import Website
+from jmdwebsites.website import Website
 import os
 import logging
 import logging.config
@@ -0,0 +1,89 @@
+from __future__ import print_function
+import os
+
+import py
+
+import jmdwebsites.assets
+from jmdwebsites.website import Website
+from jmdwebsites.assets import AssetStore
+from jmdwebsites.page import build_page_assets
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+def test_asset_store_publish(tmpdir):
+    store = AssetStore(tmpdir.join('store'))
+    asset = tmpdir.join('source', 'a.css')
+    asset.write_text(u'p {}', 'utf-8', ensure=True)
+    first = tmpdir.join('build', 'one', 'a.css')
+    second = tmpdir.join('build', 'two', 'a.css')
+    assert store.publish(asset, first)
+    assert store.publish(asset, second)
+    # Stored once, and linked to from both targets
+    stored = tmpdir.join('store').visit(fil=lambda path: path.check(file=1))
+    assert len(list(stored)) == 1
+    assert first.samefile(second)
+    # Unchanged, so left alone
+    assert not store.publish(asset, first)
+    asset.write_text(u'p { color: red }', 'utf-8')
+    assert store.publish(asset, first)
+    assert first.read_text('utf-8') == u'p { color: red }'
+    assert second.read_text('utf-8') == u'p {}'
+
+
+def test_asset_store_prune(tmpdir):
+    asset = tmpdir.join('source', 'a.css')
+    asset.write_text(u'p {}', 'utf-8', ensure=True)
+    target = tmpdir.join('build', 'a.css')
+    AssetStore(tmpdir.join('store')).publish(asset, target)
+    store = AssetStore(tmpdir.join('store'))
+    assert store.prune() == 0
+    target.remove()
+    assert store.prune() == 1
+
+
+def test_asset_store_edit_in_place(tmpdir):
+    asset = tmpdir.join('source', 'a.css')
+    asset.write_text(u'p {}', 'utf-8', ensure=True)
+    target = tmpdir.join('build', 'one', 'a.css')
+    AssetStore(tmpdir.join('store')).publish(asset, target)
+    # An edit through a hardlink changes the stored asset too
+    with open(target.strpath, 'r+') as fileobj:
+        fileobj.write('q')
+    store = AssetStore(tmpdir.join('store'))
+    other = tmpdir.join('build', 'two', 'a.css')
+    assert store.publish(asset, other)
+    assert other.read_text('utf-8') == u'p {}'
+    assert store.publish(asset, target)
+    assert target.read_text('utf-8') == u'p {}'
+
+
+def test_asset_store_prune_parallel(tmpdir, monkeypatch):
+    def fail(*args):
+        raise OSError('Not supported')
+    # Published by copy, so the store isn't kept by links to it
+    monkeypatch.setattr(os, 'link', fail)
+    monkeypatch.setattr(jmdwebsites.assets, 'reflink', fail)
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    site_dir.join('content/pages/about/a.css').write_text(u'p {}', 'utf-8')
+    with tmpdir.as_cwd():
+        website = Website(site_dir=site_dir, build_dir=tmpdir.join('build'))
+        website.build(jobs=2)
+        # The assets used by the workers are kept
+        assert website.asset_store.used
+        stored = website.asset_store.store_dir.visit(
+            fil=lambda path: path.check(file=1))
+        assert len(list(stored)) == 1
+
+
+def test_build_page_assets(tmpdir):
+    source_dir = tmpdir.join('source')
+    source_dir.join('a.css').write_text(u'p {}', 'utf-8', ensure=True)
+    target_dir = tmpdir.join('build')
+    store = AssetStore(tmpdir.join('store'))
+    assets = build_page_assets(source_dir, target_dir, asset_store=store)
+    assert assets == [target_dir.join('a.css')]
+    assert target_dir.join('a.css').read_text('utf-8') == u'p {}'
@@ -0,0 +1,44 @@
+from __future__ import print_function
+
+from jmdwebsites.website import Website
+from jmdwebsites import bench
+from jmdwebsites.bench import BenchParams, RUNS
+
+
+def test_generate_site(tmpdir):
+    site_dir = tmpdir.join('site')
+    params = BenchParams(pages=5, partials=2, markdown_size=200,
+                         layout_depth=2, inherit_depth=2)
+    page_dirs = bench.generate_site(site_dir, params)
+    assert len(page_dirs) == 5
+    website = Website(site_dir=site_dir, build_dir=tmpdir.join('build'))
+    website.build()
+    html_files = website.build_dir.visit(fil='index.html')
+    assert len(list(html_files)) == 5
+    html = website.build_dir.join('page-0001', 'index.html').read()
+    assert 'class="level-2"' in html
+    assert 'class="part_2"' in html
+
+
+def test_run_bench(tmpdir):
+    params = BenchParams(pages=3, partials=1, markdown_size=100)
+    results = bench.run_bench(tmpdir, params)
+    assert [results['runs'][run]['built'] for run in RUNS] == [3, 0, 1]
+    # Throughput is of the pages built
+    cold, warm = results['runs']['cold'], results['runs']['warm']
+    assert cold['pages_per_sec'] == 3 / cold['time']
+    assert warm['pages_per_sec'] == 0
+    bench.save_results(tmpdir, results, 'old')
+    assert bench.load_results(tmpdir, 'latest') == bench.load_results(tmpdir, 'old')
+    assert 'Pages/s' in bench.report(results)
+    assert 'Warning' not in bench.compare(results, results)
+
+
+def test_run_bench_engine(tmpdir):
+    params = BenchParams(pages=2, partials=1, markdown_size=100)
+    results = bench.run_bench(tmpdir, params, engine='compiled')
+    assert results['engine'] == 'compiled'
+    assert [results['runs'][run]['built'] for run in RUNS] == [2, 0, 1]
+    assert 'engine compiled' in bench.report(results)
+    old = dict(results, engine='format')
+    assert 'engine: format -> compiled' in bench.compare(old, results)
@@ -0,0 +1,42 @@
+from __future__ import print_function
+
+import time
+
+from jmdwebsites.cache import FileCache, LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    for key in 'abc':
+        cache.put(key, key)
+    assert len(cache) == 2
+    assert cache.get('a') is None
+    assert cache.get('b') == 'b'
+    cache.put('d', 'd')
+    assert cache.get('c') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_file_cache(tmpdir):
+    cache = FileCache(tmpdir.join('cache'), maxsize=10)
+    assert cache.get('a') is None
+    cache.put('a', u'\xe9')
+    assert cache.get('a') == u'\xe9'
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Another cache on the same dir, eg. in the next build
+    assert FileCache(tmpdir.join('cache'), maxsize=10).get('a') == u'\xe9'
+    cache.clear()
+    assert cache.get('a') is None
+
+
+def test_file_cache_evict(tmpdir):
+    cache = FileCache(tmpdir, maxsize=10)
+    now = time.time()
+    for n, key in enumerate('abc'):
+        cache.put(key, u'1234')
+        tmpdir.join(key).setmtime(now - 100 + n)
+    # a was used after b, so b is evicted first
+    tmpdir.join('a').setmtime(now)
+    assert cache.evict() == 1
+    assert sorted(path.basename for path in tmpdir.listdir()) == ['a', 'c']
+    assert cache.evict() == 0
@@ -0,0 +1,72 @@
+from __future__ import print_function
+import gzip
+
+import py
+import pytest
+
+from jmdwebsites.website import Website
+from jmdwebsites import compress
+from jmdwebsites.compress import CompressError, CompressedCache, Compressor, \
+                                 GZIP, BROTLI
+from jmdwebsites.options import BuildOptions
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+def gunzip(path):
+    with gzip.open(str(path), 'rb') as fileobj:
+        return fileobj.read()
+
+
+def test_gzip_compress():
+    data = b'<p>Some html</p>\n' * 100
+    compressed = compress.gzip_compress(data)
+    assert len(compressed) < len(data)
+    assert compress.gzip_compress(data) == compressed
+
+
+def test_check_compressions():
+    assert compress.check_compressions([GZIP, GZIP]) == [GZIP]
+    with pytest.raises(CompressError):
+        compress.check_compressions(['zip'])
+
+
+@pytest.mark.skipif(compress.brotli is not None, reason='brotli is installed')
+def test_brotli_not_installed():
+    with pytest.raises(CompressError):
+        BuildOptions(compress=[BROTLI])
+
+
+def test_compressor(tmpdir):
+    cache = CompressedCache(tmpdir.join('cache'))
+    compressor = Compressor([GZIP], min_size=100, cache=cache)
+    path = tmpdir.join('index.html')
+    assert compressor.write_sidecars(path, b'Too small') == []
+    data = b'<p>Some html</p>\n' * 100
+    assert compressor.write_sidecars(path, data) == [tmpdir.join('index.html.gz')]
+    assert gunzip(tmpdir.join('index.html.gz')) == data
+    assert (cache.hits, cache.misses) == (0, 1)
+    compressor.write_sidecars(tmpdir.join('copy.html'), data)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert gunzip(tmpdir.join('copy.html.gz')) == data
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_sidecars(tmpdir, jobs):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    website = Website(site_dir=site_dir, build_dir=tmpdir.join('build'))
+    website.build(jobs=jobs, options=BuildOptions(compress=[GZIP],
+                                                  compress_min_size=0))
+    outputs = list(website.build_dir.visit(
+        fil=lambda path: path.ext in ('.html', '.css')))
+    assert outputs
+    for path in outputs:
+        assert gunzip(path + '.gz') == path.read_binary()
+    # Sidecars of outputs that are too small are removed
+    website.build(jobs=jobs, options=BuildOptions(compress=[GZIP],
+                                                  compress_min_size=10 ** 6))
+    assert not list(website.build_dir.visit(fil='*.gz'))
+    assert all(path.check() for path in outputs)
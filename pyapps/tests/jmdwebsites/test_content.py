@@ -2,7 +2,9 @@ from __future__ import print_function
 
 import pytest
 
-from jmdwebsites.content import get_vars, get_content, \
+import mistune
+
+from jmdwebsites.content import get_vars, get_content, MarkdownCache, \
                                 MissingContentError, KEEP_FILE
 from jmdwebsites.orderedyaml import CommentedMap
 
@@ -38,3 +40,21 @@ def test_get_content(tmpdir):
     tmpdir.join('_tmp.md').ensure(file=1).write_text(u'Hello', 'utf-8')
     source_content = get_content(tmpdir)
     assert isinstance(source_content, dict)
+
+
+def test_get_content_cached(tmpdir):
+    source_dir = tmpdir.join('source').ensure(dir=1)
+    source_dir.join('_article.md').write_text(u'# Hello', 'utf-8')
+    cache = MarkdownCache(tmpdir.join('cache'))
+    expected = get_content(source_dir)
+    assert get_content(source_dir, markdown_cache=cache) == expected
+    assert get_content(source_dir, markdown_cache=cache) == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+    # An edit is a miss
+    source_dir.join('_article.md').write_text(u'# Hello again', 'utf-8')
+    get_content(source_dir, markdown_cache=cache)
+    assert cache.misses == 2
+    # So is a change to the renderer config
+    markdown = mistune.Markdown(hard_wrap=True)
+    get_content(source_dir, markdown=markdown, markdown_cache=cache)
+    assert cache.misses == 3
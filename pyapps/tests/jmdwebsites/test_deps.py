@@ -0,0 +1,86 @@
+from __future__ import print_function
+
+import py
+import pytest
+
+from jmdwebsites.website import Website
+from jmdwebsites.deps import Dependencies, DependencyHasher
+from jmdwebsites.orderedyaml import CommentedMap
+from jmdwebsites.page import get_page_deps
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+specs = CommentedMap([
+    ('pages', CommentedMap([
+        ('page', CommentedMap([('layouts', 'page'), ('partials', 'page')])),
+    ])),
+    ('layouts', CommentedMap([
+        ('base', CommentedMap([('doc', CommentedMap([('header', None)]))])),
+        ('page', CommentedMap([('inherit', 'base')])),
+    ])),
+    ('partials', CommentedMap([
+        ('base', CommentedMap([('header', u'<h1>{partial}</h1>'),
+                               ('footer', u'<p>{partial}</p>')])),
+        ('page', CommentedMap([('inherit', 'base')])),
+    ])),
+])
+
+
+def test_dependencies(tmpdir):
+    deps = Dependencies(tmpdir)
+    deps.add_spec('layouts', 'page', specs['layouts'])
+    deps.add_spec('partials', 'page', specs['partials'])
+    deps.add_partial('header')
+    deps.add_partial('header')
+    deps.add_file(tmpdir.join('_article.md'))
+    assert list(deps) == [
+        'files:*', 'layouts:page', 'layouts:base',
+        'partials:page:header', 'file:_article.md']
+
+
+def test_dependency_hasher(tmpdir):
+    hasher = DependencyHasher(specs)
+    header = hasher.hash('partials:page:header', tmpdir)
+    assert header is not None
+    assert header != hasher.hash('partials:page:footer', tmpdir)
+    assert hasher.hash('partials:page:missing', tmpdir) != header
+    assert hasher.hash('file:_article.md', tmpdir) is None
+    files = hasher.hash('files:*', tmpdir)
+    tmpdir.join('_article.md').write_text(u'Hello', 'utf-8')
+    assert hasher.hash('file:_article.md', tmpdir) is not None
+    assert hasher.hash('files:*', tmpdir) != files
+
+
+def test_get_page_deps():
+    site_dir = datapath('brochure')
+    source_dir = site_dir.join('content/pages/about')
+    website = Website(site_dir=site_dir)
+    deps = list(get_page_deps('/about', website.specs, source_dir))
+    assert deps[:3] == ['files:*', 'pages:/about', 'pages:page']
+    assert 'layouts:about_page' in deps
+    assert 'partials:page:cards' in deps
+    assert 'file:_article.md' in deps
+    assert deps == list(website.get_page_deps('/about'))
+
+
+def test_build_after_partial_change(tmpdir):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    build_dir = tmpdir.join('build')
+    with tmpdir.as_cwd():
+        Website(site_dir=site_dir, build_dir=build_dir).build()
+        about = build_dir.join('about/index.html')
+        contact = build_dir.join('contact/index.html')
+        about.setmtime(0)
+        contact.setmtime(0)
+        # Only the about page layout uses the cards partial
+        theme_file = site_dir.join('theme.yaml')
+        theme_file.write_text(theme_file.read_text('utf-8').replace(
+            '<div class="cards">', '<div class="changed">'), 'utf-8')
+        Website(site_dir=site_dir, build_dir=build_dir).build()
+        assert about.mtime() != 0
+        assert contact.mtime() == 0
+        assert 'changed' in about.read_text('utf-8')
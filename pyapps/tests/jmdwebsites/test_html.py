@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+from bs4 import BeautifulSoup
+import py
+import pytest
+
+from jmdwebsites import dircmp
+from jmdwebsites.html import format_html, prettify
+from jmdwebsites.htmlformatter import prettify as fast_prettify, \
+    UnsupportedHtmlError
+from jmdwebsites.options import BuildOptions
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+def doc(body, head=u'<meta charset="utf-8"><title>Home</title>'):
+    return u'<!DOCTYPE html>\n<html lang="en">\n<head>{}</head>\n' \
+           u'<body>{}</body>\n</html>\n'.format(head, body)
+
+
+@pytest.mark.parametrize("html_doc", [
+    doc(u''),
+    doc(u'<p>one <b>two</b> three<br>four<br/>five</p>'),
+    doc(u'<p>a &lt; b &gt; c &amp; d &copy; &#169; &#xa9; &nbsp;é&nbsp;</p>'),
+    doc(u'<div class="  a   b " id=x title=\'say "hi"\' lang="it\'s &quot;"></div>'),
+    doc(u'<ul><li>a</li><li><ul><li>b</li></ul></li></ul>'),
+    doc(u'<!-- comment --><p>\n   multi\n   line  \n\n  text  </p>'),
+    doc(u'<a href="?a=1&amp;b=2" rel=" nofollow  me">x</a><input disabled>'),
+    doc(u'', head=u'<meta charset="UTF-8"><link rel="stylesheet" href="/page.css">'),
+    u'<!-- top --><!DOCTYPE html><html><head><!-- h --></head><!-- between -->'
+    u'<body></body><!-- after --></html>',
+])
+def test_fast_prettify(html_doc):
+    expected = BeautifulSoup(html_doc, 'html5lib').prettify()
+    assert fast_prettify(html_doc) == expected
+
+
+@pytest.mark.parametrize("html_doc", [
+    doc(u'<p>x<div>y</div></p>'),
+    doc(u'<li>a<li>b</li></li>'),
+    doc(u'<h1>a<h2>b</h2></h1>'),
+    doc(u'<table><tr><td>x</td></tr></table>'),
+    doc(u'<pre>  x\n  y</pre>'),
+    doc(u'<div/>'),
+    doc(u'<p>AT&T</p>'),
+    doc(u'<p>&apos;</p>'),
+    doc(u'<p>x', head=u''),
+    doc(u'', head=u'<script src="x.js"></script>'),
+    u'<html><body></body></html>',
+    u'<p>Partial</p>',
+])
+def test_fast_prettify_unsupported(html_doc):
+    with pytest.raises(UnsupportedHtmlError):
+        fast_prettify(html_doc)
+    # So format_html falls back to html5lib
+    assert format_html(html_doc, 'fast') == prettify(html_doc)
+
+
+def test_format_html():
+    html_doc = doc(u'<p>Home</p>')
+    pretty_html = format_html(html_doc, 'fast')
+    assert pretty_html == prettify(html_doc)
+    assert format_html(html_doc, 'html5lib') == pretty_html
+    assert format_html(html_doc, 'fast', indent=1) != pretty_html
+
+
+def test_format_html_none():
+    html_doc = doc(u'<p>Home</p>')
+    assert format_html(html_doc, 'none') is html_doc
+
+
+@pytest.mark.parametrize("site_dir", [
+    datapath('brochure')
+])
+def test_build_fast_formatter(site_dir, website):
+    website.build(options=BuildOptions(formatter='fast'))
+    assert not dircmp.diff(website.build_dir, site_dir.join('expected')), \
+        'Build dir not equal to expected dir'
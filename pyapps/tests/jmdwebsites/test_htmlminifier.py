@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import re
+
+import html5lib
+import py
+import pytest
+import six
+
+from jmdwebsites.website import Website
+from jmdwebsites.htmlminifier import minify
+from jmdwebsites.options import BuildOptions, PRODUCTION
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+def doc(body, head=u'<meta charset="utf-8"><title>Home</title>'):
+    return u'<!DOCTYPE html>\n<html lang="en">\n<head>{}</head>\n' \
+           u'<body>{}</body>\n</html>\n'.format(head, body)
+
+
+def walk(element, out):
+    # Comments are left out, but their tails kept
+    if not callable(element.tag):
+        out.append((element.tag, sorted(element.attrib.items())))
+        out.append(element.text or u'')
+        for child in element:
+            walk(child, out)
+            out.append(child.tail or u'')
+        out.append(('/', element.tag))
+
+
+def tree(html_doc):
+    """The elements, attributes and text, with whitespace trimmed and
+    runs of it collapsed, that html5lib reads in a doc."""
+    out = []
+    walk(html5lib.parse(html_doc), out)
+    items = []
+    for item in out:
+        if isinstance(item, tuple) or not items or \
+                not isinstance(items[-1], six.text_type):
+            items.append(item)
+        else:
+            items[-1] += item
+    items = [re.sub(r'\s+', u' ', item).strip()
+             if isinstance(item, six.text_type) else item for item in items]
+    return [item for item in items if item != u'']
+
+
+@pytest.mark.parametrize("html_doc, expected", [
+    (doc(u''),
+     u'<!DOCTYPE html><html lang=en><head><meta charset=utf-8><title>Home</title><body>'),
+    (doc(u'<p>one <b>two</b>\n   three<br/>four</p>\n<p>five</p>'),
+     doc(u'<p>one <b>two</b> three<br>four<p>five',
+         u'<meta charset=utf-8><title>Home</title>').replace(
+             u'\n', u'').replace(u'lang="en"', u'lang=en').replace(
+             u'</head>', u'').replace(u'</body></html>', u'')),
+    (u'<ul>\n  <li> a </li>\n  <li>b</li>\n</ul>', u'<ul><li> a </li> <li>b</ul>'),
+    # Items of an inline nav keep the space between them
+    (u'<nav><ul>\n<li><a href="/">Home</a></li>\n<li><a href="/about">About'
+     u'</a></li>\n</ul></nav>',
+     u'<nav><ul><li><a href=/>Home</a></li> <li><a href=/about>About</a></ul></nav>'),
+    (u'<p>a <meta itemprop="b" content="c"> d</p>',
+     u'<p>a <meta itemprop=b content=c> d'),
+    (doc(u'', u'\n<meta charset="utf-8">\n<link href="a.css" rel="stylesheet">\n'
+              u'<title>Home</title>\n'),
+     u'<!DOCTYPE html><html lang=en><head><meta charset=utf-8>'
+     u'<link href=a.css rel=stylesheet><title>Home</title><body>'),
+    (u'<dl><dt>a</dt><dd>b</dd></dl>', u'<dl><dt>a<dd>b</dl>'),
+    (u'<a href="/"><p>a</p></a>', u'<a href=/><p>a</p></a>'),
+    (u'<div><p>a</p>  </div>', u'<div><p>a</div>'),
+    (u'<p>a</p> b', u'<p>a</p>b'),
+    (u'<pre>\n  a  b\n</pre>', u'<pre>\n  a  b\n</pre>'),
+    (u'<textarea> a  b </textarea>', u'<textarea> a  b </textarea>'),
+    (u'<script>\nvar a  =  1;\n</script>', u'<script>\nvar a  =  1;\n</script>'),
+    (u'a<!-- comment -->b', u'ab'),
+    (u'<!--[if IE]><p>IE</p><![endif]-->', u'<!--[if IE]><p>IE</p><![endif]-->'),
+    (u'<p>a &lt; b &amp; &copy; &#169;</p>', u'<p>a &lt; b &amp; &copy; &#169;'),
+    (u'<a href="?a=1&amp;b=2" title=\'say "hi"\' class="a b">x</a>',
+     u'<a href="?a=1&amp;b=2" title="say &quot;hi&quot;" class="a b">x</a>'),
+    (u'<input disabled type="text"/>', u'<input disabled type=text>'),
+    (u'<svg><path d="a"/></svg>', u'<svg><path d="a"/></svg>'),
+])
+def test_minify(html_doc, expected):
+    assert minify(html_doc) == expected
+    assert tree(minify(html_doc)) == tree(html_doc)
+
+
+def test_build_production(tmpdir):
+    site_dir = datapath('brochure')
+    website = Website(site_dir=site_dir, build_dir=tmpdir.join('build'))
+    website.build(options=BuildOptions(mode=PRODUCTION))
+    for path in website.build_dir.visit(fil='*.html'):
+        html_doc = path.read_text('utf-8')
+        expected = site_dir.join('expected', path.relto(website.build_dir))
+        assert u'\n' not in html_doc
+        assert tree(html_doc) == tree(expected.read_text('utf-8'))
@@ -0,0 +1,53 @@
+from __future__ import print_function
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ['bs4', 'html5lib', 'mistune', 'sass', 'ruamel.yaml']
+# Import times, as a fraction of the time taken to import the heavy
+# modules, so the budgets hold on a slow or loaded machine
+IMPORT_TIME_BUDGET = {
+    'jmdwebsites': 0.05,
+    'jmdwebsites.cli': 0.5,
+}
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.time()
+import {}
+print(json.dumps([time.time() - start, sorted(sys.modules)]))
+"""
+
+
+def import_module(name):
+    """Get the time taken by an import in a fresh interpreter, and the
+    modules it loaded."""
+    output = subprocess.check_output(
+        [sys.executable, '-c', IMPORT_SCRIPT.format(name)])
+    import_time, modules = json.loads(output.decode('utf-8'))
+    return import_time, set(modules)
+
+
+def best_import_time(name, runs=3):
+    return min(import_module(name)[0] for _ in range(runs))
+
+
+@pytest.mark.parametrize("name, loaded", [
+    ('jmdwebsites', []),
+    ('jmdwebsites.cli', []),
+    ('jmdwebsites.website', ['ruamel.yaml']),
+])
+def test_heavy_modules_imported_lazily(name, loaded):
+    _, modules = import_module(name)
+    assert [heavy for heavy in HEAVY_MODULES if heavy in modules] == loaded
+
+
+@pytest.mark.parametrize("name", sorted(IMPORT_TIME_BUDGET))
+def test_import_time_budget(name):
+    heavy_time = best_import_time(', '.join(HEAVY_MODULES))
+    import_time = best_import_time(name)
+    assert import_time < IMPORT_TIME_BUDGET[name] * heavy_time, \
+        'Import of {} took {:.3f}s, of the heavy modules {:.3f}s'.format(
+            name, import_time, heavy_time)
@@ -0,0 +1,66 @@
+from __future__ import print_function
+
+import pytest
+
+from jmdwebsites.manifest import BuildManifest, hash_files
+
+
+@pytest.fixture()
+def build_dir(tmpdir):
+    return tmpdir.join('build').ensure(dir=1)
+
+
+def test_hash_files(tmpdir):
+    tmpdir.join('_article.md').write_text(u'Hello', 'utf-8')
+    tmpdir.join('.keep').ensure(file=1)
+    hashes = hash_files(tmpdir)
+    assert list(hashes.keys()) == ['file:_article.md']
+    tmpdir.join('_article.md').write_text(u'Hello again', 'utf-8')
+    assert hash_files(tmpdir) != hashes
+
+
+def test_load_without_manifest(tmpdir, build_dir):
+    manifest = BuildManifest(tmpdir.join('manifest.json'), build_dir)
+    assert not manifest.load()
+    tmpdir.join('manifest.json').write_text(u'Not json', 'utf-8')
+    assert not manifest.load()
+
+
+def test_is_current(tmpdir, build_dir):
+    inputs = {'spec': '1'}
+    output = build_dir.join('about/index.html').ensure(file=1)
+    manifest = BuildManifest(tmpdir.join('manifest.json'), build_dir)
+    assert not manifest.is_current('/about', inputs)
+    manifest.update('/about', inputs, [output])
+    manifest.dump()
+
+    manifest = BuildManifest(tmpdir.join('manifest.json'), build_dir)
+    assert manifest.load()
+    assert manifest.is_current('/about', inputs)
+    assert not manifest.is_current('/about', {'spec': '2'})
+    output.remove()
+    assert not manifest.is_current('/about', inputs)
+
+
+def test_load_for_another_build_dir(tmpdir, build_dir):
+    manifest = BuildManifest(tmpdir.join('manifest.json'), build_dir)
+    manifest.dump()
+    manifest = BuildManifest(tmpdir.join('manifest.json'), tmpdir.join('other'))
+    assert not manifest.load()
+
+
+def test_remove_stale(tmpdir, build_dir):
+    about = build_dir.join('about/index.html').ensure(file=1)
+    contact = build_dir.join('contact/index.html').ensure(file=1)
+    manifest = BuildManifest(tmpdir.join('manifest.json'), build_dir)
+    manifest.update('/about', {}, [about])
+    manifest.update('/contact', {}, [contact])
+    manifest.dump()
+
+    manifest = BuildManifest(tmpdir.join('manifest.json'), build_dir)
+    assert manifest.load()
+    assert manifest.is_current('/about', {})
+    manifest.remove_stale()
+    assert about.check()
+    assert not contact.check()
+    assert not contact.dirpath().check()
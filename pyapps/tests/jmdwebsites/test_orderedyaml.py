@@ -5,7 +5,7 @@ from six import string_types
 
 from jmdwebsites.content import get_vars
 from jmdwebsites.orderedyaml import OrderedYaml, CommentedMap, CommentedSeq,\
-                                    dump, load
+                                    FastLoader, dump, load
 
 from .generic_test_data import spec
 
@@ -21,6 +21,35 @@ def test_dump_and_load(data):
     assert isinstance(loaded, OrderedYaml)
     assert isinstance(loaded.commented_map, CommentedMap)
     assert loaded.commented_map == data
+
+
+@pytest.mark.parametrize("data", [
+    spec
+])
+def test_fast_load(data):
+    dumped = dump(spec)
+    loaded = load(dumped, Loader=FastLoader).commented_map
+    assert loaded == load(dumped).commented_map
+    assert list(loaded) == list(data)
+    assert isinstance(loaded, CommentedMap)
+
+
+def test_fast_load_types():
+    loaded = load(u'b: x\na: |\n  lit\nc: [1, {d: 2}]\n', Loader=FastLoader)
+    data = loaded.commented_map
+    assert list(data) == ['b', 'a', 'c']
+    assert data == {'a': u'lit\n', 'b': u'x', 'c': [1, {'d': 2}]}
+    assert isinstance(data['b'], unicode)
+    assert isinstance(data['c'], CommentedSeq)
+    assert isinstance(data['c'][1], CommentedMap)
+
+
+def test_fast_load_yaml_version():
+    text = u'a: yes\nb: on\nc: no\nd: 010\ne: 1:20\nf: 0o10\ng: 2017-03-01\n'
+    loaded = load(text, Loader=FastLoader).commented_map
+    assert loaded == load(text).commented_map
+    assert [loaded[key] for key in 'abcdef'] == \
+        [u'yes', u'on', u'no', 10, u'1:20', 8]
     
 
 class TestOrderedYaml:
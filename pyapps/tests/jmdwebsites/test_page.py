@@ -0,0 +1,72 @@
+from __future__ import print_function
+
+import pytest
+
+from jmdwebsites.orderedyaml import CommentedMap
+from jmdwebsites.page import get_page_spec, PageSpecCache
+
+
+def spec(*items):
+    return CommentedMap(items)
+
+
+specs = spec(
+    ('pages', spec(
+        ('page', spec(('layouts', 'page'), ('vars', 'page'),
+                      ('navlinks', 'page'))),
+    )),
+    ('layouts', spec(
+        ('page', spec(
+            ('doc', spec(('navs', None))),
+            ('navs', spec(('nav_home', 'navlink'), ('nav_about', 'navlink'))),
+        )),
+    )),
+    ('vars', spec(('page', spec(('lang', 'en'))))),
+    ('navlinks', spec(('page', spec(('nav_home', '/'), ('nav_about', '/about'))))),
+)
+
+
+def test_get_page_spec():
+    page_spec = get_page_spec('/about', specs)
+    assert page_spec['vars'] == {'lang': 'en', 'url': '/about'}
+    assert page_spec['layouts']['navs'] == {
+        'nav_home': 'navlink', 'nav_about': 'activenavlink'}
+    assert list(page_spec['layouts']['navs']) == ['nav_home', 'nav_about']
+
+
+def test_get_page_spec_cached():
+    cache = PageSpecCache(specs)
+    home = get_page_spec('/', specs, cache=cache)
+    about = get_page_spec('/about', specs, cache=cache)
+    assert home['vars']['url'] == '/'
+    assert about['vars']['url'] == '/about'
+    assert home['layouts']['navs']['nav_home'] == 'activenavlink'
+    assert home['layouts']['navs']['nav_about'] == 'navlink'
+    assert about['layouts']['navs']['nav_home'] == 'navlink'
+    assert about['layouts']['navs']['nav_about'] == 'activenavlink'
+    # Only the url specific bits are copied
+    assert home['navlinks'] is about['navlinks']
+    assert home['layouts']['doc'] is about['layouts']['doc']
+    assert len(cache.page_specs) == 1
+
+
+def test_navlink_index():
+    cache = PageSpecCache(specs)
+    _, _, navlinks = cache.get_page_spec('page')
+    assert navlinks == {'/': [('layouts', 'navs', 'nav_home')],
+                        '/about': [('layouts', 'navs', 'nav_about')]}
+
+
+def test_get_page_spec_variants():
+    cache = PageSpecCache(specs)
+    first = get_page_spec('/first', specs, cache=cache)
+    second = get_page_spec('/second', specs, cache=cache)
+    about = get_page_spec('/about', specs, cache=cache)
+    assert second['vars']['url'] == '/second'
+    # Pages with no active nav link share the page spec without one
+    assert first['layouts'] is second['layouts']
+    assert second['layouts']['navs'] == {
+        'nav_home': 'navlink', 'nav_about': 'navlink'}
+    assert get_page_spec('/about', specs, cache=cache)['layouts'] is \
+        about['layouts']
+    assert sorted(cache.variants) == [('page', None), ('page', '/about')]
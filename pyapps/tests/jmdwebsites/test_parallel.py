@@ -0,0 +1,49 @@
+from __future__ import print_function
+import logging
+
+import py
+import pytest
+
+from jmdwebsites import dircmp
+from jmdwebsites.website import Website
+from jmdwebsites.content import MissingContentError
+from jmdwebsites.parallel import RecordHandler
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+@pytest.mark.parametrize("site_dir", [
+    datapath('brochure')
+])
+def test_build_parallel(site_dir, website):
+    website.build(jobs=2)
+    assert not dircmp.diff(website.build_dir, site_dir.join('expected')), \
+        'Build dir not equal to expected dir'
+
+
+def test_build_parallel_error(tmpdir):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    for name in ('about', 'blog'):
+        site_dir.join('content/pages', name, '_article.md').remove()
+    with tmpdir.as_cwd():
+        website = Website(site_dir=site_dir, build_dir=tmpdir.join('build'))
+        with pytest.raises(MissingContentError):
+            website.build(jobs=2)
+    # All the other pages are still built
+    assert tmpdir.join('build/contact/index.html').check()
+
+
+def test_record_handler():
+    handler = RecordHandler(logging.INFO)
+    logger = logging.getLogger('jmdwebsites.test_record_handler')
+    logger.addHandler(handler)
+    try:
+        logger.debug('Not recorded')
+        logger.info('Recorded %s', py.path.local('/tmp'))
+    finally:
+        logger.removeHandler(handler)
+    assert [record.msg for record in handler.records] == ['Recorded /tmp']
+    assert handler.records[0].args is None
@@ -0,0 +1,183 @@
+from __future__ import print_function
+
+import py
+import pytest
+
+import jmdwebsites.posts
+from jmdwebsites.posts import PostIndex, PostIndexConfig, Post, \
+                              PostIndexConfigError, get_date, \
+                              get_post_index_config, listing_finder, paginate
+from jmdwebsites.profiler import BuildProfiler, profiling
+from jmdwebsites.website import Website
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+def write_post(posts_dir, name, text, basename='_article.md'):
+    page_dir = posts_dir.join(name)
+    page_dir.join(basename).write_text(text, 'utf-8', ensure=True)
+    return '/' + name, page_dir
+
+
+@pytest.mark.parametrize("basename, expected", [
+    ('2017-03-01-first-post', '2017-03-01'),
+    ('2017-03-01', '2017-03-01'),
+    ('2017-02-30-no-such-day', None),
+    ('first-post', None),
+])
+def test_get_date(basename, expected):
+    assert get_date(py.path.local(basename)) == expected
+
+
+def test_get_post_index_config():
+    assert get_post_index_config({}) is None
+    config = get_post_index_config({'post_index': None})
+    assert (config.url, config.per_page) == ('/posts', 10)
+    with pytest.raises(PostIndexConfigError):
+        get_post_index_config({'post_index': {'per_page': 0}})
+    with pytest.raises(PostIndexConfigError):
+        get_post_index_config({'post_index': {'pages': 2}})
+
+
+def test_paginate():
+    posts = [Post(None, '/{}'.format(i), u'', '') for i in range(5)]
+    listings = list(paginate(iter(posts), '/posts', len(posts), 2))
+    assert [listing.url for listing in listings] == \
+        ['/posts', '/posts/page/2', '/posts/page/3']
+    assert [len(listing.posts) for listing in listings] == [2, 2, 1]
+    assert (listings[0].newer, listings[0].older) == (None, '/posts/page/2')
+    assert (listings[2].newer, listings[2].older) == ('/posts/page/2', None)
+    # A listing page, even with no posts
+    assert len(list(paginate(iter([]), '/posts', 0, 2))) == 1
+
+
+def test_post_index(tmpdir):
+    posts_dir = tmpdir.join('posts')
+    pages = [
+        write_post(posts_dir, '2017-03-01-old', u'# Old post\n\nText'),
+        write_post(posts_dir, '2018-01-10-new', u'No heading'),
+        write_post(posts_dir, 'undated', u'<h1>An <em>html</em> title</h1>',
+                   '_article.html'),
+    ]
+    post_index = PostIndex(tmpdir.join('posts.jsonl'))
+    post_index.update(pages)
+    post_index.dump()
+    posts = list(post_index.iter_posts())
+    assert [(post.date, post.url, post.title) for post in posts] == [
+        ('2018-01-10', '/2018-01-10-new', u'new'),
+        ('2017-03-01', '/2017-03-01-old', u'Old post'),
+        (None, '/undated', u'An html title'),
+    ]
+    # A new post is merged into the saved posts, in listing order
+    pages.append(write_post(posts_dir, '2017-06-01-mid', u'# Mid'))
+    post_index.update(pages)
+    post_index.dump()
+    assert [post.url for post in post_index.iter_posts()] == \
+        ['/2018-01-10-new', '/2017-06-01-mid', '/2017-03-01-old', '/undated']
+    assert (post_index.count, post_index.years) == (4, {'2017': 2, '2018': 1})
+
+
+def test_post_index_incremental(tmpdir, monkeypatch):
+    posts_dir = tmpdir.join('posts')
+    pages = [write_post(posts_dir, '2017-03-0{}-post'.format(i),
+                        u'# Post {}'.format(i)) for i in range(1, 4)]
+    post_index = PostIndex(tmpdir.join('posts.jsonl'))
+    post_index.update(pages)
+    post_index.dump()
+
+    # Only the post that changed is read again
+    read = []
+    real_read_post = jmdwebsites.posts.read_post
+    def read_post(url, *args):
+        read.append(url)
+        return real_read_post(url, *args)
+    monkeypatch.setattr(jmdwebsites.posts, 'read_post', read_post)
+    pages[1][1].join('_article.md').write_text(u'# Changed', 'utf-8')
+    post_index = PostIndex(tmpdir.join('posts.jsonl'))
+    assert post_index.load()
+    post_index.update(pages[1:])
+    # Only the post read is held, to be merged into the saved index
+    assert [post.url for post in post_index.updated] == ['/2017-03-02-post']
+    post_index.dump()
+    assert read == ['/2017-03-02-post']
+    assert [post.title for post in post_index.iter_posts()] == \
+        [u'Post 3', u'Changed']
+    assert post_index.count == 2
+
+    # The posts after an invalid line of the index are read again
+    index_file = tmpdir.join('posts.jsonl')
+    lines = index_file.read_text('utf-8').splitlines(True)
+    index_file.write_text(u''.join(lines[:2]) + u'[1]\n', 'utf-8')
+    del read[:]
+    post_index = PostIndex(index_file)
+    post_index.update(pages[1:])
+    post_index.dump()
+    assert read == ['/2017-03-02-post']
+    assert [post.title for post in post_index.iter_posts()] == \
+        [u'Post 3', u'Changed']
+
+
+def test_listing_finder(tmpdir):
+    posts_dir = tmpdir.join('posts')
+    pages = [write_post(posts_dir, name, u'# ' + name) for name in
+             ['2016-12-31-a', '2017-01-01-b', '2017-06-01-c', 'd']]
+    post_index = PostIndex(tmpdir.join('posts.jsonl'))
+    post_index.update(pages)
+    post_index.dump()
+    listings = list(listing_finder(post_index, PostIndexConfig(per_page=3)))
+    assert [(listing.url, [post.url for post in listing.posts])
+            for listing in listings] == [
+        ('/posts', ['/2017-06-01-c', '/2017-01-01-b', '/2016-12-31-a']),
+        ('/posts/page/2', ['/d']),
+        ('/posts/2017', ['/2017-06-01-c', '/2017-01-01-b']),
+        ('/posts/2016', ['/2016-12-31-a']),
+    ]
+
+
+def test_build_posts(tmpdir):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    site_yaml = site_dir.join('site.yaml')
+    site_yaml.write_text(site_yaml.read_text('utf-8') +
+                         u'post_index:\n    per_page: 1\n', 'utf-8')
+    posts_dir = site_dir.join('content', 'posts')
+    write_post(posts_dir, '2017-03-01-hello', u'# Hello')
+    build_dir = tmpdir.join('build')
+    with tmpdir.as_cwd():
+        Website(site_dir=site_dir, build_dir=build_dir).build()
+        listing = build_dir.join('posts', 'index.html')
+        assert 'href="/2017-03-01-hello"' in listing.read_text('utf-8')
+        older = build_dir.join('posts', 'page', '2', 'index.html')
+        assert 'href="/first-post"' in older.read_text('utf-8')
+        assert build_dir.join('posts', '2017', 'index.html').check()
+
+        # Only the listings the changed post is on are rebuilt
+        listing.setmtime(0)
+        older.setmtime(0)
+        write_post(posts_dir, 'first-post', u'# Changed')
+        Website(site_dir=site_dir, build_dir=build_dir).build()
+        assert listing.mtime() == 0
+        assert 'Changed' in older.read_text('utf-8')
+
+        # Listing pages that have gone are removed
+        posts_dir.join('first-post').remove()
+        Website(site_dir=site_dir, build_dir=build_dir).build()
+        assert not older.check()
+
+
+def test_build_posts_profile(tmpdir):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    site_yaml = site_dir.join('site.yaml')
+    site_yaml.write_text(site_yaml.read_text('utf-8') + u'post_index:\n',
+                         'utf-8')
+    with tmpdir.as_cwd():
+        with profiling(BuildProfiler()) as build_profiler:
+            Website(site_dir=site_dir, build_dir=tmpdir.join('build')).build()
+    # Listings are timed as pages, so no stage is counted twice
+    assert '/posts' in build_profiler.pages
+    assert 'post_index' in build_profiler.stages
+    stage_time = sum(elapsed for _, elapsed in build_profiler.stages.values())
+    assert stage_time <= build_profiler.time
@@ -0,0 +1,48 @@
+from __future__ import print_function
+import json
+import pstats
+
+import py
+import pytest
+
+from jmdwebsites.website import Website
+from jmdwebsites import profiler
+from jmdwebsites.profiler import BuildProfiler, profiling
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+def test_stages_not_profiled():
+    assert profiler.get_profiler() is None
+    with profiler.stage('render'):
+        pass
+    with profiler.page('/'):
+        pass
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_profile(tmpdir, jobs):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    with profiling(BuildProfiler(cprofile=2)) as build_profiler:
+        website = Website(site_dir=site_dir, build_dir=tmpdir.join('build'))
+        website.build(jobs=jobs)
+    assert profiler.get_profiler() is None
+    assert build_profiler.time > 0
+    urls = set(url for url, _ in website.page_finder())
+    assert set(build_profiler.pages) == urls
+    for name in ('specs', 'page_spec', 'template', 'content', 'merge_content',
+                 'render', 'format', 'dump', 'assets', 'stylesheets'):
+        assert name in build_profiler.stages
+    assert build_profiler.stages['dump'][0] == len(urls)
+    assert 'Slowest pages:' in build_profiler.report()
+
+    profile_file = build_profiler.dump(website.profile_dir)
+    data = json.loads(profile_file.read_text('utf-8'))
+    assert set(data['pages']) == set(build_profiler.pages)
+    assert len(data['stats']) == 2
+    for basename in data['stats'].values():
+        stats = pstats.Stats(website.profile_dir.join(basename).strpath)
+        assert stats.total_calls > 0
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import py
+import pytest
+
+from jmdwebsites import dircmp
+from jmdwebsites.options import BuildOptions, OptionError
+from jmdwebsites.page import render_html, NotFoundError
+from jmdwebsites import render as render_module
+from jmdwebsites.render import render, MissingKeyError, RenderRecursionError, \
+                              Renderer
+from jmdwebsites.data import DataObj
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+@pytest.mark.parametrize("template, kwargs, expected", [
+    (u'<p>{title}</p>', {'title': u'Home'}, u'<p>Home</p>'),
+    (u'<p>{{title}}</p>', {}, u'<p>{title}</p>'),
+    (u'<p>{title!r:>8}</p>', {'title': 'abc'}, u"<p>   'abc'</p>"),
+    (u'<p>{stats.value}</p>', {'stats': DataObj({'value': u'78%'})}, u'<p>78%</p>'),
+    (u'<p>{n:03}</p>', {'n': 7}, u'<p>007</p>'),
+    # Variables in content
+    (u'<h1>{header}</h1>', {'header': u'Page {url}', 'url': u'/about'},
+     u'<h1>Page /about</h1>'),
+    (u'{a}', {'a': u'{b}', 'b': u'{c}', 'c': u'é'}, u'é'),
+    # Literal braces in content
+    (u'<pre>{code}</pre>', {'code': u'if (x) { y(); }'}, u'<pre>if (x) { y(); }</pre>'),
+    (u'<pre>{code}</pre>', {'code': u'{"a": 1} {url}', 'url': u'/'},
+     u'<pre>{"a": 1} /</pre>'),
+    (u'<pre>{code}</pre>', {'code': u'}{'}, u'<pre>}{</pre>'),
+])
+def test_render(template, kwargs, expected):
+    assert render(template, **kwargs) == expected
+
+
+def test_render_missing_key():
+    with pytest.raises(MissingKeyError) as e:
+        render(u'<div>{main}</div>', main=u'<p>{article}</p>')
+    assert e.value.path == ('main', 'article')
+    assert str(e.value) == 'main -> article'
+
+
+def test_render_recursion():
+    with pytest.raises(RenderRecursionError):
+        render(u'{a}', a=u'{b}', b=u'{a}')
+
+
+def test_render_parses_template_once(monkeypatch):
+    parsed = []
+    real_parse = render_module.formatter.parse
+    def parse(text):
+        parsed.append(text)
+        return real_parse(text)
+    monkeypatch.setattr(render_module.formatter, 'parse', parse)
+    renderer = Renderer()
+    template = u'<main>{main}</main>'
+    assert renderer.render(template, main=u'<p>1</p>') == u'<main><p>1</p></main>'
+    assert renderer.render(template, main=u'<p>2</p>') == u'<main><p>2</p></main>'
+    assert parsed == [template]
+
+
+@pytest.mark.parametrize("engine", ['format', 'compiled'])
+def test_render_html_missing_content(engine):
+    with pytest.raises(NotFoundError) as e:
+        render_html(u'<p>{title}</p>', {'url': '/'}, engine=engine)
+    assert "title" in str(e.value)
+
+
+def test_build_options():
+    assert BuildOptions() == BuildOptions(engine='format')
+    assert BuildOptions(engine='compiled') != BuildOptions()
+    with pytest.raises(OptionError):
+        BuildOptions(engine='nope')
+    assert BuildOptions(formatter='fast') != BuildOptions()
+    with pytest.raises(OptionError):
+        BuildOptions(formatter='nope')
+
+
+@pytest.mark.parametrize("site_dir", [
+    datapath('brochure')
+])
+def test_build_compiled(site_dir, website):
+    website.build(options=BuildOptions(engine='compiled'))
+    assert not dircmp.diff(website.build_dir, site_dir.join('expected')), \
+        'Build dir not equal to expected dir'
@@ -0,0 +1,65 @@
+from __future__ import print_function
+import os
+
+from jmdwebsites.content import FileFilter
+from jmdwebsites.manifest import hash_file
+from jmdwebsites.scanindex import ScanIndex
+
+
+def make_tree(root):
+    for relpath in ['_a.md', 'b.css', 'one/_a.md', 'one/two/c.css',
+                    'one/two/_b.html', 'three/.keep']:
+        root.join(relpath).write_text(u'x', 'utf-8', ensure=True)
+    root.join('empty').ensure(dir=1)
+
+
+def test_scan_index_visit_order(tmpdir):
+    make_tree(tmpdir)
+    index = ScanIndex()
+    index.scan([tmpdir])
+    assert index.find_dirs(tmpdir) == \
+        list(tmpdir.visit(fil=lambda path: path.check(dir=1)))
+    fil = FileFilter('_', ['.html', '.md'])
+    assert index.find_files(tmpdir, fil=fil) == list(tmpdir.visit(fil=fil))
+    assert index.find_files(tmpdir, fil=str('*.css')) == \
+        list(tmpdir.visit(fil=str('*.css')))
+    assert index.find_files(tmpdir, sort=True, ignore=['.keep']) == \
+        [path for path in tmpdir.visit(sort=True)
+         if path.check(file=1) and path.basename != '.keep']
+
+
+def test_scan_index_outside_roots(tmpdir):
+    make_tree(tmpdir)
+    index = ScanIndex()
+    index.scan([tmpdir.join('one')])
+    # Looked up on disk instead
+    assert index.find_dirs(tmpdir) == \
+        list(tmpdir.visit(fil=lambda path: path.check(dir=1)))
+    assert index.hash_file(tmpdir.join('b.css')) == hash_file(tmpdir.join('b.css'))
+    assert index.hash_file(tmpdir.join('missing')) is None
+
+
+def test_scan_index_hashes(tmpdir):
+    make_tree(tmpdir)
+    path = tmpdir.join('one', '_a.md')
+    old_time = path.mtime() - 60
+    os.utime(path.strpath, (old_time, old_time))
+    index = ScanIndex(tmpdir.join('scan.json'))
+    index.scan([tmpdir.join('one')])
+    assert index.hash_file(path) == hash_file(path)
+    # Too new to be sure a change would show
+    assert index.hash_file(tmpdir.join('one', 'two', 'c.css')) is not None
+    assert list(index.hashes) == [path.strpath]
+    index.dump()
+
+    index = ScanIndex(tmpdir.join('scan.json'))
+    assert index.load()
+    index.scan([tmpdir.join('one')])
+    index.hashes[path.strpath] = index.hashes[path.strpath][:2] + ('cached',)
+    assert index.hash_file(path) == 'cached'
+    # A change of size is a miss
+    path.write_text(u'xx', 'utf-8')
+    os.utime(path.strpath, (old_time, old_time))
+    index.scan([tmpdir.join('one')])
+    assert index.hash_file(path) == hash_file(path)
+    assert index.hash_file(tmpdir.join('one', 'gone.md')) is None
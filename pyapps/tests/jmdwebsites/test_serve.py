@@ -0,0 +1,91 @@
+from __future__ import print_function
+
+import threading
+
+import py
+import pytest
+from six.moves.urllib.error import HTTPError
+from six.moves.urllib.request import urlopen
+
+from jmdwebsites.serve import get_page_url, PreviewServer, PreviewSite
+from jmdwebsites.website import Website
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+@pytest.fixture()
+def site(tmpdir):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    with tmpdir.as_cwd():
+        yield PreviewSite(Website(site_dir=site_dir))
+
+
+@pytest.mark.parametrize("path, expected", [
+    ('/', '/'),
+    ('/index.html', '/'),
+    ('/about/', '/about'),
+    ('/contact/directions/index.html', '/contact/directions'),
+])
+def test_get_page_url(path, expected):
+    assert get_page_url(path) == expected
+
+
+def test_get_page(site):
+    expected = datapath('brochure').join('expected')
+    for url, relpath in [('/', 'index.html'),
+                         ('/contact/directions', 'contact/directions/index.html'),
+                         ('/first-post', 'first-post/index.html')]:
+        assert site.get_page(url) == expected.join(relpath).read_text('utf-8')
+    assert site.get_page('/nope') is None
+    assert site.get_page('/../brochure') is None
+
+
+def test_get_page_changed(site):
+    html_page = site.get_page('/about')
+    assert site.get_page('/about') is html_page
+    site.website.site_dir.join('content/pages/about/_article.md').write_text(
+        u'Changed', 'utf-8')
+    assert 'Changed' in site.get_page('/about')
+
+
+def test_preview_server(site):
+    server = PreviewServer(site, port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        url = 'http://{}:{}'.format(*server.server_address)
+        response = urlopen(url + '/about/')
+        assert response.info()['Content-Type'] == 'text/html; charset=utf-8'
+        assert response.read().decode('utf-8') == site.get_page('/about')
+        with pytest.raises(HTTPError) as e:
+            urlopen(url + '/nope/')
+        assert e.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_preview_server_error(site, monkeypatch):
+    def get_page(url):
+        raise IOError('Broken')
+    monkeypatch.setattr(site, 'get_page', get_page)
+    server = PreviewServer(site, port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        url = 'http://{}:{}'.format(*server.server_address)
+        with pytest.raises(HTTPError) as e:
+            urlopen(url + '/about/')
+        # The error is shown, rather than the connection dropped
+        assert e.value.code == 500
+        text = e.value.read().decode('utf-8')
+        assert 'Traceback' in text
+        assert 'IOError: Broken' in text or 'OSError: Broken' in text
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,43 @@
+from __future__ import print_function
+import os
+
+from jmdwebsites.snapshot import SpecSnapshot
+from jmdwebsites.website import get_specs, find_spec_files
+
+
+def write_specs(site_dir):
+    site_dir.join('site.yaml').write_text(u'site: {name: Home}\n', 'utf-8',
+                                          ensure=True)
+    site_dir.join('content.yaml').write_text(u'content: {a: 1}\n', 'utf-8')
+
+
+def test_spec_snapshot(tmpdir):
+    site_dir = tmpdir.join('site')
+    write_specs(site_dir)
+    locations = [site_dir]
+    snapshot = SpecSnapshot(tmpdir.join('specs.pickle'))
+    specs = get_specs(locations, fast=True, snapshot=snapshot)
+    assert specs == get_specs(locations)
+    paths = list(find_spec_files(locations))
+    assert paths[1] is None
+    assert snapshot.load(paths) == specs
+
+    # Same mtime and size, but a change of content is found by its hash
+    content_file = site_dir.join('content.yaml')
+    mtime = content_file.mtime()
+    content_file.write_text(u'content: {a: 2}\n', 'utf-8')
+    os.utime(content_file.strpath, (mtime, mtime))
+    assert snapshot.load(paths) is None
+    assert get_specs(locations, fast=True, snapshot=snapshot)['content'] == \
+        {'a': 2}
+
+    # A spec file turns up
+    site_dir.join('theme.yaml').write_text(u'theme: {}\n', 'utf-8')
+    assert snapshot.load(list(find_spec_files(locations))) is None
+
+
+def test_spec_snapshot_invalid(tmpdir):
+    snapshot = SpecSnapshot(tmpdir.join('specs.pickle'))
+    assert snapshot.load([]) is None
+    tmpdir.join('specs.pickle').write_binary(b'not a pickle')
+    assert snapshot.load([]) is None
@@ -1,8 +1,12 @@
 from __future__ import print_function
+import json
 
 import pytest
 
 import jmdwebsites
+from jmdwebsites.orderedyaml import CommentedMap
+from jmdwebsites.spec import get_spec, ensure_spec, to_spec, validate_specs, \
+                            SpecMap, InvalidSpecError
 
 
 @pytest.mark.parametrize("config, expected", [
@@ -16,3 +20,63 @@ def test_spec_walker(config, expected):
     assert result == expected
 
 
+
+
+def spec(*items):
+    return CommentedMap(items)
+
+
+def test_get_spec():
+    root = spec(
+        ('base', spec(('inherit', None),
+                      ('head', spec(('inherit', None), ('title', None), ('meta', None))),
+                      ('body', spec(('main', None))),
+                      ('footer', 'base'))),
+        ('page', spec(('inherit', 'base'),
+                      ('head', spec(('inherit', None), ('meta', 'page'), ('link', None))),
+                      ('footer', 'page'))),
+    )
+    raw = json.dumps(root)
+    page = get_spec('page', root)
+    assert json.dumps(page) == json.dumps(spec(
+        ('head', spec(('title', None), ('meta', 'page'), ('link', None))),
+        ('body', spec(('main', None))),
+        ('footer', 'page')))
+    # Values not merged are shared with the ancestors, which are unchanged
+    assert page['body'] is root['base']['body']
+    assert json.dumps(root) == raw
+
+
+def test_to_spec():
+    loaded = spec(('b', spec(('c', [spec(('d', 1))]))), ('a', None))
+    converted = to_spec(loaded)
+    assert converted == loaded
+    assert list(converted) == ['b', 'a']
+    assert type(converted) is SpecMap
+    assert type(converted['b']['c'][0]) is SpecMap
+    converted.update({'e': 2})
+    assert list(converted) == ['b', 'a', 'e']
+
+
+@pytest.mark.parametrize("specs", [
+    [],
+    {'pages': 'page'},
+    {'pages': {'page': ['layouts']}},
+    {'pages': {'page': {'layouts': 'page'}}},
+    {'pages': {'page': {'layouts': 'page'}}, 'layouts': None},
+])
+def test_validate_specs_invalid(specs):
+    with pytest.raises(InvalidSpecError):
+        validate_specs(specs)
+
+
+def test_ensure_spec():
+    page_spec = to_spec({'content': {'a': None}})
+    ensured = ensure_spec(page_spec, ('content', 'vars'))
+    assert ensured == {'content': {'a': None}, 'vars': {}}
+    # The spec is not changed, and is returned as it is if it's complete
+    assert page_spec == {'content': {'a': None}}
+    assert ensure_spec(ensured, ('vars',)) is ensured
+    assert ensure_spec(None, ('vars',)) == {'vars': {}}
+    with pytest.raises(TypeError):
+        ensure_spec('content', ('content',))
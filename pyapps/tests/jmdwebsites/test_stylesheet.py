@@ -0,0 +1,74 @@
+from __future__ import print_function
+
+from jmdwebsites.stylesheet import build_css, compile_css, hash_imports, \
+    COMPRESSED, import_name_finder, SassCache
+
+
+def test_import_name_finder():
+    text = u'''
+        @import "base/normalize";
+        @import 'a', "b";
+        // @import "commented";
+        /* @import "commented"; */
+        @import "theme.css";
+        @import url(foo);
+        @import "http://fonts.example.com/font";
+    '''
+    assert list(import_name_finder(text)) == ['base/normalize', 'a', 'b']
+
+
+def make_stylesheets(tmpdir):
+    tmpdir.join('page.scss').write_text(
+        u'@import "base/base";\n.page { color: $color; }\n', 'utf-8')
+    tmpdir.join('base', '_base.scss').write_text(
+        u'@import "variables";\n', 'utf-8', ensure=True)
+    tmpdir.join('base', '_variables.scss').write_text(
+        u'$color: red;\n', 'utf-8')
+    tmpdir.join('_unused.scss').write_text(u'', 'utf-8')
+    return tmpdir.join('page.scss')
+
+
+def test_hash_imports(tmpdir):
+    src = make_stylesheets(tmpdir)
+    assert sorted(hash_imports(src)) == [
+        'file:base/_base.scss', 'file:base/_variables.scss', 'file:page.scss']
+
+
+def test_build_css_cached(tmpdir):
+    src = make_stylesheets(tmpdir.join('stylesheets').ensure(dir=1))
+    tgt = tmpdir.join('build', 'page.css')
+    cache = SassCache(tmpdir.join('cache'))
+    assert build_css(src, tgt, cache=cache) == ['page.scss']
+    css = tgt.read_text('utf-8')
+    assert 'red' in css
+    tgt.remove()
+    assert build_css(src, tgt, cache=cache) == []
+    assert tgt.read_text('utf-8') == css
+    # Files not imported don't matter
+    src.dirpath('_unused.scss').write_text(u'$x: 1;\n', 'utf-8')
+    assert build_css(src, tgt, cache=cache) == []
+    src.dirpath('base', '_variables.scss').write_text(u'$color: blue;\n', 'utf-8')
+    assert build_css(src, tgt, cache=cache) == ['base/_variables.scss']
+    assert 'blue' in tgt.read_text('utf-8')
+
+
+def test_build_css_compressed(tmpdir):
+    src = make_stylesheets(tmpdir.join('stylesheets').ensure(dir=1))
+    tgt = tmpdir.join('build', 'page.css')
+    cache = SassCache(tmpdir.join('cache'))
+    build_css(src, tgt, cache=cache)
+    nested = tgt.read_text('utf-8')
+    assert build_css(src, tgt, cache=cache, output_style=COMPRESSED) == \
+        ['page.scss']
+    assert tgt.read_text('utf-8') == u'.page{color:red}'
+    assert build_css(src, tgt, cache=cache, output_style=COMPRESSED) == []
+    build_css(src, tgt, cache=cache)
+    assert tgt.read_text('utf-8') == nested
+
+
+def test_compile_css_compressed_not_ascii(tmpdir):
+    src = tmpdir.join('page.scss')
+    src.write_text(u'a:after { content: "\u2192"; }\n', 'utf-8')
+    # A byte order mark, in place of a charset rule
+    assert compile_css(src, output_style=COMPRESSED) == \
+        u'\ufeffa:after{content:"\u2192"}'
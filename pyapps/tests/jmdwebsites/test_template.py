@@ -0,0 +1,71 @@
+from __future__ import print_function
+
+import pytest
+
+from jmdwebsites.deps import Dependencies
+from jmdwebsites.orderedyaml import CommentedMap
+from jmdwebsites.template import get_template, get_fingerprint, TemplateCache, \
+                                 SubspecDigests
+
+
+def spec(*items):
+    return CommentedMap(items)
+
+
+page_spec = spec(
+    ('layouts', spec(
+        ('doc', spec(('html', None))),
+        ('html', spec(('body', None))),
+    )),
+    ('partials', spec(
+        ('html', u'<html>{partial}</html>'),
+        ('body', u'<body>{partial}</body>'),
+    )),
+)
+
+
+def test_get_template():
+    template = get_template(page_spec, cache=None)
+    assert template == u'<html>\n<body>{body}</body>\n</html>\n'
+
+
+def test_get_template_cached(tmpdir):
+    cache = TemplateCache()
+    template = get_template(page_spec, cache=cache)
+    assert get_template(page_spec, cache=cache) is template
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Deps are recorded, even when the template is cached
+    deps = Dependencies(tmpdir)
+    get_template(page_spec, deps=deps, cache=cache)
+    assert list(deps) == ['files:*', 'partials::html', 'partials::body']
+    # A change to a partial is a different template
+    other_spec = spec(*page_spec.items())
+    other_spec['partials'] = spec(('html', u'<html lang="en">{partial}</html>'),
+                                  ('body', u'<body>{partial}</body>'))
+    assert get_template(other_spec, cache=cache) != template
+    assert len(cache) == 2
+
+
+def test_get_fingerprint():
+    digests = SubspecDigests()
+    fingerprint = get_fingerprint(page_spec, digests=digests)
+    # Each page spec sharing the subspecs has the same fingerprint, and
+    # the subspecs aren't hashed again
+    assert get_fingerprint(spec(*page_spec.items()), digests=digests) == \
+        fingerprint
+    assert (digests.hits, digests.misses) == (3, 3)
+    other_spec = spec(*page_spec.items())
+    other_spec['layouts'] = spec(*page_spec['layouts'].items())
+    assert get_fingerprint(other_spec, digests=digests) == fingerprint
+    assert get_fingerprint(other_spec, 'html', digests=digests) != fingerprint
+
+
+def test_template_cache_maxsize():
+    cache = TemplateCache(maxsize=2)
+    for key in 'abc':
+        cache.put(key, key)
+    assert cache.get('a') is None
+    assert cache.get('b') == 'b'
+    cache.put('d', 'd')
+    assert cache.get('c') is None
+    assert cache.get('b') == 'b'
@@ -0,0 +1,72 @@
+from __future__ import print_function
+import logging
+
+import py
+import pytest
+
+from jmdwebsites.website import Website
+from jmdwebsites import trace
+from jmdwebsites.parallel import RecordHandler
+from jmdwebsites.trace import TraceError, Dump, CATEGORIES, SPEC, RENDER
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+class CountedDump(Dump):
+
+    dumps = 0
+
+    def __unicode__(self):
+        CountedDump.dumps += 1
+        return Dump.__unicode__(self)
+
+
+@pytest.fixture()
+def handler():
+    handler = RecordHandler(logging.DEBUG)
+    logger = logging.getLogger('jmdwebsites.trace')
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    yield handler
+    logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+    trace.set_tracing()
+
+
+def test_set_tracing():
+    trace.set_tracing(['all'])
+    assert trace.get_tracing() == sorted(CATEGORIES)
+    trace.set_tracing([SPEC])
+    assert trace.get_tracing() == [SPEC]
+    with pytest.raises(TraceError):
+        trace.set_tracing(['nonexistent'])
+    trace.set_tracing()
+    assert trace.get_tracing() == []
+
+
+def test_trace(handler):
+    CountedDump.dumps = 0
+    trace.trace(SPEC, 'Spec %r', 'page', CountedDump({'vars': {'title': u'\xe9'}}))
+    assert not handler.records
+    assert CountedDump.dumps == 0
+    trace.set_tracing([SPEC])
+    trace.trace(RENDER, 'Html', u'<p></p>')
+    trace.trace(SPEC, 'Spec %r', 'page', CountedDump({'vars': {'title': u'\xe9'}}))
+    assert CountedDump.dumps == 1
+    assert [record.name for record in handler.records] == ['jmdwebsites.trace.spec']
+    message = handler.records[0].msg
+    assert message.startswith(u"Spec 'page':")
+    assert u'"title": "\xe9"' in message
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_traces(tmpdir, handler, jobs):
+    trace.set_tracing(['all'])
+    website = Website(site_dir=datapath('brochure'), build_dir=tmpdir.join('build'))
+    website.build(jobs=jobs)
+    if jobs == 1:
+        names = set(record.name for record in handler.records)
+        assert names == set('jmdwebsites.trace.' + category
+                            for category in CATEGORIES)
@@ -0,0 +1,72 @@
+from __future__ import print_function
+
+import py
+
+from jmdwebsites.website import Website
+from jmdwebsites.watch import get_changes, scan, Watcher
+
+
+def datapath(stem):
+    return py.path.local(__file__).dirpath('data', stem)
+
+
+def test_scan(tmpdir):
+    tmpdir.join('a', 'b.txt').write_text(u'b', 'utf-8', ensure=True)
+    state = scan([tmpdir])
+    tmpdir.join('a', 'b.txt').write_text(u'bb', 'utf-8')
+    tmpdir.join('c.txt').write_text(u'c', 'utf-8')
+    assert get_changes(state, scan([tmpdir])) == set([
+        tmpdir.join('a', 'b.txt').strpath, tmpdir.join('c.txt').strpath])
+
+
+def test_watcher_rebuild(tmpdir):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    build_dir = tmpdir.join('build')
+    with tmpdir.as_cwd():
+        watcher = Watcher(Website(site_dir=site_dir, build_dir=build_dir))
+        watcher.build()
+        about = build_dir.join('about/index.html')
+        contact = build_dir.join('contact/index.html')
+        about.setmtime(0)
+        contact.setmtime(0)
+        # Only the page whose content changed is rebuilt
+        article = site_dir.join('content/pages/about/_article.md')
+        article.write_text(u'Changed', 'utf-8')
+        watcher.rebuild(set([article.strpath]))
+        assert 'Changed' in about.read_text('utf-8')
+        assert contact.mtime() == 0
+        # A change to the specs checks every page
+        site_yaml = site_dir.join('site.yaml')
+        site_yaml.write_text(site_yaml.read_text('utf-8') + u'\n', 'utf-8')
+        about.setmtime(0)
+        watcher.rebuild(set([site_yaml.strpath]))
+        assert about.mtime() == 0
+        # Pages that have gone are removed
+        site_dir.join('content/pages/about').remove()
+        watcher.rebuild(set([site_dir.join('content/pages/about').strpath]))
+        assert not about.dirpath().check()
+        assert contact.check()
+        # The manifest is kept up to date for the next build
+        contact.setmtime(0)
+        Website(site_dir=site_dir, build_dir=build_dir).build()
+        assert contact.mtime() == 0
+
+
+def test_watcher_rebuild_keeps_manifest(tmpdir):
+    site_dir = tmpdir.join('site')
+    datapath('brochure').copy(site_dir)
+    build_dir = tmpdir.join('build')
+    with tmpdir.as_cwd():
+        website = Website(site_dir=site_dir, build_dir=build_dir)
+        watcher = Watcher(website)
+        watcher.build()
+        article = site_dir.join('content/pages/about/_article.md')
+        article.write_text(u'Changed', 'utf-8')
+        watcher.rebuild(set([article.strpath]))
+        # The pages the rebuild didn't check are still in the manifest
+        manifest = website.get_manifest(watcher.options)
+        assert manifest.load()
+        assert '/about' in manifest.targets
+        assert '/contact' in manifest.targets
+        assert '/' in manifest.targets
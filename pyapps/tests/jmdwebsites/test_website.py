@@ -7,7 +7,8 @@ import pytest
 
 import jmdwebsites
 from jmdwebsites import dircmp
-from jmdwebsites import Website, HtmlPage
+from jmdwebsites import HtmlPage
+from jmdwebsites.website import Website
 
 
 def datapath(stem):
@@ -18,7 +19,7 @@ def test_init_website(tmpcwd, loginfo):
     site_dir = tmpcwd
     project_dir = site_dir.join('.jmdwebsite')
     assert not project_dir.check()
-    jmdwebsites.init_website()
+    jmdwebsites.website.init_website()
     assert project_dir.check()
     assert site_dir.join('site.yaml').check()
 
@@ -27,7 +28,7 @@ def test_new_website(tmpcwd, loginfo):
     site = 'example-site'
     site_dir = py.path.local(site)
     assert not site_dir.check()
-    jmdwebsites.new_website(site_dir)
+    jmdwebsites.website.new_website(site_dir)
     assert site_dir.check(), \
         'No new site has been created: {}'.format(site_dir)
     #assert site_dir.join('index').check()
@@ -97,6 +98,33 @@ class TestWebsite:
         assert not dircmp.diff(website.build_dir, expected_dir), \
             'Build dir not equal to expected dir'
 
+    def test_build_incremental(self, logopt, tmpdir):
+        site_dir = tmpdir.join('site')
+        datapath('brochure').copy(site_dir)
+        build_dir = tmpdir.join('build')
+        with tmpdir.as_cwd():
+            Website(site_dir=site_dir, build_dir=build_dir).build()
+            about = build_dir.join('about/index.html')
+            contact = build_dir.join('contact/index.html')
+            about.setmtime(0)
+            contact.setmtime(0)
+            # Nothing changed, so nothing is rewritten
+            Website(site_dir=site_dir, build_dir=build_dir).build()
+            assert about.mtime() == 0
+            assert contact.mtime() == 0
+            # Only the page whose content changed is rewritten
+            site_dir.join('content/pages/about/_article.md').write_text(
+                u'Changed', 'utf-8')
+            Website(site_dir=site_dir, build_dir=build_dir).build()
+            assert about.mtime() != 0
+            assert contact.mtime() == 0
+            assert 'Changed' in about.read_text('utf-8')
+            # Outputs of pages that no longer exist are removed
+            site_dir.join('content/pages/about').remove()
+            Website(site_dir=site_dir, build_dir=build_dir).build()
+            assert not about.dirpath().check()
+            assert contact.check()
+
 
 expected_html_page = {
     'doctype': 'html',
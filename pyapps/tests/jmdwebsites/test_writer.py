@@ -0,0 +1,47 @@
+from __future__ import print_function
+
+import pytest
+
+from jmdwebsites.writer import OutputWriter, write_file, make_dirs
+
+
+def test_write_file(tmpdir):
+    path = tmpdir.join('index.html')
+    assert write_file(path, b'<p>1</p>')
+    path.setmtime(1000000000)
+    assert not write_file(path, b'<p>1</p>')
+    assert path.mtime() == 1000000000
+    assert write_file(path, b'<p>2</p>')
+    assert path.read_binary() == b'<p>2</p>'
+
+
+def test_make_dirs(tmpdir):
+    dirpaths = [tmpdir.join('a', 'b'), tmpdir.join('a'), tmpdir.join('a', 'b')]
+    made = make_dirs(dirpaths)
+    assert made == set([str(tmpdir.join('a')), str(tmpdir.join('a', 'b'))])
+    assert tmpdir.join('a', 'b').check(dir=1)
+    # Already made
+    tmpdir.join('a', 'b').remove()
+    make_dirs(dirpaths, made)
+    assert not tmpdir.join('a', 'b').check()
+
+
+def test_output_writer(tmpdir):
+    paths = [tmpdir.join('page{}'.format(n), 'index.html') for n in range(50)]
+    paths[0].write_binary(b'page0', ensure=True)
+    with OutputWriter(threads=3, queue_size=4) as writer:
+        writer.make_dirs(path.dirpath() for path in paths[:10])
+        for n, path in enumerate(paths):
+            writer.write(path, 'page{}'.format(n).encode('utf-8'))
+    assert [path.read_binary() for path in paths] == \
+        ['page{}'.format(n).encode('utf-8') for n in range(50)]
+    assert (writer.written, writer.unchanged) == (49, 1)
+
+
+def test_output_writer_error(tmpdir):
+    tmpdir.join('dir').ensure(dir=1)
+    with pytest.raises(EnvironmentError):
+        with OutputWriter() as writer:
+            writer.write(tmpdir.join('dir'), b'Not a file')
+            writer.write(tmpdir.join('file'), b'Written')
+    assert tmpdir.join('file').read_binary() == b'Written'